@@ -0,0 +1,665 @@
+# glue_scripts/dam_analytics_engine.py
+
+import sys
+import math
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+import pymysql
+import dam_db  # Shipped with --extra-py-files, or copied into the Lambda package from shared/
+import dam_timeseries  # Shipped with --extra-py-files, or copied into the Lambda package from shared/
+import dam_partitions  # Shipped with --extra-py-files, or copied into the Lambda package from shared/
+import dam_load_sequence  # Shipped with --extra-py-files, or copied into the Lambda package from shared/
+import dam_analysis  # Shipped with --extra-py-files, or copied into the Lambda package from shared/
+
+# Initialize logger
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Items kept by the top level of a QuantileSketch; the rank error is roughly 1.7 / SKETCH_SIZE
+SKETCH_SIZE = 200
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch (KLL-style compactor hierarchy) for driver-side distribution statistics.
+    Items at level h stand for 2**h values. Min and max are tracked exactly.
+    """
+
+    def __init__(self, k=SKETCH_SIZE):
+        self.k = k
+        self.levels = [[]]
+        self.min = None
+        self.max = None
+        self._compactions = 0
+
+    def _capacity(self, level):
+        return max(2, int(math.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items = sorted(self.levels[level])
+                # Keep one item back when the count is odd so the total weight is preserved
+                leftover = [items.pop()] if len(items) % 2 else []
+                # Alternate which half survives so repeated compactions do not bias the ranks
+                offset = self._compactions % 2
+                self._compactions += 1
+                self.levels[level + 1].extend(items[offset::2])
+                self.levels[level] = leftover
+            level += 1
+
+    def update(self, values):
+        """
+        Add an array of values, ignoring NaN.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.levels[0].extend(values.tolist())
+        self._compress()
+
+    def merge(self, other):
+        """
+        Fold another sketch into this one, e.g. per-dam sketches into a cross-dam sketch.
+        """
+        if other.min is None:
+            return
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self._compress()
+
+    def quantile(self, fraction):
+        """
+        Return the approximate value at the given fraction of the ranks, or None when the sketch is empty.
+        """
+        weighted = sorted(
+            (value, 2 ** level) for level, items in enumerate(self.levels) for value in items
+        )
+        if not weighted:
+            return None
+        target = fraction * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def stats(self):
+        """
+        Return min, max and the QUANTILES as a dict keyed by the DISTRIBUTION_STATS names.
+        """
+        stats = {'min': self.min, 'max': self.max}
+        for stat, fraction in dam_analysis.QUANTILES.items():
+            stats[stat] = self.quantile(fraction)
+        return stats
+
+def read_dam_resource_columns(connection, start_date, dam_id=None, fetch_size=10000, end_date=None):
+    """
+    Stream dam_resources rows since start_date (and before end_date, if given) through a server-side
+    cursor into column arrays, for one dam_id or every dam. Returns a dict with
+    'dam_id' (str), 'date' (datetime64[D]) and one float64 array per measure, with NaN for NULL values.
+    """
+    dam_filter = "dam_id = %s AND " if dam_id else ""
+    end_filter = " AND date < %s" if end_date else ""
+    query = f"""
+        SELECT dam_id, date, {', '.join(dam_analysis.MEASURES)}
+        FROM dam_resources
+        WHERE {dam_filter}date >= %s{end_filter}
+    """
+    params = (dam_id, start_date) if dam_id else (start_date,)
+    if end_date:
+        params += (end_date,)
+
+    dam_ids = []
+    dates = []
+    values = {measure: [] for measure in dam_analysis.MEASURES}
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                dam_ids.append(str(row[0]))
+                dates.append(row[1])
+                for index, measure in enumerate(dam_analysis.MEASURES, start=2):
+                    values[measure].append(np.nan if row[index] is None else float(row[index]))
+
+    logger.info(f"Streamed {len(dates)} rows from 'dam_resources'.")
+    columns = {
+        'dam_id': np.array(dam_ids, dtype=object),
+        'date': np.array(dates, dtype='datetime64[D]')
+    }
+    for measure in dam_analysis.MEASURES:
+        columns[measure] = np.array(values[measure], dtype=np.float64)
+    return columns
+
+def concatenate_columns(parts):
+    """
+    Join column dicts from read_dam_resource_columns and read_archived_columns into one.
+    """
+    return {name: np.concatenate([part[name] for part in parts]) for name in ['dam_id', 'date', *dam_analysis.MEASURES]}
+
+def read_archived_columns(reader, start_date, dam_id=None):
+    """
+    Decode a yearly time-series archive from start_date onwards into column arrays, reading only
+    the given dam's blocks when dam_id is set.
+    """
+    dam_ids = []
+    dates = []
+    values = {measure: [] for measure in dam_analysis.MEASURES}
+    for series_id, series_dates, series_values in reader.iter_series(start_date, None, [dam_id] if dam_id else None):
+        dam_ids.extend([series_id] * len(series_dates))
+        dates.extend(series_dates)
+        for measure in dam_analysis.MEASURES:
+            values[measure].extend(np.nan if value is None else value for value in series_values[measure])
+
+    columns = {
+        'dam_id': np.array(dam_ids, dtype=object),
+        'date': np.array(dates, dtype='datetime64[D]')
+    }
+    for measure in dam_analysis.MEASURES:
+        columns[measure] = np.array(values[measure], dtype=np.float64)
+    return columns
+
+def read_history_columns(connection, start_date, dam_id, fetch_size, history_archive, current_year):
+    """
+    Read dam_resources since start_date, taking each complete year from its time-series archive in S3
+    when one exists (history_archive is an s3://bucket/prefix path) and everything else from MySQL.
+    While a year still has its partition, the archive is only used if the checksum it was written with
+    matches the partition's current partition_checksum; after late or corrected rows the year is read
+    from MySQL until lambda_partition_maintenance rewrites the archive.
+    """
+    import boto3
+    from botocore.exceptions import ClientError
+
+    bucket, _, prefix = history_archive[len('s3://'):].partition('/')
+    s3_client = boto3.client('s3')
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        partitioned_years = set(dam_partitions.get_year_partitions(cursor))
+
+    parts = []
+    span_start = start_date  # Start of the current run of years that must come from MySQL
+    for year in range(start.year, current_year):
+        key = dam_timeseries.yearly_archive_key(prefix, year)
+        try:
+            archived_checksum = s3_client.head_object(Bucket=bucket, Key=key).get('Metadata', {}).get('checksum')
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                continue
+            raise
+        # Years whose partition was dropped only exist in the archive
+        if year in partitioned_years and archived_checksum != dam_partitions.partition_checksum(connection, year):
+            logger.warning(f"Time-series archive of {year} does not match its partition. Reading {year} from MySQL.")
+            continue
+        reader = dam_timeseries.TimeSeriesReader.from_s3(s3_client, bucket, key)
+        if span_start < f'{year}-01-01':
+            parts.append(read_dam_resource_columns(connection, span_start, dam_id, fetch_size, end_date=f'{year}-01-01'))
+        parts.append(read_archived_columns(reader, max(start, datetime(year, 1, 1).date()), dam_id))
+        logger.info(f"Read {len(parts[-1]['date'])} rows of {year} from the time-series archive.")
+        span_start = f'{year + 1}-01-01'
+    parts.append(read_dam_resource_columns(connection, span_start, dam_id, fetch_size))
+    return concatenate_columns(parts)
+
+def compute_window_totals(columns, current_date):
+    """
+    Compute the sum and non-null count of every measure in every window, per dam, with vectorised masks.
+    Returns a dict of dam_id to totals keyed 'sum_<measure>_<period>' and 'count_<measure>_<period>'.
+    """
+    dam_keys, dam_index = np.unique(columns['dam_id'], return_inverse=True)
+    totals_by_dam = {str(dam): {} for dam in dam_keys}
+
+    for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+        cutoff = np.datetime64((current_date - timedelta(days=days)).date(), 'D')
+        in_window = columns['date'] >= cutoff
+        for measure in dam_analysis.MEASURES:
+            valid = in_window & ~np.isnan(columns[measure])
+            sums = np.bincount(dam_index, weights=np.where(valid, columns[measure], 0.0), minlength=len(dam_keys))
+            counts = np.bincount(dam_index, weights=valid.astype(np.float64), minlength=len(dam_keys))
+            for position, dam in enumerate(dam_keys):
+                totals = totals_by_dam[str(dam)]
+                totals[f'sum_{measure}_{period_name}'] = float(sums[position])
+                totals[f'count_{measure}_{period_name}'] = int(counts[position])
+    return totals_by_dam
+
+def compute_window_sketches(columns, current_date):
+    """
+    Build a QuantileSketch of every measure in every window, per dam, from the same column arrays as the totals.
+    Returns a dict of dam_id to sketches keyed '<measure>_<period>'.
+    """
+    order = np.argsort(columns['dam_id'], kind='stable')
+    dam_keys, starts = np.unique(columns['dam_id'][order], return_index=True)
+    bounds = list(starts) + [len(order)]
+
+    cutoffs = {
+        period_name: np.datetime64((current_date - timedelta(days=days)).date(), 'D')
+        for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items()
+    }
+    sketches_by_dam = {}
+    for position, dam in enumerate(dam_keys):
+        rows = order[bounds[position]:bounds[position + 1]]
+        dates = columns['date'][rows]
+        sketches = {}
+        for period_name, cutoff in cutoffs.items():
+            in_window = dates >= cutoff
+            for measure in dam_analysis.MEASURES:
+                sketch = QuantileSketch()
+                sketch.update(columns[measure][rows][in_window])
+                sketches[f'{measure}_{period_name}'] = sketch
+        sketches_by_dam[str(dam)] = sketches
+    return sketches_by_dam
+
+def distribution_from_sketches(sketches):
+    """
+    Turn per-window sketches into the <stat>_<measure>_<period> values stored in the analysis tables.
+    """
+    distribution = {}
+    for suffix, sketch in sketches.items():
+        for stat, value in sketch.stats().items():
+            distribution[f'{stat}_{suffix}'] = value
+    return distribution
+
+def merge_window_sketches(sketches_list):
+    """
+    Merge per-dam window sketches into cross-dam sketches.
+    """
+    merged = {}
+    for sketches in sketches_list:
+        for suffix, sketch in sketches.items():
+            merged.setdefault(suffix, QuantileSketch()).merge(sketch)
+    return merged
+
+def build_upsert_query(table_name, key_columns, value_columns=dam_analysis.AVERAGE_COLUMNS):
+    """
+    Build an INSERT ... ON DUPLICATE KEY UPDATE statement for an analysis table.
+    Columns not in value_columns are left untouched on existing rows.
+    """
+    columns = key_columns + value_columns
+    updates = ',\n            '.join(f"{column} = VALUES({column})" for column in value_columns)
+    return f"""
+        INSERT INTO {table_name} ({', '.join(columns)})
+        VALUES ({', '.join(['%s'] * len(columns))})
+        ON DUPLICATE KEY UPDATE
+            {updates}
+    """
+
+def write_dam_analysis(connection, totals_by_dam, current_date, dam_ids, sketches_by_dam=None):
+    """
+    Upsert the specific analysis for dam_ids and the cross-dam overall analysis in one transaction,
+    using batched multi-row inserts.
+    With sketches_by_dam, the distribution statistics are written too; otherwise they are left as they are.
+    """
+    analysis_date = current_date.strftime('%Y-%m-%d')
+    value_columns = dam_analysis.AVERAGE_COLUMNS + (dam_analysis.DISTRIBUTION_COLUMNS if sketches_by_dam is not None else [])
+
+    def result_values(totals, sketches):
+        values = dam_analysis.averages_from_totals(totals)
+        if sketches_by_dam is not None:
+            values.update(distribution_from_sketches(sketches))
+        return [values.get(column) for column in value_columns]
+
+    specific_rows = []
+    for dam_id in dam_ids:
+        sketches = (sketches_by_dam or {}).get(dam_id, {})
+        specific_rows.append((dam_id, analysis_date, *result_values(totals_by_dam.get(dam_id, {}), sketches)))
+
+    overall_sketches = merge_window_sketches((sketches_by_dam or {}).values())
+    overall_row = (analysis_date, *result_values(dam_analysis.combine_window_totals(totals_by_dam.values()), overall_sketches))
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                build_upsert_query('specific_dam_analysis', ['dam_id', 'analysis_date'], value_columns), specific_rows
+            )
+            cursor.execute(build_upsert_query('overall_dam_analysis', ['analysis_date'], value_columns), overall_row)
+        connection.commit()
+        logger.info(f"Successfully inserted/updated {len(specific_rows)} row(s) in 'specific_dam_analysis' and the 'overall_dam_analysis' row.")
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Error inserting/updating dam analysis results: {e}")
+        raise
+
+def run_analysis(connection, current_date, dam_id=None, fetch_size=10000, read_connection=None, history_archive=None):
+    """
+    Run the latest_dam_data_etl analysis in-process: stream the last 20 years of rows, compute
+    every window's totals and distribution sketches per dam, and write the specific and overall analysis.
+    Analyses every dam when dam_id is None. Rows are streamed through read_connection when given,
+    e.g. a read replica, and the results are always written through connection. With history_archive,
+    complete years are decoded from their time-series archives instead of being read from MySQL.
+    """
+    start_date = (current_date - timedelta(days=max(dam_analysis.ANALYSIS_WINDOWS.values()))).strftime('%Y-%m-%d')
+    if history_archive:
+        columns = read_history_columns(read_connection or connection, start_date, dam_id, fetch_size, history_archive, current_date.year)
+    else:
+        columns = read_dam_resource_columns(read_connection or connection, start_date, dam_id, fetch_size)
+    totals_by_dam = compute_window_totals(columns, current_date)
+    sketches_by_dam = compute_window_sketches(columns, current_date)
+    dam_ids = [dam_id] if dam_id else sorted(totals_by_dam)
+    write_dam_analysis(connection, totals_by_dam, current_date, dam_ids, sketches_by_dam)
+    return len(dam_ids)
+
+def ensure_incremental_tables(connection):
+    """
+    Create the watermark and running-totals tables used by the incremental analysis if they do not exist.
+    Watermarks are load sequence numbers (see dam_load_sequence); tables from before that switch get the
+    column added, and their first run picks up every load stamped since.
+    """
+    total_columns = ',\n'.join(
+        f"                sum_{measure} DOUBLE NULL,\n                count_{measure} INT NOT NULL DEFAULT 0"
+        for measure in dam_analysis.MEASURES
+    )
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dam_analysis_watermarks (
+                dam_id VARCHAR(20) NOT NULL PRIMARY KEY,
+                last_processed_date DATE NOT NULL,
+                last_load_seq BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS dam_analysis_running_totals (
+                dam_id VARCHAR(20) NOT NULL,
+                period_name VARCHAR(20) NOT NULL,
+                window_start DATE NOT NULL,
+{total_columns},
+                PRIMARY KEY (dam_id, period_name)
+            )
+        """)
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'dam_analysis_watermarks'
+        """)
+        existing = {row[0] for row in cursor.fetchall()}
+        if 'last_load_seq' not in existing:
+            changes = ["ADD COLUMN last_load_seq BIGINT NOT NULL DEFAULT 0"]
+            if 'last_loaded_at' in existing:
+                changes.append("DROP COLUMN last_loaded_at")
+            cursor.execute(f"ALTER TABLE dam_analysis_watermarks {', '.join(changes)}")
+    connection.commit()
+    dam_load_sequence.ensure_load_sequence_table(connection)
+
+def read_watermarks(connection):
+    """
+    Read the per-dam watermarks as a dict of dam_id to (last_processed_date, last_load_seq).
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SELECT dam_id, last_processed_date, last_load_seq FROM dam_analysis_watermarks")
+        return {str(row[0]): (row[1], row[2]) for row in cursor.fetchall()}
+
+def read_running_totals(connection):
+    """
+    Read the persisted running totals as a dict of dam_id to {'window_starts': {...}, 'totals': {...}}.
+    """
+    columns = ', '.join(f"sum_{m}, count_{m}" for m in dam_analysis.MEASURES)
+    running = {}
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(f"SELECT dam_id, period_name, window_start, {columns} FROM dam_analysis_running_totals")
+        for row in cursor.fetchall():
+            entry = running.setdefault(str(row[0]), {'window_starts': {}, 'totals': {}})
+            period_name = row[1]
+            entry['window_starts'][period_name] = row[2]
+            for index, measure in enumerate(dam_analysis.MEASURES):
+                sum_value = row[3 + 2 * index]
+                entry['totals'][f'sum_{measure}_{period_name}'] = float(sum_value) if sum_value is not None else 0.0
+                entry['totals'][f'count_{measure}_{period_name}'] = int(row[4 + 2 * index])
+    return running
+
+def read_daily_rollup_rows(connection, where_clause, params):
+    """
+    Read rows of 'dam_resources_daily_rollup' as dicts with dam_id, date, load_seq and each measure's sum and count.
+    """
+    columns = ', '.join(f"sum_{m}, count_{m}" for m in dam_analysis.MEASURES)
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(f"SELECT dam_id, date, load_seq, {columns} FROM dam_resources_daily_rollup WHERE {where_clause}", params)
+        rows = cursor.fetchall()
+    for row in rows:
+        row['dam_id'] = str(row['dam_id'])
+    return rows
+
+def apply_daily_row(totals, row, period_name, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one daily rollup row from a window's running totals.
+    """
+    for measure in dam_analysis.MEASURES:
+        if row[f'sum_{measure}'] is not None:
+            totals[f'sum_{measure}_{period_name}'] += sign * float(row[f'sum_{measure}'])
+        totals[f'count_{measure}_{period_name}'] += sign * int(row[f'count_{measure}'])
+
+def write_incremental_state(connection, running, watermarks, dam_ids):
+    """
+    Upsert the running totals and watermarks of dam_ids on the caller's transaction.
+    """
+    total_columns = [f"{kind}_{m}" for m in dam_analysis.MEASURES for kind in ('sum', 'count')]
+    totals_query = f"""
+        INSERT INTO dam_analysis_running_totals (dam_id, period_name, window_start, {', '.join(total_columns)})
+        VALUES ({', '.join(['%s'] * (3 + len(total_columns)))})
+        ON DUPLICATE KEY UPDATE window_start = VALUES(window_start),
+            {', '.join(f"{column} = VALUES({column})" for column in total_columns)}
+    """
+    totals_rows = []
+    for dam_id in dam_ids:
+        entry = running[dam_id]
+        for period_name in dam_analysis.ANALYSIS_WINDOWS:
+            values = [entry['totals'][f"{column}_{period_name}"] for column in total_columns]
+            totals_rows.append((dam_id, period_name, entry['window_starts'][period_name], *values))
+
+    watermark_query = """
+        INSERT INTO dam_analysis_watermarks (dam_id, last_processed_date, last_load_seq)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_processed_date = VALUES(last_processed_date), last_load_seq = VALUES(last_load_seq)
+    """
+    watermark_rows = [(dam_id, *watermarks[dam_id]) for dam_id in dam_ids]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(totals_query, totals_rows)
+        cursor.executemany(watermark_query, watermark_rows)
+
+def recompute_dams(connection, window_starts, horizon, dam_ids=None):
+    """
+    Fully recompute running totals and watermarks from 'dam_resources_daily_rollup', for dam_ids or for
+    every dam when None, with one grouped query. The rollup is also where incremental runs read new and
+    expired days, so the dam set, the totals and later subtractions all come from the same rows.
+    horizon is the load sequence number read in the same transaction, so the rows read are exactly the
+    loads up to it. Returns (running, watermarks) for the recomputed dams.
+    """
+    select_columns = []
+    params = []
+    for period_name, window_start in window_starts.items():
+        for measure in dam_analysis.MEASURES:
+            for kind in ('sum', 'count'):
+                select_columns.append(
+                    f"COALESCE(SUM(CASE WHEN date >= %s THEN {kind}_{measure} END), 0) AS {kind}_{measure}_{period_name}"
+                )
+                params.append(window_start)
+    dam_filter = f"WHERE dam_id IN ({', '.join(['%s'] * len(dam_ids))})" if dam_ids else ""
+    params.extend(dam_ids or [])
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(f"""
+            SELECT dam_id, MAX(date) AS last_date, {', '.join(select_columns)}
+            FROM dam_resources_daily_rollup
+            {dam_filter}
+            GROUP BY dam_id
+        """, params)
+        rows = cursor.fetchall()
+
+    running = {}
+    watermarks = {}
+    for row in rows:
+        dam_id = str(row.pop('dam_id'))
+        last_date = row.pop('last_date')
+        totals = {
+            column: float(value) if column.startswith('sum_') else int(value)
+            for column, value in row.items()
+        }
+        running[dam_id] = {'window_starts': dict(window_starts), 'totals': totals}
+        watermarks[dam_id] = (last_date, horizon)
+    logger.info(f"Fully recomputed running totals for {len(running)} dam(s).")
+    return running, watermarks
+
+def run_incremental_analysis(connection, current_date):
+    """
+    Update the analysis from rows loaded since each dam's watermark instead of rescanning 20 years.
+    New days are added to the persisted running totals and days that slid out of a window are
+    subtracted. A dam falls back to a full recompute when it has no watermark yet or when a row
+    dated on or before its last processed date was loaded since (late or corrected data).
+    Watermarks are load sequence numbers rather than load times: a loader transaction can commit after
+    a later-stamped one, but never after a transaction with a higher sequence number. Everything runs
+    in one transaction, so the rows read are exactly the loads up to the horizon read at the start.
+    Running totals only yield averages: the distribution columns of the rows written here stay NULL,
+    and are filled by full runs (run_analysis).
+    """
+    ensure_incremental_tables(connection)
+    horizon = dam_load_sequence.get_load_horizon(connection)
+    window_starts = {
+        period_name: (current_date - timedelta(days=days)).date()
+        for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items()
+    }
+    watermarks = read_watermarks(connection)
+    running = read_running_totals(connection)
+
+    if not watermarks:
+        logger.info("No watermarks found. Running a full recompute for all dams.")
+        running, watermarks = recompute_dams(connection, window_starts, horizon)
+        recomputed = sorted(running)
+    else:
+        # Rows loaded since the oldest watermark; each dam then filters on its own watermark
+        since = min(last_load_seq for _, last_load_seq in watermarks.values())
+        changed_rows = read_daily_rollup_rows(connection, "load_seq > %s AND load_seq <= %s", [since, horizon])
+
+        full_dams = {dam_id for dam_id in watermarks if dam_id not in running}
+        new_rows = {}
+        for row in changed_rows:
+            watermark = watermarks.get(row['dam_id'])
+            if watermark is None:
+                full_dams.add(row['dam_id'])
+            elif row['load_seq'] <= watermark[1]:
+                continue
+            elif row['date'] <= watermark[0]:
+                full_dams.add(row['dam_id'])
+            else:
+                new_rows.setdefault(row['dam_id'], []).append(row)
+        incremental_dams = sorted(set(running) - full_dams)
+        logger.info(f"Loaded rows since watermark: {len(changed_rows)}. Incremental dams: {len(incremental_dams)}, full recomputes: {len(full_dams)}.")
+
+        # Days that slid out of a window since the last run
+        expired_rows = {}
+        if incremental_dams:
+            oldest_start = min(min(running[dam_id]['window_starts'].values()) for dam_id in incremental_dams)
+            placeholders = ', '.join(['%s'] * len(incremental_dams))
+            for row in read_daily_rollup_rows(
+                connection,
+                f"dam_id IN ({placeholders}) AND date >= %s AND date < %s",
+                incremental_dams + [oldest_start, max(window_starts.values())]
+            ):
+                expired_rows.setdefault(row['dam_id'], []).append(row)
+
+        for dam_id in incremental_dams:
+            entry = running[dam_id]
+            last_processed_date = watermarks[dam_id][0]
+            for period_name, new_start in window_starts.items():
+                old_start = entry['window_starts'][period_name]
+                for row in expired_rows.get(dam_id, []):
+                    if old_start <= row['date'] < new_start and row['date'] <= last_processed_date:
+                        apply_daily_row(entry['totals'], row, period_name, -1)
+                for row in new_rows.get(dam_id, []):
+                    if row['date'] >= new_start:
+                        apply_daily_row(entry['totals'], row, period_name, 1)
+                entry['window_starts'][period_name] = max(old_start, new_start)
+            for row in new_rows.get(dam_id, []):
+                last_processed_date = max(last_processed_date, row['date'])
+            watermarks[dam_id] = (last_processed_date, horizon)
+
+        recomputed = incremental_dams
+        if full_dams:
+            full_running, full_watermarks = recompute_dams(
+                connection, window_starts, horizon, sorted(full_dams)
+            )
+            running.update(full_running)
+            watermarks.update(full_watermarks)
+            recomputed = sorted(set(incremental_dams) | set(full_running))
+
+    # Persist state and results together so a failed run leaves the previous watermarks in place
+    try:
+        write_incremental_state(connection, running, watermarks, recomputed)
+        totals_by_dam = {dam_id: entry['totals'] for dam_id, entry in running.items()}
+        write_dam_analysis(connection, totals_by_dam, current_date, sorted(totals_by_dam))
+    except Exception:
+        connection.rollback()
+        raise
+    return len(totals_by_dam)
+
+def main():
+    """
+    Entry point for running the engine as a Glue Python shell job.
+    """
+    from awsglue.utils import getResolvedOptions
+
+    logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.info("Starting Glue Python shell job 'latest_dam_data_etl_shell'.")
+
+    args = getResolvedOptions(sys.argv, ['DB_HOST', 'DB_PORT', 'DB_NAME', 'DB_USER', 'DB_PASSWORD'])
+    dam_id = None
+    if '--DAM_ID' in sys.argv:
+        dam_id = getResolvedOptions(sys.argv, ['DAM_ID'])['DAM_ID']
+    incremental = False
+    if '--INCREMENTAL' in sys.argv:
+        incremental = getResolvedOptions(sys.argv, ['INCREMENTAL'])['INCREMENTAL'].lower() == 'true'
+    replica_host = None
+    if '--REPLICA_HOST' in sys.argv:
+        replica_host = getResolvedOptions(sys.argv, ['REPLICA_HOST'])['REPLICA_HOST'] or None
+    history_archive = None
+    if '--HISTORY_ARCHIVE' in sys.argv:
+        history_archive = getResolvedOptions(sys.argv, ['HISTORY_ARCHIVE'])['HISTORY_ARCHIVE'] or None
+    max_replica_lag = None
+    if '--REPLICA_MAX_LAG_SECONDS' in sys.argv:
+        max_replica_lag = getResolvedOptions(sys.argv, ['REPLICA_MAX_LAG_SECONDS'])['REPLICA_MAX_LAG_SECONDS'] or None
+
+    primary_settings = {
+        'host': args['DB_HOST'],
+        'port': int(args['DB_PORT']),
+        'user': args['DB_USER'],
+        'password': args['DB_PASSWORD'],
+        'database': args['DB_NAME']
+    }
+    replica_settings = {**primary_settings, 'host': replica_host} if replica_host else None
+
+    try:
+        router = dam_db.get_router(primary_settings, replica_settings, int(max_replica_lag) if max_replica_lag else None)
+        connection = router.primary.acquire()
+        logger.info(f"Connected to the database '{args['DB_NAME']}'.")
+        if incremental:
+            # The incremental path reads rows by load watermark, so it must see the primary's latest writes
+            analysed = run_incremental_analysis(connection, datetime.now())
+        else:
+            with router.reader() as read_connection:
+                analysed = run_analysis(
+                    connection, datetime.now(), dam_id, read_connection=read_connection, history_archive=history_archive
+                )
+        logger.info(f"Analysed {analysed} dam(s).")
+    except Exception as e:
+        logger.error(f"An error occurred during the analysis: {e}")
+        sys.exit(1)
+    finally:
+        if 'connection' in locals():
+            dam_db.release(connection)
+            router.close_all()
+            logger.info("Database connection closed.")
+
+    logger.info("Glue Python shell job 'latest_dam_data_etl_shell' completed successfully.")
+
+if __name__ == "__main__":
+    main()
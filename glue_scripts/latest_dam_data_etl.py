@@ -1,18 +1,43 @@
 # glue_scripts/latest_dam_data_etl.py
 
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import avg, col, to_date, lit
+from pyspark.sql.functions import (
+    avg, col, count, countDistinct, to_date, lit, when, year, percentile_approx,
+    max as spark_max, min as spark_min, sum as spark_sum
+)
 import sys
+import math
 import logging
 from awsglue.utils import getResolvedOptions
 from datetime import datetime, timedelta
 import pymysql
+import dam_db  # Shipped to the driver and executors with --extra-py-files
+import dam_load_sequence  # Shipped to the driver and executors with --extra-py-files
+import dam_analysis  # Shipped to the driver and executors with --extra-py-files
 
 # Initialize logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 
+# Relative error of percentile_approx is about 1 / PERCENTILE_ACCURACY
+PERCENTILE_ACCURACY = 10000
+
+# Rough in-memory size of one dam_resources row, used to pick a storage level for the cached source
+ESTIMATED_ROW_BYTES = 128
+
+# Rows per multi-row INSERT when writing analysis results
+RESULT_WRITE_BATCH_SIZE = 500
+
+def get_optional_args(defaults):
+    """
+    Resolve optional job arguments, falling back to the given defaults when they are not passed.
+    """
+    present = [name for name in defaults if f'--{name}' in sys.argv]
+    resolved = getResolvedOptions(sys.argv, present) if present else {}
+    return {name: resolved.get(name, default) for name, default in defaults.items()}
+
 def get_recent_data_from_table(connection, table_name, limit=10):
     """
     Query the most recent rows from a given table.
@@ -27,168 +52,734 @@ def get_recent_data_from_table(connection, table_name, limit=10):
         logger.error(f"Error fetching data from {table_name}: {e}")
         return []
 
-def insert_or_update_specific_dam_analysis(connection, result_dict):
+def build_analysis_upsert(table_name, key_columns):
     """
-    Insert or update the specific_dam_analysis table with the latest analysis results.
+    Build an INSERT ... ON DUPLICATE KEY UPDATE statement writing every analysis column of an analysis table.
     """
-    insert_query = """
-        INSERT INTO specific_dam_analysis (
-            dam_id, analysis_date,
-            avg_storage_volume_12_months, avg_storage_volume_5_years, avg_storage_volume_20_years,
-            avg_percentage_full_12_months, avg_percentage_full_5_years, avg_percentage_full_20_years,
-            avg_storage_inflow_12_months, avg_storage_inflow_5_years, avg_storage_inflow_20_years,
-            avg_storage_release_12_months, avg_storage_release_5_years, avg_storage_release_20_years
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            avg_storage_volume_12_months = VALUES(avg_storage_volume_12_months),
-            avg_storage_volume_5_years = VALUES(avg_storage_volume_5_years),
-            avg_storage_volume_20_years = VALUES(avg_storage_volume_20_years),
-            avg_percentage_full_12_months = VALUES(avg_percentage_full_12_months),
-            avg_percentage_full_5_years = VALUES(avg_percentage_full_5_years),
-            avg_percentage_full_20_years = VALUES(avg_percentage_full_20_years),
-            avg_storage_inflow_12_months = VALUES(avg_storage_inflow_12_months),
-            avg_storage_inflow_5_years = VALUES(avg_storage_inflow_5_years),
-            avg_storage_inflow_20_years = VALUES(avg_storage_inflow_20_years),
-            avg_storage_release_12_months = VALUES(avg_storage_release_12_months),
-            avg_storage_release_5_years = VALUES(avg_storage_release_5_years),
-            avg_storage_release_20_years = VALUES(avg_storage_release_20_years)
+    columns = key_columns + dam_analysis.ANALYSIS_COLUMNS
+    updates = ',\n        '.join(f"{column} = VALUES({column})" for column in dam_analysis.ANALYSIS_COLUMNS)
+    return f"""
+    INSERT INTO {table_name} ({', '.join(columns)})
+    VALUES ({', '.join(['%s'] * len(columns))})
+    ON DUPLICATE KEY UPDATE
+        {updates}
+"""
+
+SPECIFIC_DAM_ANALYSIS_UPSERT = build_analysis_upsert('specific_dam_analysis', ['dam_id', 'analysis_date'])
+OVERALL_DAM_ANALYSIS_UPSERT = build_analysis_upsert('overall_dam_analysis', ['analysis_date'])
+
+def specific_dam_analysis_params(result_dict):
+    """
+    Build the parameter tuple for SPECIFIC_DAM_ANALYSIS_UPSERT from a result dictionary.
+    Statistics missing from the result, e.g. distributions in pushdown mode, are written as NULL.
+    """
+    return (
+        result_dict['dam_id'],
+        result_dict['analysis_date'],
+        *[result_dict.get(column) for column in dam_analysis.ANALYSIS_COLUMNS]
+    )
+
+def overall_dam_analysis_params(result_dict):
+    """
+    Build the parameter tuple for OVERALL_DAM_ANALYSIS_UPSERT from a result dictionary.
+    """
+    return specific_dam_analysis_params({'dam_id': None, **result_dict})[1:]
+
+def iterate_result_rows(results):
+    """
+    Yield result dictionaries from a Spark DataFrame (streamed to the driver a partition at a time)
+    or from any iterable of dictionaries.
+    """
+    if hasattr(results, 'toLocalIterator'):
+        for row in results.toLocalIterator():
+            yield row.asDict()
+    else:
+        yield from results
+
+def upsert_in_batches(cursor, query, params_iter, batch_size=RESULT_WRITE_BATCH_SIZE):
+    """
+    Run executemany over params_iter in chunks of batch_size and return the number of rows written.
+    pymysql turns each executemany of an INSERT ... VALUES into multi-row INSERT statements.
+    """
+    written = 0
+    batch = []
+    for params in params_iter:
+        batch.append(params)
+        if len(batch) >= batch_size:
+            cursor.executemany(query, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(query, batch)
+        written += len(batch)
+    return written
+
+def write_analysis_results(connection, specific_results=(), overall_result=None, batch_size=RESULT_WRITE_BATCH_SIZE):
+    """
+    Upsert specific_dam_analysis results and, optionally, the overall_dam_analysis row in a single transaction.
+    specific_results may be a Spark DataFrame or an iterable of result dictionaries.
     """
     try:
         with connection.cursor() as cursor:
-            cursor.execute(
-                insert_query,
-                (
-                    result_dict['dam_id'],
-                    result_dict['analysis_date'],
-                    result_dict.get('avg_storage_volume_12_months'),
-                    result_dict.get('avg_storage_volume_5_years'),
-                    result_dict.get('avg_storage_volume_20_years'),
-                    result_dict.get('avg_percentage_full_12_months'),
-                    result_dict.get('avg_percentage_full_5_years'),
-                    result_dict.get('avg_percentage_full_20_years'),
-                    result_dict.get('avg_storage_inflow_12_months'),
-                    result_dict.get('avg_storage_inflow_5_years'),
-                    result_dict.get('avg_storage_inflow_20_years'),
-                    result_dict.get('avg_storage_release_12_months'),
-                    result_dict.get('avg_storage_release_5_years'),
-                    result_dict.get('avg_storage_release_20_years')
-                )
+            written = upsert_in_batches(
+                cursor, SPECIFIC_DAM_ANALYSIS_UPSERT,
+                (specific_dam_analysis_params(r) for r in iterate_result_rows(specific_results)),
+                batch_size
             )
-            connection.commit()
-            logger.info("Successfully inserted/updated the analysis results in 'specific_dam_analysis' table.")
+            if overall_result is not None:
+                cursor.execute(OVERALL_DAM_ANALYSIS_UPSERT, overall_dam_analysis_params(overall_result))
+        connection.commit()
+        logger.info(
+            f"Successfully inserted/updated {written} row(s) in 'specific_dam_analysis'"
+            f"{' and the overall_dam_analysis row' if overall_result is not None else ''}."
+        )
+        return written
     except Exception as e:
-        logger.error(f"Error inserting/updating data in 'specific_dam_analysis': {e}")
+        connection.rollback()
+        logger.error(f"Error inserting/updating dam analysis results: {e}")
         raise
 
-def compute_overall_averages(dam_data_df, current_date):
+def write_specific_analysis_partitions(results_df, db_params, batch_size=RESULT_WRITE_BATCH_SIZE):
+    """
+    Upsert a large specific_dam_analysis DataFrame from the executors with foreachPartition.
+    Each partition commits its rows as one transaction on a connection from its executor's pool,
+    which reused Python workers keep across partitions.
+    """
+    def write_partition(rows):
+        with dam_db.get_pool(**db_params).connection() as connection:
+            write_analysis_results(connection, (row.asDict() for row in rows), batch_size=batch_size)
+
+    results_df.foreachPartition(write_partition)
+    logger.info("Wrote specific_dam_analysis results from the executors.")
+
+def insert_or_update_specific_dam_analysis(connection, result_dict):
+    """
+    Insert or update the specific_dam_analysis table with the latest analysis results.
+    """
+    write_analysis_results(connection, [result_dict])
+
+def insert_or_update_specific_dam_analyses(connection, results):
+    """
+    Insert or update the specific_dam_analysis table for many dams in one batched write and a single commit.
+    """
+    write_analysis_results(connection, results)
+
+def build_distribution_aggregations(current_date):
+    """
+    Build min, max and approximate quantile expressions for every analysis window and measure.
+    percentile_approx keeps one mergeable sketch per group, so these run in the same pass as the averages.
+    """
+    aggregations = []
+    for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+        in_window = col('date') >= lit((current_date - timedelta(days=days)).strftime('%Y-%m-%d'))
+        for measure in dam_analysis.MEASURES:
+            values = when(in_window, col(measure))
+            aggregations.append(spark_min(values).alias(f'min_{measure}_{period_name}'))
+            aggregations.append(spark_max(values).alias(f'max_{measure}_{period_name}'))
+            aggregations.append(
+                percentile_approx(values, list(dam_analysis.QUANTILES.values()), PERCENTILE_ACCURACY)
+                .alias(f'quantiles_{measure}_{period_name}')
+            )
+    return aggregations
+
+def expand_quantiles(result):
+    """
+    Split the quantiles_<measure>_<period> arrays of an aggregated row into the p10/median/p90 entries.
+    """
+    expanded = {}
+    for key, value in result.items():
+        if key.startswith('quantiles_'):
+            suffix = key[len('quantiles_'):]
+            for position, stat in enumerate(dam_analysis.QUANTILES):
+                expanded[f'{stat}_{suffix}'] = value[position] if value else None
+        else:
+            expanded[key] = value
+    return expanded
+
+def build_window_aggregations(current_date, include_counts=False, include_distribution=False):
+    """
+    Build conditional aggregate expressions covering every analysis window and measure,
+    plus, when include_counts is set, the number of records in each window and, when
+    include_distribution is set, the distribution statistics.
+    """
+    aggregations = [count(lit(1)).alias('record_count')] if include_counts else []
+    for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+        in_window = col('date') >= lit((current_date - timedelta(days=days)).strftime('%Y-%m-%d'))
+        if include_counts:
+            aggregations.append(count(when(in_window, True)).alias(f'records_{period_name}'))
+        for measure in dam_analysis.MEASURES:
+            aggregations.append(avg(when(in_window, col(measure))).alias(f'avg_{measure}_{period_name}'))
+    if include_distribution:
+        aggregations.extend(build_distribution_aggregations(current_date))
+    return aggregations
+
+def compute_window_averages(dam_data_df, current_date, log_counts=False, include_distribution=False):
+    """
+    Compute the averages for every time period in a single aggregation over the DataFrame.
+    With log_counts, record counts come out of the same pass and are logged rather than returned.
+    With include_distribution, min, max and approximate quantiles are returned alongside the averages.
+    """
+    logger.info("Computing averages for all time periods in a single pass.")
+    aggregations = build_window_aggregations(current_date, log_counts, include_distribution)
+    averages = expand_quantiles(dam_data_df.agg(*aggregations).collect()[0].asDict())
+
+    if log_counts:
+        logger.info(f"Number of records aggregated: {averages.pop('record_count')}")
+        for period_name in dam_analysis.ANALYSIS_WINDOWS:
+            logger.info(f"Records for last {period_name.replace('_', ' ')}: {averages.pop(f'records_{period_name}')}")
+    return averages
+
+def compute_overall_averages(dam_data_df, current_date, window_averages=None):
     """
     Compute overall averages across all dams for specified time periods.
+    Pass window_averages when they have already been computed from the same DataFrame to avoid another scan.
     """
     logger.info("Computing overall averages across all dams.")
-    
-    # Define time periods
-    date_12_months_ago = current_date - timedelta(days=365)
-    date_5_years_ago = current_date - timedelta(days=5*365)
-    date_20_years_ago = current_date - timedelta(days=20*365)
-    
-    # Filter data for each time period
-    dam_data_12_months = dam_data_df.filter(col('date') >= lit(date_12_months_ago.strftime('%Y-%m-%d')))
-    dam_data_5_years = dam_data_df.filter(col('date') >= lit(date_5_years_ago.strftime('%Y-%m-%d')))
-    dam_data_20_years = dam_data_df.filter(col('date') >= lit(date_20_years_ago.strftime('%Y-%m-%d')))
-    
-    logger.info(f"Records for last 12 months: {dam_data_12_months.count()}")
-    logger.info(f"Records for last 5 years: {dam_data_5_years.count()}")
-    logger.info(f"Records for last 20 years: {dam_data_20_years.count()}")
-    
-    # Function to compute averages
-    def compute_avg(df, period_name):
-        logger.info(f"Computing averages for {period_name}")
-        return df.agg(
-            avg('storage_volume').alias(f'avg_storage_volume_{period_name}'),
-            avg('percentage_full').alias(f'avg_percentage_full_{period_name}'),
-            avg('storage_inflow').alias(f'avg_storage_inflow_{period_name}'),
-            avg('storage_release').alias(f'avg_storage_release_{period_name}')
-        ).collect()[0].asDict()
-    
-    # Compute averages
-    avg_12_months = compute_avg(dam_data_12_months, '12_months')
-    avg_5_years = compute_avg(dam_data_5_years, '5_years')
-    avg_20_years = compute_avg(dam_data_20_years, '20_years')
-    
+
+    if window_averages is None:
+        window_averages = compute_window_averages(dam_data_df, current_date)
+
     # Prepare overall result
     overall_result = {
         'analysis_date': current_date.strftime('%Y-%m-%d'),
-        'avg_storage_volume_12_months': avg_12_months.get('avg_storage_volume_12_months'),
-        'avg_storage_volume_5_years': avg_5_years.get('avg_storage_volume_5_years'),
-        'avg_storage_volume_20_years': avg_20_years.get('avg_storage_volume_20_years'),
-        'avg_percentage_full_12_months': avg_12_months.get('avg_percentage_full_12_months'),
-        'avg_percentage_full_5_years': avg_5_years.get('avg_percentage_full_5_years'),
-        'avg_percentage_full_20_years': avg_20_years.get('avg_percentage_full_20_years'),
-        'avg_storage_inflow_12_months': avg_12_months.get('avg_storage_inflow_12_months'),
-        'avg_storage_inflow_5_years': avg_5_years.get('avg_storage_inflow_5_years'),
-        'avg_storage_inflow_20_years': avg_20_years.get('avg_storage_inflow_20_years'),
-        'avg_storage_release_12_months': avg_12_months.get('avg_storage_release_12_months'),
-        'avg_storage_release_5_years': avg_5_years.get('avg_storage_release_5_years'),
-        'avg_storage_release_20_years': avg_20_years.get('avg_storage_release_20_years')
+        **window_averages
     }
-    
+
     logger.info(f"Computed overall averages: {overall_result}")
-    
+
     return overall_result
 
+def build_window_totals(current_date):
+    """
+    Build sum and non-null count expressions for every analysis window and measure.
+    Unlike averages, totals can be combined across dams.
+    """
+    aggregations = []
+    for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+        in_window = col('date') >= lit((current_date - timedelta(days=days)).strftime('%Y-%m-%d'))
+        for measure in dam_analysis.MEASURES:
+            aggregations.append(spark_sum(when(in_window, col(measure))).alias(f'sum_{measure}_{period_name}'))
+            aggregations.append(count(when(in_window, col(measure))).alias(f'count_{measure}_{period_name}'))
+    return aggregations
+
+def build_dam_window_stats_df(dam_data_df, current_date, include_distribution=False):
+    """
+    Aggregate every window's totals, and optionally distribution statistics, per dam.
+    With include_distribution, rollup adds a row with a null dam_id holding the cross-dam
+    statistics, since quantiles cannot be combined from the per-dam results.
+    """
+    if include_distribution:
+        aggregations = build_window_totals(current_date) + build_distribution_aggregations(current_date)
+        return dam_data_df.rollup('dam_id').agg(*aggregations)
+    return dam_data_df.groupBy('dam_id').agg(*build_window_totals(current_date))
+
+def compute_dam_window_totals(dam_data_df, current_date, include_distribution=False):
+    """
+    Compute every window's totals for every dam with a single pass over the DataFrame.
+    Returns a dict of dam_id to totals, and the cross-dam distribution statistics
+    (None unless include_distribution is set).
+    """
+    logger.info("Computing window totals for all dams in a single pass.")
+    rows = build_dam_window_stats_df(dam_data_df, current_date, include_distribution).collect()
+
+    totals_by_dam = {}
+    overall_distribution = None
+    for row in rows:
+        stats = expand_quantiles({key: value for key, value in row.asDict().items() if key != 'dam_id'})
+        if row['dam_id'] is None:
+            overall_distribution = {column: stats.get(column) for column in dam_analysis.DISTRIBUTION_COLUMNS}
+        else:
+            totals_by_dam[str(row['dam_id'])] = stats
+    return totals_by_dam, overall_distribution
+
+def build_specific_results_df(totals_df, current_date):
+    """
+    Turn a per-dam window totals DataFrame into specific_dam_analysis result rows without collecting it,
+    carrying over distribution statistics when the DataFrame has them.
+    """
+    averages = [
+        (col(f'sum_{measure}_{period_name}') / col(f'count_{measure}_{period_name}')).alias(f'avg_{measure}_{period_name}')
+        for period_name in dam_analysis.ANALYSIS_WINDOWS for measure in dam_analysis.MEASURES
+    ]
+    distribution = []
+    if 'min_storage_volume_12_months' in totals_df.columns:
+        for measure in dam_analysis.MEASURES:
+            for period_name in dam_analysis.ANALYSIS_WINDOWS:
+                suffix = f'{measure}_{period_name}'
+                distribution.append(col(f'min_{suffix}'))
+                distribution.append(col(f'max_{suffix}'))
+                for position, stat in enumerate(dam_analysis.QUANTILES):
+                    distribution.append(col(f'quantiles_{suffix}')[position].alias(f'{stat}_{suffix}'))
+    return totals_df.select(
+        col('dam_id').cast('string').alias('dam_id'),
+        lit(current_date.strftime('%Y-%m-%d')).alias('analysis_date'),
+        *averages,
+        *distribution
+    )
+
+def first_full_month_start(cutoff_date):
+    """
+    Return the first day of the first calendar month that lies entirely on or after cutoff_date.
+    """
+    if cutoff_date.day == 1:
+        return cutoff_date
+    if cutoff_date.month == 12:
+        return cutoff_date.replace(year=cutoff_date.year + 1, month=1, day=1)
+    return cutoff_date.replace(month=cutoff_date.month + 1, day=1)
+
+def compute_rollup_window_totals(connection, current_date, dam_id=None):
+    """
+    Compute the 12-month, 5-year and 20-year window totals from the daily and monthly rollup tables.
+    Whole months come from 'dam_resources_monthly_rollup' and the partial month at the start of
+    each window from 'dam_resources_daily_rollup'. Returns a dict of dam_id to totals, covering
+    all dams when dam_id is None.
+    """
+    logger.info(f"Computing window totals from rollup tables for {'dam ' + dam_id if dam_id else 'all dams'}.")
+
+    windows = {}
+    for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+        cutoff_date = (current_date - timedelta(days=days)).date()
+        windows[period_name] = (cutoff_date, first_full_month_start(cutoff_date))
+
+    sum_columns = ', '.join(f"sum_{m}, count_{m}" for m in dam_analysis.MEASURES)
+    dam_filter = " AND dam_id = %s" if dam_id else ""
+    dam_params = [dam_id] if dam_id else []
+
+    monthly_query = f"""
+        SELECT dam_id, month_start AS period_start, {sum_columns}
+        FROM dam_resources_monthly_rollup
+        WHERE month_start >= %s{dam_filter}
+    """
+    daily_filter = ' OR '.join(["(date >= %s AND date < %s)"] * len(windows))
+    daily_query = f"""
+        SELECT dam_id, date AS period_start, {sum_columns}
+        FROM dam_resources_daily_rollup
+        WHERE ({daily_filter}){dam_filter}
+    """
+    daily_params = [bound for window in windows.values() for bound in window]
+
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(monthly_query, [min(month_start for _, month_start in windows.values())] + dam_params)
+        monthly_rows = cursor.fetchall()
+        cursor.execute(daily_query, daily_params + dam_params)
+        daily_rows = cursor.fetchall()
+    logger.info(f"Read {len(monthly_rows)} monthly and {len(daily_rows)} daily rollup rows.")
+
+    totals_by_dam = {}
+    for period_name, (cutoff_date, month_start) in windows.items():
+        rows = [row for row in monthly_rows if row['period_start'] >= month_start]
+        rows += [row for row in daily_rows if cutoff_date <= row['period_start'] < month_start]
+        for row in rows:
+            totals = totals_by_dam.setdefault(str(row['dam_id']), {})
+            for measure in dam_analysis.MEASURES:
+                sum_key = f'sum_{measure}_{period_name}'
+                count_key = f'count_{measure}_{period_name}'
+                if row[f'sum_{measure}'] is not None:
+                    totals[sum_key] = totals.get(sum_key, 0) + float(row[f'sum_{measure}'])
+                totals[count_key] = totals.get(count_key, 0) + int(row[f'count_{measure}'])
+    return totals_by_dam
+
+def get_source_stats(connection, dam_id, start_date):
+    """
+    Return the row count, dam count and date bounds of the dam_resources rows the job will read,
+    for one dam or, when dam_id is None, for all dams.
+    Runs against the (dam_id, date) key, so it is cheap compared to the JDBC read itself.
+    """
+    dam_filter = "dam_id = %s AND " if dam_id else ""
+    query = f"""
+        SELECT COUNT(*) AS row_count, COUNT(DISTINCT dam_id) AS dam_count,
+            MIN(date) AS min_date, MAX(date) AS max_date
+        FROM dam_resources
+        WHERE {dam_filter}date >= %s
+    """
+    params = (dam_id, start_date) if dam_id else (start_date,)
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+def choose_storage_level(row_count, memory_limit_mb):
+    """
+    Choose how to persist the source DataFrame from its estimated size.
+    Data that fits comfortably in executor memory stays deserialized; larger data is kept
+    serialized so it spills to disk instead of being re-read from RDS.
+    """
+    estimated_mb = row_count * ESTIMATED_ROW_BYTES / (1024 * 1024)
+    if estimated_mb <= memory_limit_mb:
+        return StorageLevel.MEMORY_AND_DISK_DESER
+    return StorageLevel.MEMORY_AND_DISK
+
+def read_dam_resources(spark, jdbc_url, query, connection_properties, source_stats, rows_per_partition):
+    """
+    Read dam_resources over JDBC, split into parallel range reads on 'date'.
+    Partition bounds come from source_stats, and the partition count from the expected row count,
+    capped at the cluster's default parallelism. Small reads fall back to a single connection.
+    """
+    reader = spark.read.format('jdbc').option('url', jdbc_url).option('dbtable', query)
+    for key, value in connection_properties.items():
+        reader = reader.option(key, value)
+
+    row_count = source_stats['row_count'] or 0
+    num_partitions = min(
+        max(1, math.ceil(row_count / rows_per_partition)),
+        spark.sparkContext.defaultParallelism
+    )
+    if num_partitions > 1 and source_stats['min_date'] and source_stats['max_date']:
+        upper_bound = source_stats['max_date'] + timedelta(days=1)
+        reader = (
+            reader.option('partitionColumn', 'date')
+            .option('lowerBound', source_stats['min_date'].strftime('%Y-%m-%d'))
+            .option('upperBound', upper_bound.strftime('%Y-%m-%d'))
+            .option('numPartitions', num_partitions)
+        )
+    logger.info(f"Reading {row_count} rows over {num_partitions} JDBC partition(s).")
+    return reader.load()
+
 def insert_or_update_overall_dam_analysis(connection, overall_result):
     """
     Insert or update the overall_dam_analysis table with the computed overall averages.
     """
-    insert_query = """
-        INSERT INTO overall_dam_analysis (
-            analysis_date,
-            avg_storage_volume_12_months, avg_storage_volume_5_years, avg_storage_volume_20_years,
-            avg_percentage_full_12_months, avg_percentage_full_5_years, avg_percentage_full_20_years,
-            avg_storage_inflow_12_months, avg_storage_inflow_5_years, avg_storage_inflow_20_years,
-            avg_storage_release_12_months, avg_storage_release_5_years, avg_storage_release_20_years
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            avg_storage_volume_12_months = VALUES(avg_storage_volume_12_months),
-            avg_storage_volume_5_years = VALUES(avg_storage_volume_5_years),
-            avg_storage_volume_20_years = VALUES(avg_storage_volume_20_years),
-            avg_percentage_full_12_months = VALUES(avg_percentage_full_12_months),
-            avg_percentage_full_5_years = VALUES(avg_percentage_full_5_years),
-            avg_percentage_full_20_years = VALUES(avg_percentage_full_20_years),
-            avg_storage_inflow_12_months = VALUES(avg_storage_inflow_12_months),
-            avg_storage_inflow_5_years = VALUES(avg_storage_inflow_5_years),
-            avg_storage_inflow_20_years = VALUES(avg_storage_inflow_20_years),
-            avg_storage_release_12_months = VALUES(avg_storage_release_12_months),
-            avg_storage_release_5_years = VALUES(avg_storage_release_5_years),
-            avg_storage_release_20_years = VALUES(avg_storage_release_20_years)
+    write_analysis_results(connection, overall_result=overall_result)
+
+def distribution_from_stats(stats):
     """
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute(
-                insert_query,
-                (
-                    overall_result['analysis_date'],
-                    overall_result.get('avg_storage_volume_12_months'),
-                    overall_result.get('avg_storage_volume_5_years'),
-                    overall_result.get('avg_storage_volume_20_years'),
-                    overall_result.get('avg_percentage_full_12_months'),
-                    overall_result.get('avg_percentage_full_5_years'),
-                    overall_result.get('avg_percentage_full_20_years'),
-                    overall_result.get('avg_storage_inflow_12_months'),
-                    overall_result.get('avg_storage_inflow_5_years'),
-                    overall_result.get('avg_storage_inflow_20_years'),
-                    overall_result.get('avg_storage_release_12_months'),
-                    overall_result.get('avg_storage_release_5_years'),
-                    overall_result.get('avg_storage_release_20_years')
+    Pick the distribution statistic columns out of a per-dam stats dict.
+    """
+    return {column: stats[column] for column in dam_analysis.DISTRIBUTION_COLUMNS if column in stats}
+
+def store_dam_analysis(connection, totals_by_dam, current_date, dam_ids, overall_distribution=None):
+    """
+    Store the specific analysis for dam_ids and the cross-dam overall analysis from per-dam window totals.
+    Distribution statistics in the per-dam stats, and overall_distribution, are stored as well.
+    Without overall_distribution, the overall min and max are combined from the per-dam values.
+    """
+    analysis_date = current_date.strftime('%Y-%m-%d')
+
+    specific_results = []
+    for dam_id in dam_ids:
+        stats = totals_by_dam.get(dam_id, {})
+        specific_results.append({
+            'dam_id': dam_id,
+            'analysis_date': analysis_date,
+            **dam_analysis.averages_from_totals(stats),
+            **distribution_from_stats(stats)
+        })
+    logger.info(f"Computed specific averages for {len(specific_results)} dam(s).")
+
+    overall_result = {
+        'analysis_date': analysis_date,
+        **dam_analysis.averages_from_totals(dam_analysis.combine_window_totals(
+            {key: value for key, value in stats.items() if key.startswith(('sum_', 'count_'))}
+            for stats in totals_by_dam.values()
+        )),
+        **(overall_distribution or dam_analysis.combine_window_extremes(totals_by_dam.values()))
+    }
+    logger.info(f"Computed overall averages: {overall_result}")
+    write_analysis_results(connection, specific_results, overall_result)
+
+def run_rollup_analysis(connection, current_date, dam_id=None, read_connection=None):
+    """
+    Compute and store the specific and overall dam analysis from the rollup tables without reading raw rows.
+    Analyses every dam when dam_id is None, or only dam_id; as with the raw and lake sources, the overall
+    analysis then covers that dam alone. The rollups are read through read_connection when given, e.g. a read replica.
+    """
+    totals_by_dam = compute_rollup_window_totals(read_connection or connection, current_date, dam_id)
+    dam_ids = [dam_id] if dam_id else sorted(totals_by_dam)
+    store_dam_analysis(connection, totals_by_dam, current_date, dam_ids)
+
+def compute_pushdown_window_totals(connection, current_date, start_date, dam_id=None):
+    """
+    Compute every window's totals, minimum and maximum inside MySQL with one grouped query and return
+    a dict of dam_id to stats. Window predicates compare the indexed 'date' column directly, so only the
+    result rows leave RDS. MySQL has no quantile aggregate, so compute_pushdown_quantiles adds p10, median and p90.
+    """
+    logger.info(f"Pushing window aggregation down to MySQL for {'dam ' + dam_id if dam_id else 'all dams'}.")
+
+    select_columns = []
+    params = []
+    for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+        cutoff_date = (current_date - timedelta(days=days)).strftime('%Y-%m-%d')
+        for measure in dam_analysis.MEASURES:
+            select_columns.append(f"SUM(CASE WHEN date >= %s THEN {measure} END) AS sum_{measure}_{period_name}")
+            select_columns.append(f"COUNT(CASE WHEN date >= %s THEN {measure} END) AS count_{measure}_{period_name}")
+            select_columns.append(f"MIN(CASE WHEN date >= %s THEN {measure} END) AS min_{measure}_{period_name}")
+            select_columns.append(f"MAX(CASE WHEN date >= %s THEN {measure} END) AS max_{measure}_{period_name}")
+            params.extend([cutoff_date] * 4)
+
+    dam_filter = "dam_id = %s AND " if dam_id else ""
+    query = f"""
+        SELECT dam_id, {', '.join(select_columns)}
+        FROM dam_resources
+        WHERE {dam_filter}date >= %s
+        GROUP BY dam_id
+    """
+    params.extend([dam_id, start_date] if dam_id else [start_date])
+
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    logger.info(f"Received {len(rows)} aggregated row(s) from MySQL.")
+    return {
+        str(row['dam_id']): {key: value for key, value in row.items() if key != 'dam_id'}
+        for row in rows
+    }
+
+def compute_pushdown_quantiles(connection, current_date, start_date, dam_id=None):
+    """
+    Compute the p10, median and p90 of every window and measure inside MySQL with window functions,
+    per dam and across the dams read, as a separate step after compute_pushdown_window_totals.
+    Each window and measure takes one sorted pass, so this only runs when DISTRIBUTION_STATS is on.
+    Quantiles are nearest-rank, so they are exact where Spark's percentile_approx is approximate.
+    Returns (dict of dam_id to quantile stats, overall quantile stats).
+    """
+    logger.info(f"Computing quantiles in MySQL for {'dam ' + dam_id if dam_id else 'all dams'}.")
+
+    dam_filter = "dam_id = %s AND " if dam_id else ""
+    quantiles_by_dam = {}
+    overall_quantiles = {}
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        for period_name, days in dam_analysis.ANALYSIS_WINDOWS.items():
+            # The totals query also stops at start_date
+            cutoff_date = max((current_date - timedelta(days=days)).strftime('%Y-%m-%d'), start_date)
+            params = [dam_id, cutoff_date] if dam_id else [cutoff_date]
+            for measure in dam_analysis.MEASURES:
+                picks = ', '.join(
+                    f"MAX(CASE WHEN row_rank = GREATEST(CEIL(row_total * {fraction}), 1) THEN value END) AS {stat}_{measure}_{period_name}"
+                    for stat, fraction in dam_analysis.QUANTILES.items()
                 )
+                # Ranked per dam for the specific analysis, then across every dam read for the overall one
+                for partition in ('PARTITION BY dam_id', ''):
+                    cursor.execute(f"""
+                        SELECT {'dam_id, ' if partition else ''}{picks}
+                        FROM (
+                            SELECT dam_id, {measure} AS value,
+                                ROW_NUMBER() OVER ({partition} ORDER BY {measure}) AS row_rank,
+                                COUNT(*) OVER ({partition}) AS row_total
+                            FROM dam_resources
+                            WHERE {dam_filter}date >= %s AND {measure} IS NOT NULL
+                        ) ranked
+                        {'GROUP BY dam_id' if partition else ''}
+                    """, params)
+                    for row in cursor.fetchall():
+                        if partition:
+                            stats = {key: value for key, value in row.items() if key != 'dam_id'}
+                            quantiles_by_dam.setdefault(str(row['dam_id']), {}).update(stats)
+                        else:
+                            overall_quantiles.update(row)
+    return quantiles_by_dam, overall_quantiles
+
+def ensure_lake_export_table(connection):
+    """
+    Create the table recording how far each data-lake copy of dam_resources has been exported.
+    Copies tracked by loaded_at before the load sequence existed resume from sequence 0, which
+    covers every load stamped since.
+    """
+    dam_load_sequence.ensure_load_sequence_table(connection)
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dam_resources_lake_exports (
+                lake_path VARCHAR(255) NOT NULL PRIMARY KEY,
+                last_load_seq BIGINT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
             )
-            connection.commit()
-            logger.info("Successfully inserted/updated the analysis results in 'overall_dam_analysis' table.")
-    except Exception as e:
-        logger.error(f"Error inserting/updating data in 'overall_dam_analysis': {e}")
-        raise
+        """)
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'dam_resources_lake_exports'
+        """)
+        existing = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+        if 'last_load_seq' not in existing:
+            cursor.execute("ALTER TABLE dam_resources_lake_exports ADD COLUMN last_load_seq BIGINT NULL")
+            if 'last_loaded_at' in existing:
+                cursor.execute("UPDATE dam_resources_lake_exports SET last_load_seq = 0 WHERE last_loaded_at IS NOT NULL")
+                cursor.execute("ALTER TABLE dam_resources_lake_exports DROP COLUMN last_loaded_at")
+    connection.commit()
+
+def get_changed_lake_partitions(connection, lake_path, full=False):
+    """
+    Return the (dam_id, year) lake partitions to rewrite and the load watermark to record once they are written.
+    Incremental exports pick the partitions holding days loaded or corrected since the last export,
+    using the load_seq column of 'dam_resources_daily_rollup'. Returns None for the partitions
+    when every partition has to be written.
+    """
+    # Start a fresh snapshot so the horizon and the changed rows are read consistently
+    connection.rollback()
+    new_watermark = dam_load_sequence.get_load_horizon(connection)
+
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("SELECT last_load_seq FROM dam_resources_lake_exports WHERE lake_path = %s", (lake_path,))
+        export_row = cursor.fetchone()
+        if full or not export_row or export_row['last_load_seq'] is None:
+            return None, new_watermark
+
+        # Loads commit in sequence order, so a load committing after this snapshot always
+        # gets a number above the horizon and is picked up by the next export
+        cursor.execute("""
+            SELECT DISTINCT dam_id, YEAR(date) AS year
+            FROM dam_resources_daily_rollup
+            WHERE load_seq > %s AND load_seq <= %s
+        """, (export_row['last_load_seq'], new_watermark))
+        partitions = [(str(row['dam_id']), row['year']) for row in cursor.fetchall()]
+    return partitions, new_watermark
+
+def build_lake_export_query(partitions):
+    """
+    Build the JDBC source query for the dam_resources rows of the given (dam_id, year) partitions,
+    with one range predicate per year so the (dam_id, date) key is used.
+    """
+    dams_by_year = {}
+    for dam_id, partition_year in partitions:
+        dams_by_year.setdefault(partition_year, set()).add(dam_id)
+
+    year_filters = []
+    for partition_year, dam_ids in sorted(dams_by_year.items()):
+        dam_list = ', '.join(f"'{dam_id}'" for dam_id in sorted(dam_ids))
+        year_filters.append(
+            f"(dam_id IN ({dam_list}) AND date BETWEEN '{partition_year}-01-01' AND '{partition_year}-12-31')"
+        )
+    return f"(SELECT * FROM dam_resources WHERE {' OR '.join(year_filters)}) as dam_data"
+
+def export_dam_resources_to_lake(spark, connection, jdbc_url, connection_properties, lake_path, options):
+    """
+    Mirror dam_resources into S3 as Parquet partitioned by year and dam_id.
+    Only the partitions with newly loaded or corrected days are rewritten, using dynamic partition
+    overwrite, so re-running an export is idempotent. LAKE_EXPORT_MODE 'full' rewrites every partition.
+    """
+    ensure_lake_export_table(connection)
+    partitions, new_watermark = get_changed_lake_partitions(
+        connection, lake_path, options['LAKE_EXPORT_MODE'] == 'full'
+    )
+    if partitions == []:
+        logger.info("No new dam_resources rows to export to the data lake.")
+        return
+
+    if partitions is None:
+        logger.info(f"Exporting all of dam_resources to {lake_path}.")
+        source_query = "(SELECT * FROM dam_resources) as dam_data"
+        source_stats = get_source_stats(connection, None, '1900-01-01')
+    else:
+        logger.info(f"Exporting {len(partitions)} changed (dam_id, year) partition(s) to {lake_path}.")
+        source_query = build_lake_export_query(partitions)
+        source_stats = {'row_count': len(partitions) * 366, 'min_date': None, 'max_date': None}
+
+    export_df = read_dam_resources(
+        spark, jdbc_url, source_query, connection_properties,
+        source_stats, int(options['JDBC_ROWS_PER_PARTITION'])
+    )
+    export_df = (
+        export_df.withColumn('date', to_date(col('date')))
+        .withColumn('dam_id', col('dam_id').cast('string'))
+        .withColumn('year', year(col('date')))
+    )
+
+    spark.conf.set('spark.sql.sources.partitionOverwriteMode', 'dynamic')
+    (
+        export_df.repartition('year', 'dam_id')
+        .write.mode('overwrite')
+        .partitionBy('year', 'dam_id')
+        .parquet(lake_path)
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO dam_resources_lake_exports (lake_path, last_load_seq)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE last_load_seq = VALUES(last_load_seq)
+        """, (lake_path, new_watermark))
+    connection.commit()
+    logger.info(f"Data lake export complete up to load sequence {new_watermark}.")
+
+def read_lake_dam_resources(spark, lake_path, start_date, dam_id=None):
+    """
+    Read dam_resources rows since start_date from the Parquet data lake.
+    Filters on the year and dam_id partition columns prune whole directories before any file is opened.
+    """
+    # Keep dam_id a string rather than letting Spark infer an integer partition column
+    spark.conf.set('spark.sql.sources.partitionColumnTypeInference.enabled', 'false')
+    dam_data_df = spark.read.parquet(lake_path)
+
+    start_year = datetime.strptime(start_date, '%Y-%m-%d').year
+    dam_data_df = dam_data_df.where(col('year').cast('int') >= start_year)
+    if dam_id:
+        dam_data_df = dam_data_df.where(col('dam_id') == dam_id)
+    return dam_data_df.where(col('date') >= lit(start_date)).drop('year')
+
+def get_lake_source_stats(dam_data_df):
+    """
+    Return the row and dam counts of a data-lake read, the lake counterpart of get_source_stats.
+    """
+    stats = dam_data_df.agg(count(lit(1)).alias('row_count'), countDistinct('dam_id').alias('dam_count')).collect()[0]
+    return stats.asDict()
+
+def run_spark_analysis(connection, db_params, dam_data_df, source_stats, current_date, dam_id, options):
+    """
+    Compute and store the specific and overall dam analysis from dam_resources rows read into Spark.
+    With DISTRIBUTION_STATS, min, max, median, p10 and p90 per window come out of the same pass as the averages.
+    """
+    log_record_counts = options['LOG_RECORD_COUNTS'].lower() == 'true'
+    include_distribution = options['DISTRIBUTION_STATS'].lower() == 'true'
+
+    # Ensure 'date' column is of date type
+    dam_data_df = dam_data_df.withColumn('date', to_date(col('date')))
+    logger.info("Converted 'date' column to date type.")
+
+    # Persist once so every later action reuses the single source read
+    storage_level = choose_storage_level(source_stats['row_count'], int(options['CACHE_MEMORY_LIMIT_MB']))
+    dam_data_df = dam_data_df.persist(storage_level)
+    logger.info(f"Persisted source data with storage level {storage_level}.")
+
+    if log_record_counts:
+        logger.info(f"Number of records fetched: {dam_data_df.count()}")
+
+    try:
+        if not dam_id:
+            if source_stats['dam_count'] > int(options['PARTITION_WRITE_MIN_DAMS']):
+                # Too many result rows to funnel through the driver: write them from the executors
+                stats_df = build_dam_window_stats_df(dam_data_df, current_date, include_distribution).persist()
+                try:
+                    dam_stats_df = stats_df.where(col('dam_id').isNotNull())
+                    write_specific_analysis_partitions(build_specific_results_df(dam_stats_df, current_date), db_params)
+                    if include_distribution:
+                        # The rollup row with a null dam_id already holds the cross-dam statistics
+                        overall_stats = expand_quantiles(stats_df.where(col('dam_id').isNull()).collect()[0].asDict())
+                    else:
+                        overall_stats = stats_df.agg(*[
+                            spark_sum(column).alias(column) for column in stats_df.columns if column != 'dam_id'
+                        ]).collect()[0].asDict()
+                finally:
+                    stats_df.unpersist()
+                overall_result = {
+                    'analysis_date': current_date.strftime('%Y-%m-%d'),
+                    **dam_analysis.averages_from_totals(overall_stats),
+                    **distribution_from_stats(overall_stats)
+                }
+                insert_or_update_overall_dam_analysis(connection, overall_result)
+                return
+
+            # Compute every dam's windows in one pass and derive the cross-dam overall from the same pass
+            totals_by_dam, overall_distribution = compute_dam_window_totals(dam_data_df, current_date, include_distribution)
+            store_dam_analysis(connection, totals_by_dam, current_date, sorted(totals_by_dam), overall_distribution)
+            return
+
+        # Compute averages for every time period in one scan of the source
+        window_averages = compute_window_averages(dam_data_df, current_date, log_record_counts, include_distribution)
+
+        # Prepare result dictionary for specific dam
+        specific_result = {
+            'dam_id': dam_id,
+            'analysis_date': current_date.strftime('%Y-%m-%d'),
+            **window_averages
+        }
+
+        logger.info(f"Computed specific dam averages: {specific_result}")
+
+        # Compute overall averages across all dams
+        logger.info("\nStarting computation of overall dam averages.")
+        overall_result = compute_overall_averages(dam_data_df, current_date, window_averages)
+
+        # Write both analysis tables in one transaction
+        write_analysis_results(connection, [specific_result], overall_result)
+    finally:
+        dam_data_df.unpersist()
 
 def main():
     """
@@ -212,7 +803,39 @@ def main():
     db_name = args['DB_NAME']
     db_user = args['DB_USER']
     db_password = args['DB_PASSWORD']
-    dam_id = '203042'  # Toonumbar Dam
+
+    # 'rollup' reads the rollup tables maintained by lambda_load_rds_glue, 'raw' scans dam_resources,
+    # 'lake' reads the Parquet copy at LAKE_PATH. LAKE_EXPORT refreshes that copy before the analysis.
+    # ANALYSIS_MODE 'single' analyses DAM_ID only, and on every source its overall row then covers DAM_ID alone;
+    # 'all' analyses every dam from one read.
+    # EXECUTION_MODE picks where raw windows are aggregated: 'pushdown' (MySQL), 'spark', or 'auto'
+    # (pushdown while the rows to scan stay under PUSHDOWN_MAX_ROWS).
+    # Spark writes results with foreachPartition once more than PARTITION_WRITE_MIN_DAMS dams are analysed.
+    # DISTRIBUTION_STATS adds p10, median and p90 to min and max: Spark computes them in the same pass,
+    # pushdown in a separate window-function step. The rollup source stores no distribution statistics.
+    # REPLICA_HOST sends the source reads to a read replica (same port and credentials) unless its lag
+    # exceeds REPLICA_MAX_LAG_SECONDS; writes, the lake export and its watermarks stay on the primary.
+    options = get_optional_args({
+        'ANALYTICS_SOURCE': 'raw',
+        'ANALYSIS_MODE': 'single',
+        'DAM_ID': '203042',  # Toonumbar Dam
+        'EXECUTION_MODE': 'auto',
+        'PUSHDOWN_MAX_ROWS': '2000000',
+        'LOG_RECORD_COUNTS': 'false',
+        'CACHE_MEMORY_LIMIT_MB': '512',
+        'JDBC_ROWS_PER_PARTITION': '20000',
+        'PARTITION_WRITE_MIN_DAMS': '5000',
+        'LAKE_EXPORT': 'false',
+        'LAKE_EXPORT_MODE': 'incremental',
+        'LAKE_PATH': '',
+        'DISTRIBUTION_STATS': 'true',
+        'REPLICA_HOST': '',
+        'REPLICA_MAX_LAG_SECONDS': ''
+    })
+    analytics_source = options['ANALYTICS_SOURCE']
+    all_dams = options['ANALYSIS_MODE'] == 'all'
+    dam_id = None if all_dams else options['DAM_ID']
+    lake_path = options['LAKE_PATH']
 
     jdbc_url = f"jdbc:mysql://{db_host}:{db_port}/{db_name}"
 
@@ -222,99 +845,105 @@ def main():
         "driver": "com.mysql.jdbc.Driver"
     }
 
-    # Initialize Spark session
-    spark = SparkSession.builder.appName("latest_dam_data_etl").getOrCreate()
-    logger.info("Spark session initialized.")
+    # Also passed to executors that write analysis results with foreachPartition
+    db_params = {
+        'host': db_host,
+        'port': int(db_port),
+        'user': db_user,
+        'password': db_password,
+        'database': db_name
+    }
+
+    primary_settings = {**db_params, 'cursorclass': pymysql.cursors.DictCursor}
+    replica_settings = {**primary_settings, 'host': options['REPLICA_HOST']} if options['REPLICA_HOST'] else None
+    max_replica_lag = options['REPLICA_MAX_LAG_SECONDS']
 
     current_date = datetime.now()
+    spark = None
 
     try:
         # Connect to the database
-        connection = pymysql.connect(
-            host=db_host,
-            port=int(db_port),
-            user=db_user,
-            password=db_password,
-            database=db_name,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        router = dam_db.get_router(primary_settings, replica_settings, int(max_replica_lag) if max_replica_lag else None)
+        connection = router.primary.acquire()
         logger.info(f"Connected to the database '{db_name}'.")
+        read_host = router.read_settings()['host']
+        read_connection = router.read_pool().acquire()
+        logger.info(f"Reading source data from {read_host}.")
 
-        # Build the query for specific dam
-        specific_query = f"(SELECT * FROM dam_resources WHERE dam_id = '{dam_id}' AND date >= '{(current_date - timedelta(days=20*365)).strftime('%Y-%m-%d')}') as dam_data"
-
-        logger.info("Reading data from 'dam_resources' table for specific dam.")
-        dam_data_df = spark.read.jdbc(
-            url=jdbc_url,
-            table=specific_query,
-            properties=connection_properties
-        )
-        record_count = dam_data_df.count()
-        logger.info(f"Data read successfully. Number of records fetched: {record_count}")
-
-        # Ensure 'date' column is of date type
-        dam_data_df = dam_data_df.withColumn('date', to_date(col('date')))
-        logger.info("Converted 'date' column to date type.")
-
-        # Filter data for each time period
-        date_12_months_ago = current_date - timedelta(days=365)
-        date_5_years_ago = current_date - timedelta(days=5*365)
-        date_20_years_ago = current_date - timedelta(days=20*365)
-
-        dam_data_12_months = dam_data_df.filter(col('date') >= lit(date_12_months_ago.strftime('%Y-%m-%d')))
-        dam_data_5_years = dam_data_df.filter(col('date') >= lit(date_5_years_ago.strftime('%Y-%m-%d')))
-        dam_data_20_years = dam_data_df.filter(col('date') >= lit(date_20_years_ago.strftime('%Y-%m-%d')))
-
-        logger.info(f"Records for last 12 months: {dam_data_12_months.count()}")
-        logger.info(f"Records for last 5 years: {dam_data_5_years.count()}")
-        logger.info(f"Records for last 20 years: {dam_data_20_years.count()}")
-
-        # Function to compute averages
-        def compute_averages(df, period_name):
-            logger.info(f"Computing averages for {period_name}.")
-            avg_df = df.select(
-                avg('storage_volume').alias(f'avg_storage_volume_{period_name}'),
-                avg('percentage_full').alias(f'avg_percentage_full_{period_name}'),
-                avg('storage_inflow').alias(f'avg_storage_inflow_{period_name}'),
-                avg('storage_release').alias(f'avg_storage_release_{period_name}')
-            )
-            return avg_df
+        lake_export = options['LAKE_EXPORT'].lower() == 'true'
+        if (lake_export or analytics_source == 'lake') and not lake_path:
+            raise ValueError("LAKE_PATH must be set to export to or read from the data lake.")
 
-        # Compute averages for specific dam
-        avg_12_months = compute_averages(dam_data_12_months, '12_months').collect()[0].asDict()
-        avg_5_years = compute_averages(dam_data_5_years, '5_years').collect()[0].asDict()
-        avg_20_years = compute_averages(dam_data_20_years, '20_years').collect()[0].asDict()
+        if lake_export:
+            spark = SparkSession.builder.appName("latest_dam_data_etl").getOrCreate()
+            export_dam_resources_to_lake(spark, connection, jdbc_url, connection_properties, lake_path, options)
 
-        # Prepare result dictionary for specific dam
-        specific_result = {
-            'dam_id': dam_id,
-            'analysis_date': current_date.strftime('%Y-%m-%d'),
-            **avg_12_months,
-            **avg_5_years,
-            **avg_20_years
-        }
+        start_date = (current_date - timedelta(days=20*365)).strftime('%Y-%m-%d')
+        if analytics_source == 'rollup':
+            run_rollup_analysis(connection, current_date, dam_id, read_connection)
+        elif analytics_source == 'lake':
+            spark = SparkSession.builder.appName("latest_dam_data_etl").getOrCreate()
+            logger.info(f"Reading dam_resources from the data lake at {lake_path}.")
+            dam_data_df = read_lake_dam_resources(spark, lake_path, start_date, dam_id)
+            source_stats = get_lake_source_stats(dam_data_df)
+            logger.info(f"Source rows to read: {source_stats['row_count']} for {source_stats['dam_count']} dam(s).")
+            run_spark_analysis(connection, db_params, dam_data_df, source_stats, current_date, dam_id, options)
+        else:
+            # Build the query for the specific dam, or for every dam
+            dam_filter = f"dam_id = '{dam_id}' AND " if dam_id else ""
+            source_query = f"(SELECT * FROM dam_resources WHERE {dam_filter}date >= '{start_date}') as dam_data"
+            source_stats = get_source_stats(read_connection, dam_id, start_date)
+            logger.info(f"Source rows to read: {source_stats['row_count']} ({source_stats['min_date']} to {source_stats['max_date']}).")
 
-        logger.info(f"Computed specific dam averages: {specific_result}")
-
-        # Insert or update specific_dam_analysis table
-        insert_or_update_specific_dam_analysis(connection, specific_result)
+            execution_mode = options['EXECUTION_MODE']
+            if execution_mode == 'auto':
+                within_limit = source_stats['row_count'] <= int(options['PUSHDOWN_MAX_ROWS'])
+                execution_mode = 'pushdown' if within_limit else 'spark'
+            logger.info(f"Using '{execution_mode}' execution mode.")
 
-        # Compute overall averages across all dams
-        logger.info("\nStarting computation of overall dam averages.")
-        overall_result = compute_overall_averages(dam_data_df, current_date)
+            if execution_mode == 'pushdown':
+                totals_by_dam = compute_pushdown_window_totals(read_connection, current_date, start_date, dam_id)
+                overall_distribution = None
+                if options['DISTRIBUTION_STATS'].lower() == 'true':
+                    quantiles_by_dam, overall_quantiles = compute_pushdown_quantiles(
+                        read_connection, current_date, start_date, dam_id
+                    )
+                    for quantile_dam_id, quantiles in quantiles_by_dam.items():
+                        totals_by_dam.setdefault(quantile_dam_id, {}).update(quantiles)
+                    overall_distribution = {
+                        **dam_analysis.combine_window_extremes(totals_by_dam.values()),
+                        **overall_quantiles
+                    }
+                store_dam_analysis(
+                    connection, totals_by_dam, current_date,
+                    [dam_id] if dam_id else sorted(totals_by_dam), overall_distribution
+                )
+            else:
+                # Initialize Spark session
+                spark = SparkSession.builder.appName("latest_dam_data_etl").getOrCreate()
+                logger.info("Spark session initialized.")
 
-        # Insert or update overall_dam_analysis table
-        insert_or_update_overall_dam_analysis(connection, overall_result)
+                logger.info(f"Reading data from 'dam_resources' table for {'specific dam' if dam_id else 'all dams'}.")
+                read_jdbc_url = f"jdbc:mysql://{read_host}:{db_port}/{db_name}"
+                dam_data_df = read_dam_resources(
+                    spark, read_jdbc_url, source_query, connection_properties,
+                    source_stats, int(options['JDBC_ROWS_PER_PARTITION'])
+                )
+                run_spark_analysis(connection, db_params, dam_data_df, source_stats, current_date, dam_id, options)
 
     except Exception as e:
         logger.error(f"An error occurred during the Glue job execution: {e}")
         sys.exit(1)
     finally:
-        if 'connection' in locals() and connection.open:
-            connection.close()
+        if 'read_connection' in locals():
+            dam_db.release(read_connection)
+        if 'connection' in locals():
+            dam_db.release(connection)
+            router.close_all()
             logger.info("Database connection closed.")
-        spark.stop()
-        logger.info("Spark session stopped.")
+        if spark:
+            spark.stop()
+            logger.info("Spark session stopped.")
     
     logger.info("Glue job 'latest_dam_data_etl' completed successfully.")
 
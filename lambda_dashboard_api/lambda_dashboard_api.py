@@ -0,0 +1,176 @@
+# lambda_dashboard_api/lambda_dashboard_api.py
+
+import json
+import logging
+import os
+import time
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+import pymysql  # Ensure this library is included in the deployment package
+import dam_db  # Copied into the deployment package from shared/
+import dam_data_version  # Copied into the deployment package from shared/
+import dam_analysis  # Copied into the deployment package from shared/
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Responses cached by this warm container: path -> {'version', 'cached_at', 'body', 'etag'}
+_response_cache = {}
+
+# Last data version read from the database and when it was read
+_version_state = {'version': None, 'checked_at': 0.0}
+
+def json_default(obj):
+    """
+    Serialise the Decimal and date values pymysql returns.
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serialisable")
+
+def fetch_latest_data(connection, dam_id=None):
+    """
+    Return the latest_data rows, for one dam or for every dam.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        if dam_id:
+            cursor.execute("SELECT * FROM latest_data WHERE dam_id = %s ORDER BY date DESC", (dam_id,))
+        else:
+            cursor.execute("SELECT * FROM latest_data ORDER BY dam_id, date DESC")
+        return cursor.fetchall()
+
+def fetch_specific_analysis(connection, dam_id):
+    """
+    Return the most recent specific_dam_analysis row for a dam, or None.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(
+            "SELECT * FROM specific_dam_analysis WHERE dam_id = %s ORDER BY analysis_date DESC LIMIT 1",
+            (dam_id,)
+        )
+        return cursor.fetchone()
+
+def fetch_overall_analysis(connection):
+    """
+    Return the most recent overall_dam_analysis row, or None.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("SELECT * FROM overall_dam_analysis ORDER BY analysis_date DESC LIMIT 1")
+        return cursor.fetchone()
+
+def fetch_chart_tier(connection, dam_id, measure, tier):
+    """
+    Return one downsampled series as {'dam_id', 'measure', 'tier', 'points': [[date, value], ...]}, or None.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("""
+            SELECT point_date, value FROM dam_chart_tiers
+            WHERE dam_id = %s AND measure = %s AND tier = %s
+            ORDER BY point_date
+        """, (dam_id, measure, tier))
+        points = [[row[0], row[1]] for row in cursor.fetchall()]
+    if not points:
+        return None
+    return {'dam_id': dam_id, 'measure': measure, 'tier': tier, 'points': points}
+
+def resolve_route(path):
+    """
+    Map a request path to a function that loads its payload, or None for unknown paths.
+    Supported: /latest, /latest/{dam_id}, /analysis/overall, /analysis/{dam_id} and
+    /chart/{dam_id}/{measure}/{tier}, where tier is weekly, monthly or lttb_<budget>.
+    """
+    parts = [part for part in path.split('/') if part]
+    if parts == ['latest']:
+        return lambda connection: fetch_latest_data(connection)
+    if len(parts) == 2 and parts[0] == 'latest':
+        return lambda connection: fetch_latest_data(connection, parts[1])
+    if parts == ['analysis', 'overall']:
+        return fetch_overall_analysis
+    if len(parts) == 2 and parts[0] == 'analysis':
+        return lambda connection: fetch_specific_analysis(connection, parts[1])
+    if len(parts) == 4 and parts[0] == 'chart' and parts[2] in dam_analysis.MEASURES:
+        return lambda connection: fetch_chart_tier(connection, parts[1], parts[2], parts[3])
+    return None
+
+def current_data_version(connection, check_interval):
+    """
+    Return the data version, rereading it at most every check_interval seconds.
+    Each reread starts a new transaction, so it sees bumps committed since the connection's
+    last snapshot; the payload read after it then comes from the same snapshot as the version.
+    """
+    now = time.monotonic()
+    if _version_state['version'] is None or now - _version_state['checked_at'] >= check_interval:
+        connection.rollback()
+        _version_state['version'] = dam_data_version.get_data_version(connection)
+        _version_state['checked_at'] = now
+    return _version_state['version']
+
+def get_cached_response(path, loader, router, ttl, version_check_interval):
+    """
+    Return (body, etag) for a path from the container cache, loading it when the entry is missing,
+    older than ttl seconds, or was built from an older data version. Cache hits only touch the
+    database to reread the version, at most every version_check_interval seconds.
+    Entries past their TTL whose version is unchanged are renewed without rereading the tables.
+    """
+    entry = _response_cache.get(path)
+    now = time.monotonic()
+    version_fresh = now - _version_state['checked_at'] < version_check_interval
+    if entry and version_fresh and now - entry['cached_at'] < ttl and entry['version'] == _version_state['version']:
+        return entry['body'], entry['etag']
+
+    with router.reader() as connection:
+        version = current_data_version(connection, version_check_interval)
+        if entry and entry['version'] == version:
+            entry['cached_at'] = now
+            return entry['body'], entry['etag']
+
+        payload = loader(connection)
+
+    body = json.dumps(payload, default=json_default, separators=(',', ':'))
+    etag = f'"{version}-{hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]}"'
+    _response_cache[path] = {'version': version, 'cached_at': now, 'body': body, 'etag': etag}
+    return body, etag
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler serving the dashboard's read API through a Lambda function URL.
+    Responses are cached per warm container for CACHE_TTL_SECONDS and invalidated when the
+    data version bumped by lambda_load_rds_glue changes. Requests whose If-None-Match matches
+    the current ETag get a 304 without a body.
+    """
+    method = event.get('requestContext', {}).get('http', {}).get('method', 'GET')
+    path = event.get('rawPath', '/')
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+
+    if method != 'GET':
+        return {"statusCode": 405, "headers": {"Allow": "GET"}, "body": "Method not allowed."}
+
+    loader = resolve_route(path)
+    if loader is None:
+        return {"statusCode": 404, "body": f"Unknown path '{path}'."}
+
+    ttl = int(os.getenv('CACHE_TTL_SECONDS', '300'))
+    version_check_interval = int(os.getenv('VERSION_CHECK_SECONDS', '30'))
+
+    try:
+        body, etag = get_cached_response(path, loader, dam_db.get_router(), ttl, version_check_interval)
+    except Exception as e:
+        logger.error(f"Failed to load '{path}'. Exception: {e}")
+        return {"statusCode": 500, "body": "Failed to load dashboard data."}
+
+    response_headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={min(ttl, version_check_interval)}"
+    }
+    if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+        return {"statusCode": 304, "headers": response_headers}
+
+    if body == 'null':
+        return {"statusCode": 404, "headers": response_headers, "body": f"No data for '{path}'."}
+
+    response_headers["Content-Type"] = "application/json"
+    return {"statusCode": 200, "headers": response_headers, "body": body}
@@ -6,6 +6,7 @@ import requests  # Ensure this library is included in the deployment package
 import logging
 from decimal import Decimal
 import time
+import dam_db  # Copied into the deployment package from shared/
 
 # Configure logging
 logger = logging.getLogger()
@@ -39,20 +40,15 @@ def get_secrets():
         logger.error(f"Failed to fetch secrets. Exception: {e}")
         return None
 
-def connect_to_database(db_host, db_port, db_name, db_user, db_password):
+def connect_to_database():
     """
-    Establish a connection to the RDS MySQL instance.
+    Check out a read connection from the shared pools configured by the DB_* variables.
+    Served by the read replica when DB_REPLICA_HOST is set and the replica is healthy.
     """
     try:
-        connection = pymysql.connect(
-            host=db_host,
-            port=db_port,
-            user=db_user,
-            password=db_password,
-            database=db_name,
-            connect_timeout=5
-        )
-        logger.info(f"Successfully connected to the database '{db_name}' at {db_host}:{db_port}.")
+        pool = dam_db.get_router().read_pool()
+        connection = pool.acquire()
+        logger.info(f"Checked out a connection to the database '{pool.connect_args['database']}' at {pool.connect_args['host']}:{pool.connect_args['port']}.")
         return connection
     except Exception as e:
         logger.error(f"Failed to connect to the database. Exception: {e}")
@@ -271,7 +267,7 @@ def lambda_handler(event, context):
             "body": f"Missing environment variables for DB connection: {', '.join(missing_db_vars)}"
         }
 
-    connection = connect_to_database(db_host, db_port, db_name, db_user, db_password)
+    connection = connect_to_database()
     if not connection:
         logger.error("Database connection failed.")
         return {
@@ -280,8 +276,8 @@ def lambda_handler(event, context):
         }
 
     dams = query_dams_table(connection)
-    connection.close()
-    logger.info("Database connection closed.")
+    dam_db.release(connection)
+    logger.info("Database connection returned to the pool.")
 
     if not dams:
         logger.info("No dams to process.")
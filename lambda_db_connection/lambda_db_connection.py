@@ -5,6 +5,7 @@ import os
 import pymysql  # Ensure this library is included in the deployment package
 import logging
 from decimal import Decimal
+import dam_db  # Copied into the deployment package from shared/
 
 # Configure logging
 logger = logging.getLogger()
@@ -43,41 +44,33 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Establish connection to the RDS MySQL instance
-        connection = pymysql.connect(
-            host=db_host,
-            port=db_port,
-            user=db_user,
-            password=db_password,
-            database=db_name,
-            connect_timeout=5
-        )
-        
-        if connection.open:
-            logger.info(f"Successfully connected to the database '{db_name}' at {db_host}:{db_port}.")
-            # Optionally, perform a simple query to verify
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT DATABASE();")
-                result = cursor.fetchone()
-                logger.info(f"Connected to database: {result[0]}")
+        # Check out a read connection from the shared pools; the replica serves it when DB_REPLICA_HOST is set
+        pool = dam_db.get_router().read_pool()
+        with pool.connection() as connection:
+            if connection.open:
+                logger.info(f"Successfully connected to the database '{db_name}' at {pool.connect_args['host']}:{pool.connect_args['port']}.")
+                # Optionally, perform a simple query to verify
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT DATABASE();")
+                    result = cursor.fetchone()
+                    logger.info(f"Connected to database: {result[0]}")
 
-            # Query the 'dams' table and log each entry
-            logger.info("Querying the 'dams' table...")
-            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute("SELECT * FROM dams;")
-                dams = cursor.fetchall()
+                # Query the 'dams' table and log each entry
+                logger.info("Querying the 'dams' table...")
+                with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                    cursor.execute("SELECT * FROM dams;")
+                    dams = cursor.fetchall()
                 
-                if dams:
-                    logger.info(f"Retrieved {len(dams)} entries from the 'dams' table:")
-                    for dam in dams:
-                        # Convert Decimal objects to float for JSON serialization
-                        dam_serializable = {k: (float(v) if isinstance(v, Decimal) else v) for k, v in dam.items()}
-                        logger.info(json.dumps(dam_serializable))
-                else:
-                    logger.info("No entries found in the 'dams' table.")
-        
-        connection.close()
-        logger.info("Database connection closed.")
+                    if dams:
+                        logger.info(f"Retrieved {len(dams)} entries from the 'dams' table:")
+                        for dam in dams:
+                            # Convert Decimal objects to float for JSON serialization
+                            dam_serializable = {k: (float(v) if isinstance(v, Decimal) else v) for k, v in dam.items()}
+                            logger.info(json.dumps(dam_serializable))
+                    else:
+                        logger.info("No entries found in the 'dams' table.")
+
+        logger.info(f"Database connection returned to the pool. Pool stats: {pool.stats()}")
         
         return {
             "statusCode": 200,
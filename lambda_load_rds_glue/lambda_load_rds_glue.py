@@ -3,45 +3,213 @@
 import logging
 import pymysql  # Ensure this library is included in the deployment package
 import boto3
+from botocore.exceptions import ClientError
 import os
 import json
+import hashlib
+import time
+from datetime import datetime
+from decimal import Decimal
+import dam_db  # Copied into the deployment package from shared/
+import dam_data_version  # Copied into the deployment package from shared/
+import dam_tiers  # Copied into the deployment package from shared/
+import dam_load_sequence  # Copied into the deployment package from shared/
+import dam_analysis  # Copied into the deployment package from shared/
+
+try:
+    # Copied into the deployment package from glue_scripts/ when ANALYTICS_ENGINE is 'local'
+    import dam_analytics_engine
+except ImportError:
+    dam_analytics_engine = None
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# pymysql OperationalError codes for deadlocks (1213) and lock wait timeouts (1205)
+RETRYABLE_LOCK_ERRORS = (1213, 1205)
+
 def connect_to_rds():
     """
-    Connect to the AWS RDS instance.
+    Check out a connection to the AWS RDS instance from the shared pool.
+    Warm Lambda containers reuse the pooled connection across invocations.
     """
-    db_host = os.getenv('DB_HOST')
-    db_port = int(os.getenv('DB_PORT', '3306'))
-    db_name = os.getenv('DB_NAME')
-    db_user = os.getenv('DB_USER')
-    db_password = os.getenv('DB_PASSWORD')
-
-    missing_vars = [
-        var_name for var_name in ['DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD']
-        if not os.getenv(var_name)
-    ]
-    if missing_vars:
-        logger.error(f"Missing environment variables for RDS connection: {', '.join(missing_vars)}")
+    try:
+        return dam_db.get_pool().acquire()
+    except ValueError as e:
+        logger.error(str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Failed to connect to the RDS database. Exception: {e}")
         return None
 
+def release_rds_connection(connection):
+    """
+    Return a connection checked out by connect_to_rds to the shared pool.
+    """
+    dam_db.release(connection)
+    logger.info("RDS connection returned to the pool.")
+
+def ensure_s3_event_ledger_table(connection):
+    """
+    Create the 's3_event_ledger' table used to de-duplicate S3 notifications if it does not exist.
+    """
+    create_query = """
+        CREATE TABLE IF NOT EXISTS s3_event_ledger (
+            event_id CHAR(64) NOT NULL PRIMARY KEY,
+            bucket VARCHAR(255) NOT NULL,
+            object_key VARCHAR(1024) NOT NULL,
+            version_id VARCHAR(1024) NOT NULL DEFAULT '',
+            etag VARCHAR(255) NOT NULL DEFAULT '',
+            status VARCHAR(20) NOT NULL,
+            checkpoint_stage VARCHAR(32) NULL,
+            checkpoint_rows INT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(create_query)
+    connection.commit()
+
+def get_s3_event_identity(s3_info):
+    """
+    Build the ledger identity (event_id, bucket, key, version, ETag) of an S3 event record.
+    """
+    bucket_name = s3_info['bucket']['name']
+    object_key = s3_info['object']['key']
+    version_id = s3_info['object'].get('versionId', '')
+    etag = s3_info['object'].get('eTag', '')
+    event_id = hashlib.sha256(
+        '\n'.join([bucket_name, object_key, version_id, etag]).encode('utf-8')
+    ).hexdigest()
+    return {
+        'event_id': event_id,
+        'bucket': bucket_name,
+        'object_key': object_key,
+        'version_id': version_id,
+        'etag': etag
+    }
+
+def claim_s3_event(connection, identity):
+    """
+    Claim an S3 event in the 's3_event_ledger' table.
+    Returns None if the event has already been processed or is being processed by another invocation,
+    otherwise the checkpoint {'stage', 'rows'} to resume the load from.
+    A 'failed' event, or a 'processing' claim older than LEDGER_STALE_SECONDS, is taken over.
+    """
+    stale_seconds = int(os.getenv('LEDGER_STALE_SECONDS', '900'))
     try:
-        connection = pymysql.connect(
-            host=db_host,
-            port=db_port,
-            user=db_user,
-            password=db_password,
-            database=db_name,
-            connect_timeout=5
+        with connection.cursor() as cursor:
+            # Insert first: a locking read of a missing row takes a gap lock that concurrent
+            # claimers share, and their inserts would then deadlock on each other
+            inserted = cursor.execute(
+                """
+                INSERT IGNORE INTO s3_event_ledger (event_id, bucket, object_key, version_id, etag, status)
+                VALUES (%s, %s, %s, %s, %s, 'processing')
+                """,
+                (identity['event_id'], identity['bucket'], identity['object_key'],
+                 identity['version_id'], identity['etag'])
+            )
+            if inserted:
+                checkpoint = {'stage': None, 'rows': 0}
+            else:
+                # The row exists, so this only locks that row
+                cursor.execute(
+                    """
+                    SELECT status, updated_at < NOW() - INTERVAL %s SECOND, checkpoint_stage, checkpoint_rows
+                    FROM s3_event_ledger WHERE event_id = %s FOR UPDATE
+                    """,
+                    (stale_seconds, identity['event_id'])
+                )
+                row = cursor.fetchone()
+                if row[0] == 'completed' or (row[0] == 'processing' and not row[1]):
+                    connection.rollback()
+                    logger.info(f"S3 event for object '{identity['object_key']}' (ETag {identity['etag']}) is already {row[0]}. Skipping.")
+                    return None
+                checkpoint = {'stage': row[2], 'rows': row[3]}
+                logger.warning(f"Resuming {row[0]} load of S3 object '{identity['object_key']}' (ETag {identity['etag']}) from checkpoint {checkpoint}.")
+                # Refresh updated_at explicitly: taking over a stale 'processing' claim changes no other column
+                cursor.execute(
+                    "UPDATE s3_event_ledger SET status = 'processing', updated_at = CURRENT_TIMESTAMP WHERE event_id = %s",
+                    (identity['event_id'],)
+                )
+        connection.commit()
+        return checkpoint
+    except Exception as e:
+        connection.rollback()
+        logger.error(f"Failed to claim S3 event in 's3_event_ledger'. Exception: {e}")
+        raise
+
+def save_checkpoint(cursor, identity, stage, rows):
+    """
+    Record load progress for an S3 event. Runs inside the batch transaction so it commits with the batch.
+    """
+    cursor.execute(
+        "UPDATE s3_event_ledger SET checkpoint_stage = %s, checkpoint_rows = %s WHERE event_id = %s",
+        (stage, rows, identity['event_id'])
+    )
+
+def complete_s3_event(connection, identity):
+    """
+    Mark a claimed S3 event as completed so duplicate deliveries are skipped.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE s3_event_ledger SET status = 'completed' WHERE event_id = %s",
+            (identity['event_id'],)
         )
-        logger.info(f"Successfully connected to the RDS database '{db_name}' at {db_host}:{db_port}.")
-        return connection
+    connection.commit()
+
+def release_s3_event(connection, identity):
+    """
+    Mark a claimed S3 event as failed after a load error.
+    Its checkpoint is kept so a redelivery resumes from the last committed batch.
+    """
+    try:
+        connection.rollback()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE s3_event_ledger SET status = 'failed' WHERE event_id = %s AND status = 'processing'",
+                (identity['event_id'],)
+            )
+        connection.commit()
     except Exception as e:
-        logger.error(f"Failed to connect to the RDS database. Exception: {e}")
-        return None
+        logger.error(f"Failed to release claim in 's3_event_ledger'. Exception: {e}")
+
+def commit_in_batches(connection, rows, write_batch, stage, identity=None, start_row=0):
+    """
+    Write rows in transactions of COMMIT_BATCH_SIZE rows, starting at start_row.
+    write_batch(cursor, batch) performs the writes for one batch. A batch failing with a
+    deadlock or lock wait timeout is rolled back and retried up to LOCK_RETRY_ATTEMPTS times;
+    batches already committed are kept. When identity is given, the checkpoint for stage is
+    saved in the same transaction as each batch.
+    Returns the number of rows committed.
+    """
+    batch_size = int(os.getenv('COMMIT_BATCH_SIZE', '500'))
+    max_attempts = int(os.getenv('LOCK_RETRY_ATTEMPTS', '3'))
+
+    committed = start_row
+    while committed < len(rows):
+        batch = rows[committed:committed + batch_size]
+        for attempt in range(1, max_attempts + 1):
+            try:
+                with connection.cursor() as cursor:
+                    write_batch(cursor, batch)
+                    if identity:
+                        save_checkpoint(cursor, identity, stage, committed + len(batch))
+                connection.commit()
+                break
+            except pymysql.err.OperationalError as e:
+                connection.rollback()
+                if e.args[0] not in RETRYABLE_LOCK_ERRORS or attempt == max_attempts:
+                    logger.error(f"Batch at row {committed} of '{stage}' failed after {attempt} attempt(s). Last committed row: {committed}.")
+                    raise
+                delay = 0.2 * (2 ** (attempt - 1))
+                logger.warning(f"Lock conflict ({e.args[0]}) writing batch at row {committed} of '{stage}'. Retrying in {delay} seconds... (Attempt {attempt}/{max_attempts})")
+                time.sleep(delay)
+        committed += len(batch)
+    return committed
 
 def fetch_data_from_s3(bucket_name, object_key):
     """
@@ -58,78 +226,250 @@ def fetch_data_from_s3(bucket_name, object_key):
         logger.error(f"Failed to fetch data from S3 bucket '{bucket_name}', object '{object_key}'. Exception: {e}")
         return None
 
-def replace_latest_data(connection, data):
+def replace_latest_data(connection, data, identity=None, start_row=0):
     """
     Replace all entries in the 'latest_data' table with the provided data.
+    The table is only truncated when starting from the beginning; otherwise inserts resume at start_row.
     """
     try:
-        with connection.cursor() as cursor:
-            # Truncate the table
-            cursor.execute("TRUNCATE TABLE latest_data;")
-            logger.info("Successfully truncated the 'latest_data' table.")
-
-            # Prepare insert query
-            insert_query = """
-                INSERT INTO latest_data (dam_id, dam_name, date, storage_volume, percentage_full, storage_inflow, storage_release)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-
-            # Insert new data
-            for record in data:
-                dams = record.get('dams', [])
-                for dam in dams:
-                    for resource in dam.get('resources', []):
-                        cursor.execute(insert_query, (
-                            dam['dam_id'],
-                            dam['dam_name'],
-                            resource['date'],
-                            resource['storage_volume'],
-                            resource['percentage_full'],
-                            resource['storage_inflow'],
-                            resource['storage_release']
-                        ))
-
-            # Commit changes
-            connection.commit()
-            logger.info("Successfully replaced data in the 'latest_data' table.")
+        rows = extract_latest_data_rows(data)
+
+        if start_row == 0:
+            with connection.cursor() as cursor:
+                # Truncate the table
+                cursor.execute("TRUNCATE TABLE latest_data;")
+                logger.info("Successfully truncated the 'latest_data' table.")
+
+        # Prepare insert query
+        insert_query = """
+            INSERT INTO latest_data (dam_id, dam_name, date, storage_volume, percentage_full, storage_inflow, storage_release)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+
+        # Insert new data in committed batches
+        commit_in_batches(
+            connection, rows,
+            lambda cursor, batch: cursor.executemany(insert_query, batch),
+            'latest_data', identity, start_row
+        )
+        logger.info("Successfully replaced data in the 'latest_data' table.")
     except Exception as e:
         logger.error(f"Failed to replace data in the 'latest_data' table. Exception: {e}")
         raise
 
-def insert_into_dam_resources(connection, data):
+def extract_latest_data_rows(data):
+    """
+    Flatten the S3 payload into latest_data rows.
+    """
+    rows = []
+    for record in data:
+        dams = record.get('dams', [])
+        for dam in dams:
+            for resource in dam.get('resources', []):
+                rows.append((
+                    dam['dam_id'],
+                    dam['dam_name'],
+                    resource['date'],
+                    resource['storage_volume'],
+                    resource['percentage_full'],
+                    resource['storage_inflow'],
+                    resource['storage_release']
+                ))
+    return rows
+
+def extract_dam_resource_rows(data):
+    """
+    Flatten the S3 payload into (dam_id, date, storage_volume, percentage_full, storage_inflow, storage_release) rows.
+    """
+    return [(row[0],) + row[2:] for row in extract_latest_data_rows(data)]
+
+def normalize_measure(value):
+    """
+    Normalise a measure so DECIMAL values read from RDS and JSON numbers from S3 compare equal.
+    """
+    if value is None:
+        return ''
+    return str(Decimal(str(value)).normalize())
+
+def dam_resource_fingerprint(row):
+    """
+    Compute a compact fingerprint of a dam_resources row's measures.
+    """
+    text = '|'.join(normalize_measure(value) for value in row[2:])
+    return hashlib.md5(text.encode('utf-8')).digest()[:8]
+
+def dam_resource_key(dam_id, date):
+    """
+    Build the (dam_id, date) key used to match payload rows with stored rows.
+    """
+    return (str(dam_id), str(date)[:10])
+
+def fetch_dam_resource_fingerprints(connection, rows):
+    """
+    Load fingerprints of the stored dam_resources rows for the dams and date range in the payload, in one query.
+    """
+    if not rows:
+        return {}
+
+    dam_ids = sorted({str(row[0]) for row in rows})
+    dates = [str(row[1])[:10] for row in rows]
+    placeholders = ', '.join(['%s'] * len(dam_ids))
+    select_query = f"""
+        SELECT dam_id, date, storage_volume, percentage_full, storage_inflow, storage_release
+        FROM dam_resources
+        WHERE dam_id IN ({placeholders}) AND date BETWEEN %s AND %s
+    """
+
+    fingerprints = {}
+    with connection.cursor() as cursor:
+        cursor.execute(select_query, (*dam_ids, min(dates), max(dates)))
+        for stored_row in cursor.fetchall():
+            fingerprints[dam_resource_key(stored_row[0], stored_row[1])] = dam_resource_fingerprint(stored_row)
+    return fingerprints
+
+def ensure_rollup_tables(connection):
+    """
+    Create the per-dam daily and monthly rollup tables of dam_resources if they do not exist.
+    Each measure is stored as a sum and a count of non-null values. Daily rows also record when
+    they last changed and the load sequence number of the transaction that changed them, which the
+    incremental analytics and the lake export use as their watermark. Tables created before the
+    sequence existed get the column added.
+    """
+    measure_columns = ',\n'.join(
+        f"            sum_{measure} DOUBLE NULL,\n            count_{measure} INT NOT NULL DEFAULT 0"
+        for measure in dam_analysis.MEASURES
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS dam_resources_daily_rollup (
+                dam_id VARCHAR(20) NOT NULL,
+                date DATE NOT NULL,
+{measure_columns},
+                loaded_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+                load_seq BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (dam_id, date),
+                KEY idx_daily_rollup_loaded_at (loaded_at),
+                KEY idx_daily_rollup_load_seq (load_seq)
+            )
+        """)
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'dam_resources_daily_rollup' AND COLUMN_NAME = 'load_seq'
+        """)
+        if not cursor.fetchone()[0]:
+            cursor.execute("""
+                ALTER TABLE dam_resources_daily_rollup
+                ADD COLUMN load_seq BIGINT NOT NULL DEFAULT 0, ADD KEY idx_daily_rollup_load_seq (load_seq)
+            """)
+            logger.info("Added 'load_seq' to 'dam_resources_daily_rollup'.")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS dam_resources_monthly_rollup (
+                dam_id VARCHAR(20) NOT NULL,
+                month_start DATE NOT NULL,
+{measure_columns},
+                PRIMARY KEY (dam_id, month_start)
+            )
+        """)
+        dam_load_sequence.create_load_sequence_table(cursor)
+    connection.commit()
+
+def refresh_dam_resource_rollups(cursor, rows, load_seq):
+    """
+    Update the daily and monthly rollups for the given dam_resources rows, stamping the daily rows
+    with the transaction's load_seq from dam_load_sequence.next_load_seq.
+    Runs on the caller's cursor so the rollups commit in the same transaction as the upserts.
+    """
+    if not rows:
+        return
+
+    # Daily rollups hold exactly one dam_resources row each, so they are overwritten in place
+    daily_columns = ', '.join(f"sum_{m}, count_{m}" for m in dam_analysis.MEASURES)
+    daily_updates = ', '.join(f"sum_{m} = VALUES(sum_{m}), count_{m} = VALUES(count_{m})" for m in dam_analysis.MEASURES)
+    daily_query = f"""
+        INSERT INTO dam_resources_daily_rollup (dam_id, date, {daily_columns}, load_seq)
+        VALUES (%s, %s, {', '.join(['%s'] * 2 * len(dam_analysis.MEASURES))}, %s)
+        ON DUPLICATE KEY UPDATE {daily_updates}, load_seq = VALUES(load_seq)
+    """
+    daily_rows = []
+    for row in rows:
+        values = []
+        for value in row[2:]:
+            values.extend([value, 0 if value is None else 1])
+        daily_rows.append((row[0], row[1], *values, load_seq))
+    cursor.executemany(daily_query, daily_rows)
+
+    # Monthly rollups are re-aggregated from the daily rollups of each affected month
+    affected_months = sorted({(str(row[0]), str(row[1])[:7]) for row in rows})
+    month_filter = ' OR '.join(
+        ["(dam_id = %s AND date >= %s AND date < %s + INTERVAL 1 MONTH)"] * len(affected_months)
+    )
+    params = []
+    for dam_id, month in affected_months:
+        params.extend([dam_id, f"{month}-01", f"{month}-01"])
+    monthly_sums = ', '.join(f"SUM(sum_{m}), SUM(count_{m})" for m in dam_analysis.MEASURES)
+    monthly_updates = ', '.join(f"sum_{m} = VALUES(sum_{m}), count_{m} = VALUES(count_{m})" for m in dam_analysis.MEASURES)
+    cursor.execute(f"""
+        INSERT INTO dam_resources_monthly_rollup (dam_id, month_start, {daily_columns})
+        SELECT dam_id, DATE_SUB(date, INTERVAL DAYOFMONTH(date) - 1 DAY) AS month_start, {monthly_sums}
+        FROM dam_resources_daily_rollup
+        WHERE {month_filter}
+        GROUP BY dam_id, month_start
+        ON DUPLICATE KEY UPDATE {monthly_updates}
+    """, params)
+
+def insert_into_dam_resources(connection, data, identity=None, start_row=0):
     """
     Insert data into the 'dam_resources' table without affecting existing records.
+    Rows whose values match what is already stored are skipped, and writing resumes at start_row.
+    The daily and monthly rollups are updated in the same transaction as each batch.
+    Returns a dict with the number of rows written and skipped, and the earliest date
+    written per dam under 'first_changed'.
     """
     try:
-        with connection.cursor() as cursor:
-            # Prepare insert query
-            insert_query = """
-                INSERT INTO dam_resources (dam_id, date, storage_volume, percentage_full, storage_inflow, storage_release)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                storage_volume = VALUES(storage_volume),
-                percentage_full = VALUES(percentage_full),
-                storage_inflow = VALUES(storage_inflow),
-                storage_release = VALUES(storage_release)
-            """
-
-            # Iterate through each record in the data
-            for record in data:
-                dams = record.get('dams', [])
-                for dam in dams:
-                    for resource in dam.get('resources', []):
-                        cursor.execute(insert_query, (
-                            dam['dam_id'],
-                            resource['date'],
-                            resource['storage_volume'],
-                            resource['percentage_full'],
-                            resource['storage_inflow'],
-                            resource['storage_release']
-                        ))
-
-            # Commit changes
-            connection.commit()
-            logger.info("Successfully inserted data into the 'dam_resources' table.")
+        rows = extract_dam_resource_rows(data)
+
+        # Only send new or changed rows to the writer
+        stored_fingerprints = fetch_dam_resource_fingerprints(connection, rows[start_row:])
+        unchanged_keys = {
+            dam_resource_key(row[0], row[1]) for row in rows[start_row:]
+            if stored_fingerprints.get(dam_resource_key(row[0], row[1])) == dam_resource_fingerprint(row)
+        }
+        counts = {
+            'written': len(rows) - start_row - len(unchanged_keys),
+            'skipped': len(unchanged_keys),
+            'first_changed': {}
+        }
+        # Rows before start_row were written by an earlier attempt, so they count as changed
+        for position, row in enumerate(rows):
+            if position >= start_row and dam_resource_key(row[0], row[1]) in unchanged_keys:
+                continue
+            row_date = datetime.strptime(str(row[1])[:10], '%Y-%m-%d').date()
+            if row[0] not in counts['first_changed'] or row_date < counts['first_changed'][row[0]]:
+                counts['first_changed'][row[0]] = row_date
+
+        # Prepare insert query
+        insert_query = """
+            INSERT INTO dam_resources (dam_id, date, storage_volume, percentage_full, storage_inflow, storage_release)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            storage_volume = VALUES(storage_volume),
+            percentage_full = VALUES(percentage_full),
+            storage_inflow = VALUES(storage_inflow),
+            storage_release = VALUES(storage_release)
+        """
+
+        def write_batch(cursor, batch):
+            changed_rows = [row for row in batch if dam_resource_key(row[0], row[1]) not in unchanged_keys]
+            if changed_rows:
+                # Taken first so every writer locks the sequence row before any data row
+                load_seq = dam_load_sequence.next_load_seq(cursor)
+                cursor.executemany(insert_query, changed_rows)
+                refresh_dam_resource_rollups(cursor, changed_rows, load_seq)
+
+        commit_in_batches(connection, rows, write_batch, 'dam_resources', identity, start_row)
+
+        logger.info(f"Successfully inserted data into the 'dam_resources' table. Rows written: {counts['written']}, unchanged rows skipped: {counts['skipped']}.")
+        return counts
     except Exception as e:
         logger.error(f"Failed to insert data into the 'dam_resources' table. Exception: {e}")
         raise
@@ -146,66 +486,375 @@ def start_glue_job(job_name):
         logger.error(f"Failed to start Glue job '{job_name}'. Exception: {e}")
         raise
 
+# Source of the asynchronous events that refresh chart tiers outside the load
+CHART_TIER_EVENT_SOURCE = 'dam.chart_tiers'
+
+def request_chart_tier_refresh(first_changed):
+    """
+    Asynchronously invoke this function to update the downsampled chart tiers of the dams written
+    by a load, unless CHART_TIERS is 'false'. LTTB rebuilds can outlast the load's timeout, so they
+    never run on the load path. A failure is logged rather than raised;
+    scripts/backfill_chart_tiers.py rebuilds every tier.
+    """
+    if not first_changed or os.getenv('CHART_TIERS', 'true').lower() != 'true':
+        return
+    function_name = os.getenv('AWS_LAMBDA_FUNCTION_NAME')
+    if not function_name:
+        logger.error("AWS_LAMBDA_FUNCTION_NAME is not set. Cannot request a chart tier refresh.")
+        return
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({
+                'source': CHART_TIER_EVENT_SOURCE,
+                'first_changed': {dam_id: first_date.isoformat() for dam_id, first_date in first_changed.items()}
+            }).encode('utf-8')
+        )
+        logger.info(f"Requested a chart tier refresh for {len(first_changed)} dam(s).")
+    except Exception as e:
+        logger.error(f"Failed to request a chart tier refresh. Exception: {e}")
+
+def handle_chart_tier_event(event):
+    """
+    Refresh the chart tiers of at most CHART_TIER_DAMS_PER_INVOCATION dams from a refresh request,
+    passing the remaining dams on to another asynchronous invocation. Errors are raised so Lambda
+    retries the request; tier refreshes are idempotent.
+    """
+    per_invocation = int(os.getenv('CHART_TIER_DAMS_PER_INVOCATION', '10'))
+    pending = sorted(event.get('first_changed', {}).items())
+    batch = {dam_id: datetime.strptime(first_date, '%Y-%m-%d').date() for dam_id, first_date in pending[:per_invocation]}
+    remaining = {dam_id: datetime.strptime(first_date, '%Y-%m-%d').date() for dam_id, first_date in pending[per_invocation:]}
+
+    connection = connect_to_rds()
+    if not connection:
+        raise RuntimeError("Failed to connect to the database.")
+    try:
+        dam_tiers.ensure_chart_tier_table(connection)
+        dam_tiers.refresh_chart_tiers(connection, batch)
+        request_chart_tier_refresh(remaining)
+
+        # Cached chart responses still hold the old tiers
+        dam_data_version.bump_data_version(connection, 'lambda_load_rds_glue chart tiers')
+        request_snapshot_publish('chart tier refresh')
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        release_rds_connection(connection)
+
+    return {
+        "statusCode": 200,
+        "body": f"Chart tiers refreshed for {len(batch)} dam(s); {len(remaining)} passed on."
+    }
+
+def request_snapshot_publish(reason):
+    """
+    Asynchronously invoke the snapshot publisher named by SNAPSHOT_FUNCTION_NAME, if set.
+    A failure is logged rather than raised; the next load or Glue run publishes again.
+    """
+    function_name = os.getenv('SNAPSHOT_FUNCTION_NAME')
+    if not function_name:
+        return
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'reason': reason}).encode('utf-8')
+        )
+        logger.info(f"Requested dashboard snapshot publish from '{function_name}' after {reason}.")
+    except Exception as e:
+        logger.error(f"Failed to invoke snapshot publisher '{function_name}'. Exception: {e}")
+
+def ensure_glue_job_requests_table(connection, job_name):
+    """
+    Create the 'glue_job_requests' table used to coalesce Glue job starts if it does not exist.
+    """
+    create_query = """
+        CREATE TABLE IF NOT EXISTS glue_job_requests (
+            job_name VARCHAR(255) NOT NULL PRIMARY KEY,
+            last_started_at TIMESTAMP NULL,
+            follow_up_pending TINYINT(1) NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(create_query)
+        cursor.execute("INSERT IGNORE INTO glue_job_requests (job_name) VALUES (%s)", (job_name,))
+    connection.commit()
+
+def has_active_glue_run(job_name):
+    """
+    Check whether the Glue job currently has a run that is starting, running or stopping.
+    """
+    glue_client = boto3.client('glue')
+    response = glue_client.get_job_runs(JobName=job_name, MaxResults=10)
+    active_states = ('STARTING', 'RUNNING', 'STOPPING', 'WAITING')
+    return any(run['JobRunState'] in active_states for run in response.get('JobRuns', []))
+
+def queue_glue_follow_up(connection, job_name):
+    """
+    Record that one more Glue run is needed once the active run finishes.
+    Repeated requests collapse into the same single follow-up.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE glue_job_requests SET follow_up_pending = 1 WHERE job_name = %s",
+            (job_name,)
+        )
+    connection.commit()
+    logger.info(f"Queued a follow-up run for Glue job '{job_name}'.")
+
+def claim_glue_start(connection, job_name, debounce_seconds, require_follow_up=False):
+    """
+    Atomically claim the right to start the Glue job.
+    The claim fails if the job was started within the debounce window, or, when
+    require_follow_up is set, if no follow-up run is pending.
+    """
+    claim_query = """
+        UPDATE glue_job_requests
+        SET last_started_at = NOW(), follow_up_pending = 0
+        WHERE job_name = %s
+        AND (last_started_at IS NULL OR last_started_at < NOW() - INTERVAL %s SECOND)
+    """
+    if require_follow_up:
+        claim_query += " AND follow_up_pending = 1"
+    with connection.cursor() as cursor:
+        claimed = cursor.execute(claim_query, (job_name, debounce_seconds)) > 0
+    connection.commit()
+    return claimed
+
+def release_glue_start(connection, job_name):
+    """
+    Undo a claim whose run never started: clear the start stamp so the next request is not debounced
+    by it, and queue a follow-up so the scheduled check retries even if no further load arrives.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE glue_job_requests SET last_started_at = NULL, follow_up_pending = 1 WHERE job_name = %s",
+            (job_name,)
+        )
+    connection.commit()
+    logger.info(f"Released the start claim of Glue job '{job_name}' and queued a follow-up run.")
+
+def start_claimed_glue_job(connection, job_name):
+    """
+    Start the Glue job after a successful claim, queueing a follow-up if Glue rejects the run as concurrent.
+    Any other failure releases the claim before it is raised.
+    """
+    try:
+        start_glue_job(job_name)
+        return 'started'
+    except Exception as e:
+        if isinstance(e, ClientError) and e.response['Error']['Code'] == 'ConcurrentRunsExceededException':
+            queue_glue_follow_up(connection, job_name)
+            return 'queued'
+        release_glue_start(connection, job_name)
+        raise
+
+def request_glue_job_run(connection, job_name):
+    """
+    Request a Glue run for newly loaded data.
+    At most one run is started per GLUE_DEBOUNCE_SECONDS window; if a run is active
+    or was just started, a single follow-up run is queued instead.
+    """
+    debounce_seconds = int(os.getenv('GLUE_DEBOUNCE_SECONDS', '300'))
+
+    if has_active_glue_run(job_name):
+        logger.info(f"Glue job '{job_name}' already has an active run.")
+        queue_glue_follow_up(connection, job_name)
+        return 'queued'
+
+    if not claim_glue_start(connection, job_name, debounce_seconds):
+        logger.info(f"Glue job '{job_name}' was started within the last {debounce_seconds} seconds.")
+        queue_glue_follow_up(connection, job_name)
+        return 'queued'
+
+    return start_claimed_glue_job(connection, job_name)
+
+def run_local_analysis(connection):
+    """
+    Run the dam analytics in this Lambda with the pure-Python engine instead of starting the Glue job.
+    Uses the watermark-based incremental analysis unless ANALYTICS_INCREMENTAL is 'false'; full runs
+    read complete years from the time-series archives at HISTORY_ARCHIVE when it is set.
+    Returns False if the engine is not included in the deployment package.
+    """
+    if dam_analytics_engine is None:
+        logger.error("ANALYTICS_ENGINE is 'local' but dam_analytics_engine is not in the deployment package.")
+        return False
+    if os.getenv('ANALYTICS_INCREMENTAL', 'true').lower() == 'true':
+        analysed = dam_analytics_engine.run_incremental_analysis(connection, datetime.now())
+    else:
+        analysed = dam_analytics_engine.run_analysis(
+            connection, datetime.now(), history_archive=os.getenv('HISTORY_ARCHIVE') or None
+        )
+    logger.info(f"Local analytics engine analysed {analysed} dam(s).")
+    return True
+
+def handle_glue_follow_up_event(event, job_name):
+    """
+    Start a queued follow-up Glue run.
+    Invoked by Glue job state change events once a run finishes, and by a schedule
+    that drains follow-ups whose debounce window has passed.
+    """
+    logger.info(f"Checking for a queued follow-up run of Glue job '{job_name}'.")
+
+    # A finished run frees the job immediately; scheduled checks still respect the debounce window
+    if event.get('source') == 'aws.glue':
+        debounce_seconds = 0
+    else:
+        debounce_seconds = int(os.getenv('GLUE_DEBOUNCE_SECONDS', '300'))
+
+    connection = connect_to_rds()
+    if not connection:
+        return {
+            "statusCode": 500,
+            "body": "Failed to connect to the database."
+        }
+
+    try:
+        # A successful run rewrote the analysis tables, so cached dashboard responses are stale
+        if event.get('source') == 'aws.glue' and event.get('detail', {}).get('state') == 'SUCCEEDED':
+            dam_data_version.bump_data_version(connection, job_name)
+            request_snapshot_publish(f"Glue job '{job_name}'")
+
+        if has_active_glue_run(job_name):
+            logger.info(f"Glue job '{job_name}' is still running. Follow-up stays queued.")
+            status = 'waiting'
+        elif claim_glue_start(connection, job_name, debounce_seconds, require_follow_up=True):
+            status = start_claimed_glue_job(connection, job_name)
+        else:
+            status = 'idle'
+    except Exception as e:
+        logger.error(f"Failed to start queued follow-up for Glue job '{job_name}'. Exception: {e}")
+        return {
+            "statusCode": 500,
+            "body": f"Error starting queued Glue run: {e}"
+        }
+    finally:
+        release_rds_connection(connection)
+
+    logger.info(f"Glue follow-up check for '{job_name}' finished with status '{status}'.")
+    return {
+        "statusCode": 200,
+        "body": f"Glue follow-up status: {status}."
+    }
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler function triggered by S3 events.
+    Glue job state change and scheduled events drain queued follow-up Glue runs, and
+    asynchronous chart tier events refresh the tiers of freshly loaded dams.
     """
     logger.info("Lambda lambda_load_rds_glue started.")
     logger.info(f"Event received: {event}")
 
+    if event.get('source') == CHART_TIER_EVENT_SOURCE:
+        return handle_chart_tier_event(event)
+
+    glue_job_name = os.getenv('GLUE_JOB_NAME', 'latest_dam_data_etl')  # Default to 'latest_dam_data_etl'
+    if event.get('source') in ('aws.glue', 'aws.events'):
+        return handle_glue_follow_up_event(event, glue_job_name)
+
     try:
-        # Extract bucket name and object key from the event
         records = event['Records']
-        for record in records:
-            s3_info = record['s3']
-            bucket_name = s3_info['bucket']['name']
-            object_key = s3_info['object']['key']
-            logger.info(f"Triggered by S3 bucket '{bucket_name}', object '{object_key}'.")
-
-            # Fetch data from S3
-            data = fetch_data_from_s3(bucket_name, object_key)
-            if not data:
-                logger.error("No data fetched from S3. Exiting Lambda execution.")
-                return {
-                    "statusCode": 500,
-                    "body": "Failed to fetch data from S3."
-                }
-
-            # Connect to RDS
-            connection = connect_to_rds()
-            if not connection:
-                logger.error("Database connection failed. Exiting Lambda execution.")
-                return {
-                    "statusCode": 500,
-                    "body": "Failed to connect to the database."
-                }
 
-            try:
-                # Replace latest_data table content
-                replace_latest_data(connection, data)
-
-                # Insert data into dam_resources table
-                insert_into_dam_resources(connection, data)
-            finally:
-                connection.close()
-                logger.info("RDS connection closed.")
-
-            # Start the Glue job after data has been written to RDS
-            glue_job_name = os.getenv('GLUE_JOB_NAME', 'latest_dam_data_etl')  # Default to 'latest_dam_data_etl'
-            if glue_job_name:
-                start_glue_job(glue_job_name)
-            else:
-                logger.error("GLUE_JOB_NAME environment variable is not set. Cannot start Glue job.")
+        # Connect to RDS once for every record in the event
+        connection = connect_to_rds()
+        if not connection:
+            raise RuntimeError("Failed to connect to the database.")
+
+        loaded_objects = []
+        loaded_identities = []
+        failed_objects = []
+        rows_written = 0
+        rows_skipped = 0
+        first_changed = {}
+        try:
+            ensure_s3_event_ledger_table(connection)
+            ensure_glue_job_requests_table(connection, glue_job_name)
+            ensure_rollup_tables(connection)
+
+            for record in records:
+                s3_info = record['s3']
+                bucket_name = s3_info['bucket']['name']
+                object_key = s3_info['object']['key']
+                logger.info(f"Triggered by S3 bucket '{bucket_name}', object '{object_key}'.")
+                identity = get_s3_event_identity(s3_info)
+
+                # Skip duplicate and replayed notifications before doing any work
+                checkpoint = claim_s3_event(connection, identity)
+                if checkpoint is None:
+                    continue
+
+                try:
+                    # Fetch data from S3
+                    data = fetch_data_from_s3(bucket_name, object_key)
+                    if not data:
+                        logger.error(f"No data fetched from S3 object '{object_key}'.")
+                        release_s3_event(connection, identity)
+                        failed_objects.append(object_key)
+                        continue
+
+                    # Replace latest_data table content, unless a previous attempt already finished it
+                    if checkpoint['stage'] != 'dam_resources':
+                        replace_latest_data(connection, data, identity, checkpoint['rows'])
+                        checkpoint = {'stage': 'dam_resources', 'rows': 0}
+
+                    # Insert data into dam_resources table
+                    counts = insert_into_dam_resources(connection, data, identity, checkpoint['rows'])
+                    rows_written += counts['written']
+                    rows_skipped += counts['skipped']
+                    for dam_id, first_date in counts['first_changed'].items():
+                        first_changed[dam_id] = min(first_date, first_changed.get(dam_id, first_date))
+                except Exception:
+                    # Objects loaded earlier in this event have not had their analytics requested yet
+                    for claimed in [*loaded_identities, identity]:
+                        release_s3_event(connection, claimed)
+                    raise
+
+                loaded_objects.append(object_key)
+                loaded_identities.append(identity)
+
+            # Run the analytics once for everything loaded by this event, in-process or as one Glue run
+            if loaded_objects:
+                # Events stay claimed until the analytics are requested: if the request fails they are
+                # released, and the redelivery resumes from the final checkpoint and requests them again
+                try:
+                    analysed_locally = os.getenv('ANALYTICS_ENGINE', 'glue') == 'local' and run_local_analysis(connection)
+                    if analysed_locally:
+                        logger.info("Analytics computed in-process; Glue job not requested.")
+                    elif glue_job_name:
+                        request_glue_job_run(connection, glue_job_name)
+                    else:
+                        logger.error("GLUE_JOB_NAME environment variable is not set. Cannot start Glue job.")
+
+                    # Tell cached dashboard readers that latest_data (and any local analysis) changed
+                    dam_data_version.bump_data_version(connection, 'lambda_load_rds_glue')
+                    request_snapshot_publish('load')
+                except Exception:
+                    for identity in loaded_identities:
+                        release_s3_event(connection, identity)
+                    raise
+
+                for identity in loaded_identities:
+                    complete_s3_event(connection, identity)
+
+                request_chart_tier_refresh(first_changed)
+        finally:
+            release_rds_connection(connection)
 
     except Exception as e:
+        # Raised rather than returned, so S3's asynchronous invocation retries the event; the ledger
+        # skips the objects already completed and resumes the released ones from their checkpoints
         logger.error(f"Unhandled exception in Lambda: {e}")
-        return {
-            "statusCode": 500,
-            "body": f"Error processing S3 event: {e}"
-        }
+        raise
+
+    if failed_objects:
+        raise RuntimeError(f"Failed to fetch data from S3 for: {', '.join(failed_objects)}.")
 
-    logger.info(f"S3 bucket '{bucket_name}' has been successfully updated. Lambda function triggered as a result.")
+    logger.info(f"Loaded {len(loaded_objects)} of {len(records)} S3 object(s). 'dam_resources' rows written: {rows_written}, skipped: {rows_skipped}.")
     return {
         "statusCode": 200,
-        "body": f"S3 bucket '{bucket_name}' has been successfully updated. Data replaced in 'latest_data' table and added to 'dam_resources' table."
+        "body": f"Loaded {len(loaded_objects)} of {len(records)} S3 object(s). Data replaced in 'latest_data' table; {rows_written} row(s) written to and {rows_skipped} unchanged row(s) skipped in 'dam_resources' table."
     }
@@ -0,0 +1,125 @@
+# lambda_partition_maintenance/lambda_partition_maintenance.py
+
+import json
+import logging
+import os
+from datetime import datetime
+import boto3
+from botocore.exceptions import ClientError
+import dam_db  # Copied into the deployment package from shared/
+import dam_partitions  # Copied into the deployment package from shared/
+import dam_timeseries  # Copied into the deployment package from shared/
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def get_archive_metadata(s3_client, bucket, key):
+    """
+    Return the metadata recorded on an archived partition, or None if it has not been archived.
+    """
+    try:
+        return s3_client.head_object(Bucket=bucket, Key=key).get('Metadata', {})
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+def get_archived_checksum(s3_client, bucket, key):
+    """
+    Return the partition checksum recorded on an archive, or None if it is missing or predates checksums.
+    """
+    return (get_archive_metadata(s3_client, bucket, key) or {}).get('checksum')
+
+def refresh_timeseries_archives(connection, s3_client, bucket, prefix, current_year):
+    """
+    Write the time-series archive of every complete partitioned year whose archive is missing
+    or was written from different partition contents. Returns the years written.
+    """
+    written = []
+    for year in dam_partitions.years_past_retention(connection, current_year, 1):
+        key = dam_timeseries.yearly_archive_key(prefix, year)
+        if get_archived_checksum(s3_client, bucket, key) != dam_partitions.partition_checksum(connection, year):
+            dam_partitions.archive_year_timeseries(connection, s3_client, bucket, prefix, year)
+            written.append(year)
+    return written
+
+def archive_and_drop(connection, s3_client, bucket, prefix, year, drop_archived):
+    """
+    Archive one year's partition to S3 unless an archive of the same partition contents already exists,
+    then, when drop_archived is set, drop the partition once the archive is confirmed.
+    Returns a summary dict for the response body.
+    """
+    key = dam_partitions.archive_key(prefix, year)
+    checksum = dam_partitions.partition_checksum(connection, year)
+    if get_archived_checksum(s3_client, bucket, key) != checksum:
+        dam_partitions.archive_year_partition(connection, s3_client, bucket, prefix, year)
+
+    metadata = get_archive_metadata(s3_client, bucket, key) or {}
+    archived_rows = int(metadata['row-count']) if 'row-count' in metadata else None
+    summary = {'year': year, 'key': key, 'rows': archived_rows, 'dropped': False}
+    if not drop_archived:
+        return summary
+    if metadata.get('checksum') != checksum:
+        logger.error(f"Archive of {year} has checksum {metadata.get('checksum')} but the partition has {checksum}. Keeping the partition.")
+        return summary
+
+    dam_partitions.drop_year_partition(connection, year)
+    summary['dropped'] = True
+    return summary
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler function run on a schedule.
+    Pre-creates the dam_resources partitions for the coming year, refreshes the time-series
+    archives of complete years read by the analytics (unless TIMESERIES_ARCHIVE is 'false'),
+    and archives, and optionally drops, partitions older than PARTITION_RETENTION_YEARS (0 keeps every year).
+    """
+    logger.info("Lambda lambda_partition_maintenance started.")
+
+    current_year = datetime.now().year
+    retention_years = int(os.getenv('PARTITION_RETENTION_YEARS', '0'))
+    archive_bucket = os.getenv('ARCHIVE_BUCKET')
+    archive_prefix = os.getenv('ARCHIVE_PREFIX', 'archive')
+    drop_archived = os.getenv('DROP_ARCHIVED_PARTITIONS', 'false').lower() == 'true'
+    timeseries_archive = os.getenv('TIMESERIES_ARCHIVE', 'true').lower() == 'true'
+
+    try:
+        pool = dam_db.get_pool()
+    except ValueError as e:
+        logger.error(str(e))
+        return {
+            "statusCode": 500,
+            "body": str(e)
+        }
+
+    try:
+        with pool.connection() as connection:
+            added_years = dam_partitions.ensure_year_partitions(connection, current_year + 1)
+
+            # Written before any partition is dropped, so dropped years stay readable by the analytics
+            timeseries_years = []
+            if timeseries_archive and archive_bucket:
+                timeseries_years = refresh_timeseries_archives(
+                    connection, boto3.client('s3'), archive_bucket, archive_prefix, current_year
+                )
+
+            archived = []
+            if retention_years and archive_bucket:
+                s3_client = boto3.client('s3')
+                for year in dam_partitions.years_past_retention(connection, current_year, retention_years):
+                    archived.append(archive_and_drop(connection, s3_client, archive_bucket, archive_prefix, year, drop_archived))
+            elif retention_years:
+                logger.warning("PARTITION_RETENTION_YEARS is set but ARCHIVE_BUCKET is not. Skipping archiving.")
+    except Exception as e:
+        logger.error(f"Partition maintenance failed. Exception: {e}")
+        return {
+            "statusCode": 500,
+            "body": f"Partition maintenance failed: {e}"
+        }
+
+    logger.info(f"Partition maintenance finished. Added years: {added_years}. Time series written: {timeseries_years}. Archived: {archived}.")
+    return {
+        "statusCode": 200,
+        "body": json.dumps({'added_years': added_years, 'timeseries_years': timeseries_years, 'archived': archived})
+    }
@@ -0,0 +1,260 @@
+# lambda_publish_snapshots/lambda_publish_snapshots.py
+
+import gzip
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import boto3
+from botocore.exceptions import ClientError
+import pymysql  # Ensure this library is included in the deployment package
+import dam_db  # Copied into the deployment package from shared/
+import dam_data_version  # Copied into the deployment package from shared/
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Versioned documents never change once written; only the manifest pointing at them does
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MANIFEST_CACHE_CONTROL = 'public, max-age=60'
+
+def json_default(obj):
+    """
+    Serialise the Decimal and date values pymysql returns.
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serialisable")
+
+def fetch_latest_per_dam(connection):
+    """
+    Return each dam's newest latest_data row, ordered by dam_id.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("""
+            SELECT l.* FROM latest_data l
+            JOIN (SELECT dam_id, MAX(date) AS date FROM latest_data GROUP BY dam_id) newest
+              ON newest.dam_id = l.dam_id AND newest.date = l.date
+            ORDER BY l.dam_id
+        """)
+        return cursor.fetchall()
+
+def fetch_analysis_per_dam(connection):
+    """
+    Return each dam's most recent specific_dam_analysis row, ordered by dam_id.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("""
+            SELECT a.* FROM specific_dam_analysis a
+            JOIN (SELECT dam_id, MAX(analysis_date) AS analysis_date FROM specific_dam_analysis GROUP BY dam_id) newest
+              ON newest.dam_id = a.dam_id AND newest.analysis_date = a.analysis_date
+            ORDER BY a.dam_id
+        """)
+        return cursor.fetchall()
+
+def fetch_overall_analysis(connection):
+    """
+    Return the most recent overall_dam_analysis row, or None.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute("SELECT * FROM overall_dam_analysis ORDER BY analysis_date DESC LIMIT 1")
+        return cursor.fetchone()
+
+def render_snapshots(latest_rows, analysis_rows, overall_row):
+    """
+    Render the dashboard views into {relative key: document}: every dam's latest reading,
+    one latest and one analysis document per dam, and the overall analysis.
+    """
+    documents = {'latest.json': latest_rows}
+    for row in latest_rows:
+        documents[f"latest/{row['dam_id']}.json"] = row
+    for row in analysis_rows:
+        documents[f"analysis/{row['dam_id']}.json"] = row
+    if overall_row:
+        documents['analysis/overall.json'] = overall_row
+    return documents
+
+def compress_document(document):
+    """
+    Serialise a document to compact JSON and gzip it. mtime is fixed so equal documents give equal bytes.
+    """
+    body = json.dumps(document, default=json_default, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+def put_snapshot(s3_client, bucket, key, document, cache_control, **conditions):
+    """
+    Upload one gzipped JSON document with the given Cache-Control header. conditions are passed
+    through to put_object (IfMatch / IfNoneMatch) for conditional writes.
+    """
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=compress_document(document),
+        ContentType='application/json',
+        ContentEncoding='gzip',
+        CacheControl=cache_control,
+        **conditions
+    )
+
+def get_published_manifest(s3_client, bucket, prefix):
+    """
+    Return (version, ETag) of the current manifest, or (None, None) if nothing is published yet.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=f"{prefix}/manifest.json")
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return None, None
+        raise
+    body = response['Body'].read()
+    if response.get('ContentEncoding') == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body).get('version'), response.get('ETag')
+
+def supports_conditional_put(s3_client):
+    """
+    True when the installed botocore knows the S3 conditional write parameters of PutObject.
+    """
+    return 'IfMatch' in s3_client.meta.service_model.operation_model('PutObject').input_shape.members
+
+def is_superseded(published_version, version, force=False):
+    """
+    True when the published manifest already names version (unless forced) or a newer one.
+    """
+    if published_version is None:
+        return False
+    return published_version > version or (published_version == version and not force)
+
+def write_manifest(s3_client, bucket, prefix, manifest, force=False):
+    """
+    Point {prefix}/manifest.json at manifest['version'] unless an overlapping invocation has already
+    published that version or a newer one. The manifest is re-read right before the write and, where
+    S3 conditional writes are available, the write only succeeds if nobody replaced it in between;
+    otherwise the check is repeated. Returns True if the manifest was written.
+    """
+    conditional = supports_conditional_put(s3_client)
+    while True:
+        published_version, etag = get_published_manifest(s3_client, bucket, prefix)
+        if is_superseded(published_version, manifest['version'], force):
+            logger.info(f"Manifest already names version {published_version}; not publishing {manifest['version']}.")
+            return False
+
+        conditions = {}
+        if conditional:
+            conditions = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            put_snapshot(s3_client, bucket, f"{prefix}/manifest.json", manifest, MANIFEST_CACHE_CONTROL, **conditions)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                raise
+            logger.info("Manifest changed while publishing. Checking it again.")
+
+def prune_old_versions(s3_client, bucket, prefix, keep, published_version):
+    """
+    Delete all but the newest keep versioned snapshot sets up to published_version. Older sets stay
+    readable until then, so clients holding a previous manifest do not break mid-page. Newer sets
+    belong to an overlapping invocation that may be about to publish them, so they are left alone.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    versions = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/versions/", Delimiter='/'):
+        for common_prefix in page.get('CommonPrefixes', []):
+            name = common_prefix['Prefix'].rstrip('/').rsplit('/', 1)[-1]
+            if name.isdigit() and int(name) <= published_version:
+                versions.append(int(name))
+
+    for version in sorted(versions)[:-keep]:
+        keys = [
+            {'Key': obj['Key']}
+            for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/versions/{version}/")
+            for obj in page.get('Contents', [])
+        ]
+        for start in range(0, len(keys), 1000):
+            s3_client.delete_objects(Bucket=bucket, Delete={'Objects': keys[start:start + 1000], 'Quiet': True})
+        logger.info(f"Deleted snapshot version {version} ({len(keys)} object(s)).")
+
+def publish_snapshots(connection, s3_client, bucket, prefix, keep_versions=3, force=False, max_workers=8):
+    """
+    Publish the dashboard snapshots for the current data version under {prefix}/versions/{version}/
+    and then point {prefix}/manifest.json at them. Skips the work when that version or a newer one is
+    already published, including by an overlapping invocation. Returns the published version, or None
+    if it was skipped.
+    """
+    # Start a new transaction so the version and the documents below come from one fresh snapshot,
+    # not one left open by an earlier invocation on a warm container
+    connection.rollback()
+    version = dam_data_version.get_data_version(connection)
+    published_version, _ = get_published_manifest(s3_client, bucket, prefix)
+    if is_superseded(published_version, version, force):
+        logger.info(f"Snapshot version {version} is already published or superseded by {published_version}.")
+        return None
+
+    documents = render_snapshots(
+        fetch_latest_per_dam(connection),
+        fetch_analysis_per_dam(connection),
+        fetch_overall_analysis(connection)
+    )
+    version_prefix = f"{prefix}/versions/{version}"
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(put_snapshot, s3_client, bucket, f"{version_prefix}/{key}", document, IMMUTABLE_CACHE_CONTROL)
+            for key, document in documents.items()
+        ]
+        for future in futures:
+            future.result()
+
+    # Written last so readers never see a manifest for a partly uploaded version
+    manifest = {
+        'version': version,
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'prefix': f"{version_prefix}/",
+        'documents': sorted(documents)
+    }
+    if not write_manifest(s3_client, bucket, prefix, manifest, force):
+        return None
+    logger.info(f"Published {len(documents)} snapshot document(s) for data version {version} to s3://{bucket}/{version_prefix}/.")
+
+    prune_old_versions(s3_client, bucket, prefix, keep_versions, version)
+    return version
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler invoked asynchronously by lambda_load_rds_glue after each load and after
+    each successful Glue run. Pass {"force": true} to republish the current version.
+    """
+    logger.info("Lambda lambda_publish_snapshots started.")
+    logger.info(f"Event received: {event}")
+
+    bucket = os.getenv('SNAPSHOT_BUCKET')
+    prefix = os.getenv('SNAPSHOT_PREFIX', 'snapshots').rstrip('/')
+    keep_versions = int(os.getenv('KEEP_SNAPSHOT_VERSIONS', '3'))
+    if not bucket:
+        logger.error("SNAPSHOT_BUCKET environment variable is not set.")
+        return {
+            "statusCode": 500,
+            "body": "SNAPSHOT_BUCKET environment variable is not set."
+        }
+
+    try:
+        # Read from the primary: the replica may not have the rows behind the version just bumped
+        with dam_db.get_pool().connection() as connection:
+            version = publish_snapshots(
+                connection, boto3.client('s3'), bucket, prefix, keep_versions, bool(event.get('force'))
+            )
+    except Exception as e:
+        logger.error(f"Failed to publish dashboard snapshots. Exception: {e}")
+        return {
+            "statusCode": 500,
+            "body": f"Failed to publish dashboard snapshots: {e}"
+        }
+
+    return {
+        "statusCode": 200,
+        "body": f"Published snapshot version {version}." if version is not None else "Snapshots already up to date."
+    }
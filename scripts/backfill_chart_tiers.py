@@ -0,0 +1,69 @@
+# scripts/backfill_chart_tiers.py
+
+import pymysql
+import os
+import sys
+from dotenv import load_dotenv
+import logging
+
+# Shared modules, also packaged with the Lambda functions and Glue jobs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+import dam_db
+import dam_tiers
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Database connection details
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = int(os.getenv("DB_PORT", 3306))
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+def get_first_dates(connection):
+    """
+    Return the earliest daily rollup date of every dam.
+
+    Args:
+        connection (pymysql.Connection): Active database connection.
+
+    Returns:
+        dict: {dam_id: earliest date}.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SELECT dam_id, MIN(date) FROM dam_resources_daily_rollup GROUP BY dam_id")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+def main():
+    """
+    Main function to rebuild every dam's chart tiers from 'dam_resources_daily_rollup'.
+    Starting from each dam's first day recomputes every calendar bucket and rebuilds the LTTB tiers.
+    """
+    try:
+        pool = dam_db.get_pool(
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME
+        )
+        connection = pool.acquire()
+        logger.info(f"Connected to the database '{DB_NAME}'.")
+
+        dam_tiers.ensure_chart_tier_table(connection)
+        dam_tiers.refresh_chart_tiers(connection, get_first_dates(connection))
+    except Exception as e:
+        logger.error(f"Failed to backfill chart tiers: {e}")
+    finally:
+        if 'connection' in locals():
+            pool.release(connection)
+            pool.close_all()
+            logger.info("Database connection closed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# scripts/backfill_rollups.py
+
+import os
+import sys
+from dotenv import load_dotenv
+import logging
+
+# Shared database module, also packaged with the Lambda functions and Glue jobs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+import dam_db
+import dam_analysis
+import dam_load_sequence
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Database connection details
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = int(os.getenv("DB_PORT", 3306))
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+def backfill_daily_rollup(connection):
+    """
+    Rebuild 'dam_resources_daily_rollup' from the full 'dam_resources' history.
+    Rows are stamped with a new load sequence number so the incremental analytics and the lake
+    export pick the rebuilt days up.
+
+    Args:
+        connection (pymysql.Connection): Active database connection.
+
+    Returns:
+        int: Number of rows affected.
+    """
+    columns = ', '.join(f"sum_{m}, count_{m}" for m in dam_analysis.MEASURES)
+    values = ', '.join(f"{m}, COUNT({m})" for m in dam_analysis.MEASURES)
+    updates = ', '.join(f"sum_{m} = VALUES(sum_{m}), count_{m} = VALUES(count_{m})" for m in dam_analysis.MEASURES)
+    query = f"""
+        INSERT INTO dam_resources_daily_rollup (dam_id, date, {columns}, load_seq)
+        SELECT dam_id, date, {values}, %s
+        FROM dam_resources
+        GROUP BY dam_id, date
+        ON DUPLICATE KEY UPDATE {updates}, load_seq = VALUES(load_seq)
+    """
+    with connection.cursor() as cursor:
+        load_seq = dam_load_sequence.next_load_seq(cursor)
+        affected = cursor.execute(query, (load_seq,))
+    connection.commit()
+    logger.info(f"Backfilled 'dam_resources_daily_rollup' ({affected} rows affected).")
+    return affected
+
+def backfill_monthly_rollup(connection):
+    """
+    Rebuild 'dam_resources_monthly_rollup' from 'dam_resources_daily_rollup'.
+
+    Args:
+        connection (pymysql.Connection): Active database connection.
+
+    Returns:
+        int: Number of rows affected.
+    """
+    columns = ', '.join(f"sum_{m}, count_{m}" for m in dam_analysis.MEASURES)
+    sums = ', '.join(f"SUM(sum_{m}), SUM(count_{m})" for m in dam_analysis.MEASURES)
+    updates = ', '.join(f"sum_{m} = VALUES(sum_{m}), count_{m} = VALUES(count_{m})" for m in dam_analysis.MEASURES)
+    query = f"""
+        INSERT INTO dam_resources_monthly_rollup (dam_id, month_start, {columns})
+        SELECT dam_id, DATE_SUB(date, INTERVAL DAYOFMONTH(date) - 1 DAY) AS month_start, {sums}
+        FROM dam_resources_daily_rollup
+        GROUP BY dam_id, month_start
+        ON DUPLICATE KEY UPDATE {updates}
+    """
+    with connection.cursor() as cursor:
+        affected = cursor.execute(query)
+    connection.commit()
+    logger.info(f"Backfilled 'dam_resources_monthly_rollup' ({affected} rows affected).")
+    return affected
+
+def main():
+    """
+    Main function to backfill the rollup tables from existing 'dam_resources' history.
+    The tables are created by lambda_load_rds_glue, which keeps them up to date after the backfill.
+    """
+    try:
+        pool = dam_db.get_pool(
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME
+        )
+        connection = pool.acquire()
+        logger.info(f"Connected to the database '{DB_NAME}'.")
+
+        backfill_daily_rollup(connection)
+        backfill_monthly_rollup(connection)
+    except Exception as e:
+        logger.error(f"Failed to backfill rollup tables: {e}")
+    finally:
+        if 'connection' in locals():
+            pool.release(connection)
+            pool.close_all()
+            logger.info("Database connection closed.")
+
+if __name__ == "__main__":
+    main()
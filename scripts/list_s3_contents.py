@@ -1,9 +1,13 @@
 # scripts/list_s3_contents.py
 
+import argparse
 import boto3
 import os
 import json
 import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
@@ -14,6 +18,8 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+GZIP_MAGIC = b'\x1f\x8b'
+
 def get_s3_client():
     """
     Initialize and return an S3 client.
@@ -26,88 +32,188 @@ def get_s3_client():
         logger.error(f"Failed to initialize S3 client. Exception: {e}")
         raise
 
-def list_s3_objects(s3_client, bucket_name):
+def parse_date(value):
+    """
+    Parse an ISO date or datetime argument as UTC.
+
+    Args:
+        value (str): e.g. '2024-10-01' or '2024-10-01T06:00:00'.
+
+    Returns:
+        datetime: Timezone-aware datetime.
     """
-    List all objects in the specified S3 bucket.
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def list_s3_objects(s3_client, bucket_name, prefix='', since=None, until=None):
+    """
+    Yield the objects under a prefix, page by page, keeping those last modified in [since, until).
+
+    Args:
+        s3_client (boto3.client): S3 client.
+        bucket_name (str): Bucket to list.
+        prefix (str): Key prefix, e.g. a partition such as 'year=2024/'.
+        since (datetime): Earliest LastModified to keep, or None.
+        until (datetime): LastModified to stop before, or None.
+
+    Yields:
+        dict: Listing entries with Key, Size and LastModified.
     """
     try:
         paginator = s3_client.get_paginator('list_objects_v2')
-        pages = paginator.paginate(Bucket=bucket_name)
-        
-        objects = []
-        for page in pages:
-            if 'Contents' in page:
-                for obj in page['Contents']:
-                    objects.append(obj['Key'])
-        
-        if not objects:
-            logger.info(f"No objects found in bucket '{bucket_name}'.")
-        else:
-            logger.info(f"Found {len(objects)} objects in bucket '{bucket_name}'.")
-        
-        return objects
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                if since and obj['LastModified'] < since:
+                    continue
+                if until and obj['LastModified'] >= until:
+                    continue
+                yield obj
     except ClientError as e:
         logger.error(f"Failed to list objects in bucket '{bucket_name}'. Exception: {e}")
         raise
 
-def get_object_content(s3_client, bucket_name, object_key):
+def decompress_preview(data, limit):
     """
-    Retrieve and return the content of the specified S3 object.
+    Decompress a gzip body, which may be cut short by a range read.
+
+    Args:
+        data (bytes): Whole or leading part of a gzip stream.
+        limit (int): Maximum decompressed bytes to return, or 0 for all.
+
+    Returns:
+        tuple: (decompressed bytes, whether output was cut off by limit or the input ended early).
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    content = decompressor.decompress(data, limit) if limit else decompressor.decompress(data)
+    return content, bool(decompressor.unconsumed_tail) or not decompressor.eof
+
+def get_object_preview(s3_client, bucket_name, obj, preview_bytes):
     """
+    Read the start of an object with a byte-range GET, decompressing gzip bodies.
+
+    Args:
+        s3_client (boto3.client): S3 client.
+        bucket_name (str): Bucket holding the object.
+        obj (dict): Listing entry of the object.
+        preview_bytes (int): Bytes to read and show, or 0 to read the whole object.
+
+    Returns:
+        tuple: (content bytes or None on failure, whether the content is truncated).
+    """
+    request = {'Bucket': bucket_name, 'Key': obj['Key']}
+    if preview_bytes and obj['Size'] > preview_bytes:
+        request['Range'] = f"bytes=0-{preview_bytes - 1}"
     try:
-        response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-        content = response['Body'].read().decode('utf-8')
-        logger.info(f"Successfully retrieved content for object '{object_key}'.")
-        return content
+        response = s3_client.get_object(**request)
+        data = response['Body'].read()
     except ClientError as e:
-        logger.error(f"Failed to retrieve object '{object_key}' from bucket '{bucket_name}'. Exception: {e}")
-        return None
+        logger.error(f"Failed to retrieve object '{obj['Key']}' from bucket '{bucket_name}'. Exception: {e}")
+        return None, False
+
+    truncated = len(data) < obj['Size']
+    # S3 returns the stored bytes, so gzip objects are detected by header or magic bytes
+    if response.get('ContentEncoding') == 'gzip' or data.startswith(GZIP_MAGIC):
+        try:
+            content, cut = decompress_preview(data, preview_bytes)
+            return content, truncated or cut
+        except zlib.error as e:
+            logger.warning(f"Object '{obj['Key']}' looks gzip-compressed but could not be decompressed: {e}")
+    return data, truncated
+
+def format_content(content, truncated):
+    """
+    Render object content for printing: pretty JSON when the whole document parses, else text.
+
+    Args:
+        content (bytes): Object content.
+        truncated (bool): Whether content is only the start of the object.
+
+    Returns:
+        str: Printable content.
+    """
+    if b'\x00' in content[:1024]:
+        return f"<binary content, {len(content)} bytes shown>"
+    text = content.decode('utf-8', errors='replace')
+    if not truncated:
+        try:
+            # Attempt to pretty-print JSON content if applicable
+            return json.dumps(json.loads(text), indent=2)
+        except json.JSONDecodeError:
+            return text
+    return f"{text}\n... (truncated)"
+
+def inspect_objects(s3_client, bucket_name, objects, preview_bytes, workers):
+    """
+    Fetch object previews on a bounded thread pool and print each as soon as it completes.
+    At most twice the worker count is in flight, so large listings are never queued up whole.
+
+    Returns:
+        int: Number of objects inspected.
+    """
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        objects = iter(objects)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                obj = next(objects, None)
+                if obj is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(get_object_preview, s3_client, bucket_name, obj, preview_bytes)] = obj
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                obj = pending.pop(future)
+                content, truncated = future.result()
+                count += 1
+                print(f"\n--- Content of '{obj['Key']}' ({obj['Size']} bytes, modified {obj['LastModified'].isoformat()}) ---")
+                if content is None:
+                    print("Failed to retrieve content.")
+                else:
+                    print(format_content(content, truncated), flush=True)
+    return count
 
 def main():
     """
-    Main function to list and print contents of all objects in the S3 bucket.
+    Main function to list the objects in the S3 bucket and print a preview of each.
     """
-    # Retrieve the S3 bucket name from environment variables
-    bucket_name = os.getenv('S3_BUCKET_NAME')
-    
-    if not bucket_name:
+    parser = argparse.ArgumentParser(description="Print previews of the objects in the S3 bucket.")
+    parser.add_argument('--bucket', default=os.getenv('S3_BUCKET_NAME'), help="Bucket to inspect.")
+    parser.add_argument('--prefix', default='', help="Only objects whose key starts with this prefix.")
+    parser.add_argument('--since', type=parse_date, help="Only objects modified at or after this ISO date/time (UTC).")
+    parser.add_argument('--until', type=parse_date, help="Only objects modified before this ISO date/time (UTC).")
+    parser.add_argument('--preview-bytes', type=int, default=4096, help="Bytes read from each object; 0 reads whole objects.")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent downloads.")
+    args = parser.parse_args()
+
+    if not args.bucket:
         logger.error("Environment variable 'S3_BUCKET_NAME' is not set.")
-        print("Please set the 'S3_BUCKET_NAME' environment variable and try again.")
+        print("Please set the 'S3_BUCKET_NAME' environment variable or pass --bucket and try again.")
         return
-    
+
     # Initialize S3 client
     try:
         s3_client = get_s3_client()
     except Exception:
         print("Failed to initialize S3 client. Check logs for more details.")
         return
-    
-    # List objects in the bucket
+
+    # List and preview objects as the listing pages arrive
     try:
-        objects = list_s3_objects(s3_client, bucket_name)
+        objects = list_s3_objects(s3_client, args.bucket, args.prefix, args.since, args.until)
+        count = inspect_objects(s3_client, args.bucket, objects, args.preview_bytes, max(args.workers, 1))
     except Exception:
         print("Failed to list objects in the S3 bucket. Check logs for more details.")
         return
-    
-    if not objects:
-        print(f"No objects found in bucket '{bucket_name}'.")
-        return
-    
-    # Retrieve and print content of each object
-    for obj_key in objects:
-        print(f"\n--- Content of '{obj_key}' ---")
-        content = get_object_content(s3_client, bucket_name, obj_key)
-        if content:
-            try:
-                # Attempt to pretty-print JSON content if applicable
-                parsed_content = json.loads(content)
-                pretty_content = json.dumps(parsed_content, indent=2)
-                print(pretty_content)
-            except json.JSONDecodeError:
-                # If not JSON, print as plain text
-                print(content)
-        else:
-            print("Failed to retrieve content.")
+
+    if not count:
+        print(f"No objects found in bucket '{args.bucket}' matching the filters.")
+    else:
+        logger.info(f"Inspected {count} objects in bucket '{args.bucket}'.")
 
 if __name__ == "__main__":
     main()
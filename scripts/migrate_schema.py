@@ -0,0 +1,86 @@
+# scripts/migrate_schema.py
+
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+import logging
+
+# Shared database modules, also packaged with the Lambda functions and Glue jobs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+import dam_db
+import dam_schema
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Database connection details
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = int(os.getenv("DB_PORT", 3306))
+DB_NAME = os.getenv("DB_NAME")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+def parse_args():
+    """
+    Parse command-line options.
+
+    Returns:
+        argparse.Namespace: Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Apply schema migrations and verify hot query plans.")
+    parser.add_argument('--target', type=int, help="Apply migrations up to and including this version.")
+    parser.add_argument('--verify', action='store_true', help="EXPLAIN the hot queries after migrating.")
+    parser.add_argument('--seed', action='store_true',
+                        help="Fill the database with synthetic rows before verifying. Local MySQL only.")
+    return parser.parse_args()
+
+def main():
+    """
+    Main function to bring the database schema up to date and optionally verify the query plans.
+    Exits with status 1 if a migration fails or a hot query does not use its index.
+    """
+    args = parse_args()
+    failed = False
+    try:
+        pool = dam_db.get_pool(
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME
+        )
+        connection = pool.acquire()
+        logger.info(f"Connected to the database '{DB_NAME}'.")
+
+        dam_schema.apply_migrations(connection, args.target)
+
+        if args.seed:
+            dam_schema.seed_verification_data(connection)
+
+        if args.verify:
+            problems = dam_schema.verify_hot_query_plans(connection)
+            for problem in problems:
+                logger.error(problem)
+            if problems:
+                failed = True
+            else:
+                logger.info("Every hot query uses its expected index.")
+    except Exception as e:
+        logger.error(f"Schema migration failed: {e}")
+        failed = True
+    finally:
+        if 'connection' in locals():
+            pool.release(connection)
+            pool.close_all()
+            logger.info("Database connection closed.")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 # /scripts/verify_database_updates.py
 
-import pymysql
+import argparse
+import hashlib
+import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import boto3
+import pymysql
 from dotenv import load_dotenv
 import logging
 
+# Shared database module, also packaged with the Lambda functions and Glue jobs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+import dam_db
+import dam_analysis
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -13,157 +25,304 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 # Database connection details
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = int(os.getenv("DB_PORT", 3306))
 DB_NAME = os.getenv("DB_NAME")
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-def get_recent_data_from_table(connection, table_name, date_column, limit=10):
+# Hashes are summed modulo 2**64, so a dam's digest does not depend on row order
+HASH_MODULUS = 2 ** 64
+
+def normalize_value(value):
     """
-    Query the most recent rows from a given table based on the specified date column.
-    
+    Normalise a value so DECIMAL values read from RDS and JSON numbers from S3 hash the same.
+
     Args:
-        connection (pymysql.Connection): Active database connection.
-        table_name (str): Name of the table to query.
-        date_column (str): Name of the date column to sort by.
-        limit (int): Number of recent records to fetch.
-    
+        value: Measure, name, or date value.
+
     Returns:
-        list[dict]: List of dictionaries representing fetched rows.
+        str: Canonical text of the value; empty for NULL.
     """
-    query = f"SELECT * FROM {table_name} ORDER BY {date_column} DESC LIMIT %s"
-    try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute(query, (limit,))
-            rows = cursor.fetchall()
-            logger.info(f"Fetched {len(rows)} records from '{table_name}' table.")
-            return rows
-    except Exception as e:
-        logger.error(f"Error fetching data from '{table_name}' table: {e}")
-        return []
+    if value is None:
+        return ''
+    if isinstance(value, (int, float, Decimal)):
+        return str(Decimal(str(value)).normalize())
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return str(value)
 
-def verify_specific_dam_analysis(connection, dam_id):
+def row_hash(values):
     """
-    Verify the latest entry in the specific_dam_analysis table for a given dam_id.
-    
+    Hash one row to a 64-bit integer.
+
     Args:
-        connection (pymysql.Connection): Active database connection.
-        dam_id (str): ID of the dam to verify.
-    
+        values (iterable): Row values in column order.
+
     Returns:
-        dict or None: Latest analysis record or None if not found.
+        int: First 8 bytes of the MD5 of the normalised row.
     """
-    query = """
-        SELECT * FROM specific_dam_analysis
-        WHERE dam_id = %s
-        ORDER BY analysis_date DESC
-        LIMIT 1
+    text = '|'.join(normalize_value(value) for value in values)
+    return int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'big')
+
+def digest_rows(rows):
     """
-    try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute(query, (dam_id,))
-            row = cursor.fetchone()
-            if row:
-                logger.info(f"Latest entry in 'specific_dam_analysis' for dam_id {dam_id}:")
-                logger.info(row)
-                return row
-            else:
-                logger.warning(f"No entries found in 'specific_dam_analysis' for dam_id {dam_id}.")
-                return None
-    except Exception as e:
-        logger.error(f"Error verifying data in 'specific_dam_analysis': {e}")
-        return None
+    Build order-independent per-dam digests of rows whose first value is the dam_id.
+
+    Args:
+        rows (iterable): Rows starting with dam_id.
+
+    Returns:
+        dict: {dam_id: (row count, sum of row hashes mod 2**64)}.
+    """
+    digests = {}
+    for row in rows:
+        dam_id = str(row[0])
+        count, total = digests.get(dam_id, (0, 0))
+        digests[dam_id] = (count + 1, (total + row_hash(row)) % HASH_MODULUS)
+    return digests
 
-def verify_overall_dam_analysis(connection):
+def compare_digests(name, expected, actual):
     """
-    Verify the latest entry in the overall_dam_analysis table.
-    
+    Compare per-dam digests and log every dam that differs.
+
     Args:
-        connection (pymysql.Connection): Active database connection.
-    
+        name (str): Check name used in the log.
+        expected (dict): Digests of the reference side.
+        actual (dict): Digests of the side being verified.
+
     Returns:
-        dict or None: Latest overall analysis record or None if not found.
+        list[str]: Mismatching dam_ids.
     """
-    query = """
-        SELECT * FROM overall_dam_analysis
-        ORDER BY analysis_date DESC
-        LIMIT 1
+    mismatches = sorted(dam_id for dam_id in set(expected) | set(actual) if expected.get(dam_id) != actual.get(dam_id))
+    for dam_id in mismatches:
+        logger.warning(
+            f"[{name}] dam {dam_id}: expected {expected.get(dam_id, (0, None))[0]} row(s), "
+            f"found {actual.get(dam_id, (0, None))[0]}; digests {'differ' if dam_id in expected and dam_id in actual else 'missing on one side'}."
+        )
+    if mismatches:
+        logger.error(f"[{name}] {len(mismatches)} of {len(set(expected) | set(actual))} dam(s) do not match.")
+    else:
+        logger.info(f"[{name}] All {len(expected)} dam(s) match.")
+    return mismatches
+
+def fetch_s3_snapshot(bucket, key):
     """
-    try:
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            cursor.execute(query)
-            row = cursor.fetchone()
-            if row:
-                logger.info("Latest entry in 'overall_dam_analysis' table:")
-                logger.info(row)
-                return row
-            else:
-                logger.warning("No entries found in 'overall_dam_analysis' table.")
-                return None
-    except Exception as e:
-        logger.error(f"Error verifying data in 'overall_dam_analysis': {e}")
-        return None
+    Read the latest collected snapshot from S3 and flatten it like lambda_load_rds_glue does.
+
+    Args:
+        bucket (str): Bucket written by lambda_data_collection.
+        key (str): Snapshot key.
+
+    Returns:
+        list[tuple]: (dam_id, dam_name, date, storage_volume, percentage_full, storage_inflow, storage_release) rows.
+    """
+    body = boto3.client('s3').get_object(Bucket=bucket, Key=key)['Body'].read()
+    rows = []
+    for record in json.loads(body):
+        for dam in record.get('dams', []):
+            for resource in dam.get('resources', []):
+                # The DATE columns drop any time part, so the snapshot's dates are compared without one
+                rows.append((
+                    dam['dam_id'], dam['dam_name'], str(resource['date'])[:10],
+                    *(resource[measure] for measure in dam_analysis.MEASURES)
+                ))
+    logger.info(f"Read {len(rows)} row(s) for {len({row[0] for row in rows})} dam(s) from s3://{bucket}/{key}.")
+    return rows
+
+def fetch_latest_data(pool):
+    """
+    Read every latest_data row.
+
+    Args:
+        pool (dam_db.ConnectionPool): Pool to read from.
+
+    Returns:
+        list[tuple]: Rows in the same column order as fetch_s3_snapshot.
+    """
+    with pool.connection() as connection:
+        with connection.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute(f"SELECT dam_id, dam_name, date, {', '.join(dam_analysis.MEASURES)} FROM latest_data")
+            return cursor.fetchall()
+
+def fetch_dam_resources_for(pool, keys_by_dam):
+    """
+    Read the dam_resources rows of the given dams and dates.
+
+    Args:
+        pool (dam_db.ConnectionPool): Pool to read from.
+        keys_by_dam (dict): {dam_id: set of 'YYYY-MM-DD' dates}.
+
+    Returns:
+        list[tuple]: (dam_id, date, measures...) rows for the requested keys.
+    """
+    dam_ids = sorted(keys_by_dam)
+    all_dates = sorted(date for dates in keys_by_dam.values() for date in dates)
+    with pool.connection() as connection:
+        with connection.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute(f"""
+                SELECT dam_id, date, {', '.join(dam_analysis.MEASURES)} FROM dam_resources
+                WHERE dam_id IN ({', '.join(['%s'] * len(dam_ids))}) AND date BETWEEN %s AND %s
+            """, (*dam_ids, all_dates[0], all_dates[-1]))
+            rows = cursor.fetchall()
+    return [row for row in rows if normalize_value(row[1]) in keys_by_dam[str(row[0])]]
+
+def chunk(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def verify_snapshot(pool, executor, bucket, key, chunk_dams):
+    """
+    Check that latest_data and dam_resources hold exactly the rows of the latest S3 snapshot.
+
+    Returns:
+        dict: {check name: mismatching dam_ids}.
+    """
+    snapshot = fetch_s3_snapshot(bucket, key)
+    if not snapshot:
+        logger.warning("The S3 snapshot is empty; nothing to verify.")
+        return {}
+
+    keys_by_dam = {}
+    for row in snapshot:
+        keys_by_dam.setdefault(str(row[0]), set()).add(normalize_value(row[2]))
+
+    latest_future = executor.submit(fetch_latest_data, pool)
+    resource_futures = [
+        executor.submit(fetch_dam_resources_for, pool, {dam_id: keys_by_dam[dam_id] for dam_id in dam_ids})
+        for dam_ids in chunk(sorted(keys_by_dam), chunk_dams)
+    ]
+
+    expected_resources = digest_rows((row[0], row[2], *row[3:]) for row in snapshot)
+    stored_resources = digest_rows(row for future in resource_futures for row in future.result())
+    return {
+        'latest_data': compare_digests('latest_data', digest_rows(snapshot), digest_rows(latest_future.result())),
+        'dam_resources': compare_digests('dam_resources', expected_resources, stored_resources)
+    }
+
+def list_dam_ids(pool):
+    with pool.connection() as connection:
+        with connection.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute("SELECT DISTINCT dam_id FROM dam_resources ORDER BY dam_id")
+            return [str(row[0]) for row in cursor.fetchall()]
+
+def range_digest_query(table, measure_expressions):
+    """
+    Build a query hashing every row of a dam_id range inside MySQL, so only one digest per dam
+    crosses the network.
+
+    Args:
+        table (str): Table with dam_id and date columns.
+        measure_expressions (list[str]): SQL text of each measure in canonical DECIMAL(15, 3) form.
+
+    Returns:
+        str: Query template whose {range_filter} is filled in by range_digests.
+    """
+    row_text = ", ".join(['dam_id', 'date', *(f"COALESCE(CAST({expression} AS CHAR), '')" for expression in measure_expressions)])
+    return f"""
+        SELECT dam_id, COUNT(*), SUM(CAST(CONV(LEFT(MD5(CONCAT_WS('|', {row_text})), 16), 16, 10) AS UNSIGNED))
+        FROM {table}
+        WHERE {{range_filter}}
+        GROUP BY dam_id
+    """
+
+def range_digests(pool, query, lower, upper):
+    """
+    Run a range digest query for lower <= dam_id < upper; either bound may be None for an open end.
+    """
+    conditions, params = [], []
+    if lower is not None:
+        conditions.append("dam_id >= %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append("dam_id < %s")
+        params.append(upper)
+    with pool.connection() as connection:
+        with connection.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute(query.format(range_filter=' AND '.join(conditions) or 'TRUE'), params)
+            return {str(row[0]): (row[1], int(row[2]) % HASH_MODULUS) for row in cursor.fetchall()}
+
+def verify_full_table(executor, name, reference, target, chunk_dams):
+    """
+    Compare two full tables chunk by chunk, hashing each dam_id range concurrently on both sides.
+
+    Args:
+        executor (ThreadPoolExecutor): Executor running the range queries.
+        name (str): Check name used in the log.
+        reference, target (tuple): (pool, query) pairs built with range_digest_query.
+        chunk_dams (int): Dams per range query.
+
+    Returns:
+        list[str]: Mismatching dam_ids.
+    """
+    # Ranges split at the reference's dam_ids and are open at both ends, so dams found only in
+    # the target are still hashed and reported
+    dam_ids = list_dam_ids(reference[0])
+    starts = [dam_ids_chunk[0] for dam_ids_chunk in chunk(dam_ids, chunk_dams)]
+    ranges = list(zip([None] + starts[1:], starts[1:] + [None])) or [(None, None)]
+    futures = [
+        (executor.submit(range_digests, reference[0], reference[1], *bounds),
+         executor.submit(range_digests, target[0], target[1], *bounds))
+        for bounds in ranges
+    ]
+    expected, actual = {}, {}
+    for reference_future, target_future in futures:
+        expected.update(reference_future.result())
+        actual.update(target_future.result())
+    logger.info(f"[{name}] Hashed {len(ranges)} range(s) covering {len(dam_ids)} dam(s).")
+    return compare_digests(name, expected, actual)
 
 def main():
     """
-    Main function to connect to the database, fetch recent data from tables, and verify updates.
+    Main function to verify that the database matches the latest S3 snapshot and, with --full,
+    that dam_resources matches its daily rollup or its read replica. Exits non-zero on any mismatch.
     """
+    parser = argparse.ArgumentParser(description="Verify database contents with order-independent hashes.")
+    parser.add_argument('--bucket', default=os.getenv('S3_BUCKET_NAME'), help="Bucket holding the collected snapshot.")
+    parser.add_argument('--key', default='dam_resources.json', help="Key of the latest snapshot.")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent checks and pooled connections.")
+    parser.add_argument('--chunk-dams', type=int, default=50, help="Dams per range query.")
+    parser.add_argument('--full', action='store_true', help="Hash all of dam_resources against the daily rollup.")
+    parser.add_argument('--replica', action='store_true', help="With --full, compare dam_resources on the primary and DB_REPLICA_HOST instead.")
+    args = parser.parse_args()
+
+    mismatches = {}
     try:
-        # Connect to the database
-        connection = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        settings = {**dam_db.settings_from_env(), 'max_size': args.workers}
+        router = dam_db.get_router(settings, dam_db.replica_settings_from_env(settings))
+        pool = router.primary
         logger.info(f"Connected to the database '{DB_NAME}'.")
 
-        # Define the dam_id to verify in specific_dam_analysis
-        dam_id = '203042'  # Toonumbar Dam
-
-        # Fetch recent data from 'latest_data' table
-        logger.info("\nFetching recent data from 'latest_data' table...")
-        latest_data = get_recent_data_from_table(connection, "latest_data", "date")
-        if latest_data:
-            for row in latest_data:
-                logger.info(row)
-        else:
-            logger.warning("No data found in 'latest_data' table.")
-
-        # Fetch recent data from 'dam_resources' table
-        logger.info("\nFetching recent data from 'dam_resources' table...")
-        dam_resources_data = get_recent_data_from_table(connection, "dam_resources", "date")
-        if dam_resources_data:
-            for row in dam_resources_data:
-                logger.info(row)
-        else:
-            logger.warning("No data found in 'dam_resources' table.")
-
-        # Verify data in 'specific_dam_analysis' table
-        logger.info("\nVerifying data in 'specific_dam_analysis' table...")
-        specific_dam_analysis = verify_specific_dam_analysis(connection, dam_id)
-        if specific_dam_analysis:
-            logger.info("Verification of 'specific_dam_analysis' table completed successfully.")
-        else:
-            logger.warning("Verification of 'specific_dam_analysis' table failed or no data found.")
-
-        # Verify data in 'overall_dam_analysis' table
-        logger.info("\nVerifying data in 'overall_dam_analysis' table...")
-        overall_dam_analysis = verify_overall_dam_analysis(connection)
-        if overall_dam_analysis:
-            logger.info("Verification of 'overall_dam_analysis' table completed successfully.")
-        else:
-            logger.warning("Verification of 'overall_dam_analysis' table failed or no data found.")
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            if args.bucket:
+                mismatches.update(verify_snapshot(pool, executor, args.bucket, args.key, args.chunk_dams))
+            else:
+                logger.warning("S3_BUCKET_NAME is not set; skipping the snapshot checks.")
 
+            if args.full:
+                resources_query = range_digest_query('dam_resources', dam_analysis.MEASURES)
+                if args.replica:
+                    if router.replica is None:
+                        raise ValueError("--replica needs DB_REPLICA_HOST to be set.")
+                    mismatches['replica'] = verify_full_table(
+                        executor, 'replica', (pool, resources_query), (router.replica, resources_query), args.chunk_dams
+                    )
+                else:
+                    rollup_query = range_digest_query(
+                        'dam_resources_daily_rollup',
+                        [f"IF(count_{m} > 0, CAST(sum_{m} AS DECIMAL(15, 3)), NULL)" for m in dam_analysis.MEASURES]
+                    )
+                    mismatches['daily_rollup'] = verify_full_table(
+                        executor, 'daily_rollup', (pool, resources_query), (pool, rollup_query), args.chunk_dams
+                    )
     except Exception as e:
-        logger.error(f"Failed to connect to the database or fetch data: {e}")
+        logger.error(f"Verification failed: {e}")
+        sys.exit(2)
     finally:
-        if 'connection' in locals() and connection.open:
-            connection.close()
-            logger.info("Database connection closed.")
+        if 'router' in locals():
+            router.close_all()
+            logger.info("Database connections closed.")
+
+    failed = {name: dam_ids for name, dam_ids in mismatches.items() if dam_ids}
+    if failed:
+        logger.error(f"Mismatching dams: {json.dumps(failed)}")
+        sys.exit(1)
+    logger.info("All checks passed.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+# shared/dam_analysis.py
+
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+MEASURES = ['storage_volume', 'percentage_full', 'storage_inflow', 'storage_release']
+
+# Analysis windows in days, keyed by the suffix used in the analysis table columns
+ANALYSIS_WINDOWS = {
+    '12_months': 365,
+    '5_years': 5 * 365,
+    '20_years': 20 * 365
+}
+
+# Approximate quantiles stored alongside min and max in the extended analysis columns
+QUANTILES = {'p10': 0.1, 'median': 0.5, 'p90': 0.9}
+DISTRIBUTION_STATS = ['min', *QUANTILES, 'max']
+
+AVERAGE_COLUMNS = [f'avg_{measure}_{period_name}' for measure in MEASURES for period_name in ANALYSIS_WINDOWS]
+DISTRIBUTION_COLUMNS = [
+    f'{stat}_{measure}_{period_name}'
+    for measure in MEASURES for period_name in ANALYSIS_WINDOWS for stat in DISTRIBUTION_STATS
+]
+ANALYSIS_COLUMNS = AVERAGE_COLUMNS + DISTRIBUTION_COLUMNS
+
+def combine_window_totals(totals_list):
+    """
+    Add up window totals, e.g. from every dam to get cross-dam totals.
+    """
+    combined = {}
+    for totals in totals_list:
+        for key, value in totals.items():
+            if value is not None:
+                combined[key] = combined.get(key, 0) + value
+    return combined
+
+def combine_window_extremes(stats_list):
+    """
+    Combine per-dam min_<measure>_<period> and max_<measure>_<period> values into cross-dam extremes.
+    Unlike quantiles, minima and maxima can be combined from the per-dam results.
+    """
+    combined = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if value is None:
+                continue
+            if key.startswith('min_'):
+                combined[key] = value if key not in combined else min(combined[key], value)
+            elif key.startswith('max_'):
+                combined[key] = value if key not in combined else max(combined[key], value)
+    return combined
+
+def averages_from_totals(totals):
+    """
+    Turn window totals into the avg_<measure>_<period> values stored in the analysis tables.
+    """
+    averages = {}
+    for period_name in ANALYSIS_WINDOWS:
+        for measure in MEASURES:
+            window_count = totals.get(f'count_{measure}_{period_name}') or 0
+            window_sum = totals.get(f'sum_{measure}_{period_name}')
+            averages[f'avg_{measure}_{period_name}'] = window_sum / window_count if window_count else None
+    return averages
+
+def add_distribution_columns(cursor):
+    """
+    Add the distribution statistic columns to both analysis tables if they are missing.
+    """
+    for table_name in ('specific_dam_analysis', 'overall_dam_analysis'):
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table_name,))
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [column for column in DISTRIBUTION_COLUMNS if column not in existing]
+        if missing:
+            cursor.execute(
+                f"ALTER TABLE {table_name} " + ', '.join(f"ADD COLUMN {column} DOUBLE NULL" for column in missing)
+            )
+            logger.info(f"Added {len(missing)} distribution column(s) to '{table_name}'.")
@@ -0,0 +1,45 @@
+# shared/dam_data_version.py
+
+import logging
+import pymysql
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+def create_data_version_table(cursor):
+    """
+    Create the single-row 'dashboard_data_version' table if it does not exist.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dashboard_data_version (
+            id TINYINT NOT NULL PRIMARY KEY,
+            version BIGINT NOT NULL,
+            source VARCHAR(64) NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+def bump_data_version(connection, source):
+    """
+    Increment the data version after latest_data or the analysis tables change, so readers
+    caching dashboard responses know to refetch. Returns the new version.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("""
+            INSERT INTO dashboard_data_version (id, version, source) VALUES (1, 1, %s)
+            ON DUPLICATE KEY UPDATE version = version + 1, source = VALUES(source)
+        """, (source,))
+        cursor.execute("SELECT version FROM dashboard_data_version WHERE id = 1")
+        version = cursor.fetchone()[0]
+    connection.commit()
+    logger.info(f"Dashboard data version bumped to {version} by '{source}'.")
+    return version
+
+def get_data_version(connection):
+    """
+    Return the current data version, or 0 before the first bump.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SELECT version FROM dashboard_data_version WHERE id = 1")
+        row = cursor.fetchone()
+    return row[0] if row else 0
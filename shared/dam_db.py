@@ -0,0 +1,419 @@
+# shared/dam_db.py
+
+import os
+import ssl
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import pymysql
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_MAX_SIZE = 4
+DEFAULT_IDLE_TIMEOUT_SECONDS = 300
+DEFAULT_CHECKOUT_TIMEOUT_SECONDS = 30
+# Connections idle for longer than this are pinged before being handed out
+DEFAULT_PING_INTERVAL_SECONDS = 30
+# How long a replica health and lag check is trusted before it is repeated
+DEFAULT_LAG_CHECK_INTERVAL_SECONDS = 10
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no connection becomes available within the checkout timeout.
+    """
+
+class SessionReusingSSLContext(ssl.SSLContext):
+    """
+    SSL context that resumes the last TLS session when pymysql wraps a new socket,
+    so reconnects to the same server skip the full handshake.
+    """
+    session = None
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        if self.session is not None:
+            kwargs.setdefault('session', self.session)
+        return super().wrap_socket(sock, *args, **kwargs)
+
+def build_ssl_context(ca_path):
+    """
+    Build a verifying, session-reusing SSL context from a CA bundle, e.g. the RDS global bundle.
+    """
+    context = SessionReusingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.load_verify_locations(cafile=ca_path)
+    return context
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pymysql connections.
+    Holds at most max_size connections, closes those idle for longer than idle_timeout,
+    pings connections that have been idle for a while before reuse, and records how long
+    each checkout waited for and held its connection.
+    """
+
+    def __init__(self, host, port, user, password, database, max_size=DEFAULT_POOL_MAX_SIZE,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT_SECONDS, ping_interval=DEFAULT_PING_INTERVAL_SECONDS,
+                 ssl_ca=None, connect_timeout=5, **connect_kwargs):
+        self.connect_args = {
+            'host': host,
+            'port': int(port),
+            'user': user,
+            'password': password,
+            'database': database,
+            'connect_timeout': connect_timeout,
+            **connect_kwargs
+        }
+        if ssl_ca:
+            self.connect_args['ssl'] = build_ssl_context(ssl_ca)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+
+        self._condition = threading.Condition()
+        self._idle = []  # (connection, released_at), most recently used last
+        self._size = 0
+        self._stats = {'checkouts': 0, 'created': 0, 'reused': 0, 'discarded': 0, 'wait_seconds': 0.0, 'held_seconds': 0.0}
+
+    def _record(self, **increments):
+        with self._condition:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def _remember_tls_session(self, connection):
+        # TLS 1.3 session tickets arrive after the handshake, so this runs again on release
+        ssl_context = self.connect_args.get('ssl')
+        session = getattr(connection._sock, 'session', None)
+        if isinstance(ssl_context, SessionReusingSSLContext) and session is not None:
+            ssl_context.session = session
+
+    def _create(self):
+        connection = pymysql.connect(**self.connect_args)
+        self._remember_tls_session(connection)
+        self._record(created=1)
+        logger.info(f"Opened database connection to '{self.connect_args['database']}' at {self.connect_args['host']}:{self.connect_args['port']}.")
+        return connection
+
+    def _discard(self, connection):
+        self._record(discarded=1)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, connection, released_at):
+        if time.monotonic() - released_at < self.ping_interval:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.info(f"Dropping stale pooled connection: {e}")
+            return False
+
+    def acquire(self, timeout=DEFAULT_CHECKOUT_TIMEOUT_SECONDS):
+        """
+        Check out a live connection, reusing an idle one when possible.
+        Raises PoolTimeoutError if the pool stays exhausted for longer than timeout.
+        """
+        started = time.monotonic()
+        while True:
+            with self._condition:
+                self._close_expired()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"No database connection available within {timeout} seconds.")
+                    self._condition.wait(remaining)
+                    self._close_expired()
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                else:
+                    connection, released_at = None, None
+                    self._size += 1
+
+            if connection is None:
+                try:
+                    connection = self._create()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            elif self._is_alive(connection, released_at):
+                self._record(reused=1)
+            else:
+                self._release_slot(connection)
+                continue
+
+            wait_seconds = time.monotonic() - started
+            self._record(checkouts=1, wait_seconds=wait_seconds)
+            connection._pool_checked_out_at = time.monotonic()
+            connection._pool = self
+            logger.debug(f"Checked out database connection after {wait_seconds * 1000:.1f} ms.")
+            return connection
+
+    def release(self, connection):
+        """
+        Return a connection to the pool. Closed connections free their slot instead.
+        Any open transaction is rolled back first, so the next checkout does not inherit
+        uncommitted writes or a REPEATABLE READ snapshot that keeps showing old data.
+        """
+        checked_out_at = getattr(connection, '_pool_checked_out_at', None)
+        if checked_out_at is not None:
+            held_seconds = time.monotonic() - checked_out_at
+            self._record(held_seconds=held_seconds)
+            logger.debug(f"Database connection held for {held_seconds * 1000:.1f} ms.")
+            connection._pool_checked_out_at = None
+
+        if connection.open:
+            try:
+                connection.rollback()
+            except Exception as e:
+                logger.info(f"Dropping pooled connection that could not be reset: {e}")
+                connection.close()
+        if not connection.open:
+            self._release_slot(connection)
+            return
+        self._remember_tls_session(connection)
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def _release_slot(self, connection):
+        self._discard(connection)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close_expired(self):
+        # Called with the condition held; the oldest idle connections sit at the front
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            connection, _ = self._idle.pop(0)
+            self._discard(connection)
+            self._size -= 1
+
+    @contextmanager
+    def connection(self, timeout=DEFAULT_CHECKOUT_TIMEOUT_SECONDS):
+        """
+        Check out a connection for the duration of a with block.
+        Work not committed inside the block is rolled back when it ends.
+        """
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                if connection.open:
+                    connection.close()
+            raise
+        finally:
+            self.release(connection)
+
+    def stats(self):
+        """
+        Return checkout counters and cumulative wait and hold times.
+        """
+        with self._condition:
+            return {**self._stats, 'size': self._size, 'idle': len(self._idle)}
+
+    def close_all(self):
+        """
+        Close every idle connection. Checked-out connections are closed when they are released.
+        """
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._discard(connection)
+                self._size -= 1
+        logger.info(f"Connection pool closed. Stats: {self.stats()}")
+
+def settings_from_env():
+    """
+    Read connection settings from the DB_* environment variables shared by every entry point.
+    Raises ValueError naming any missing variables.
+    """
+    missing_vars = [
+        var_name for var_name in ['DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD']
+        if not os.getenv(var_name)
+    ]
+    if missing_vars:
+        raise ValueError(f"Missing environment variables for DB connection: {', '.join(missing_vars)}")
+
+    return {
+        'host': os.getenv('DB_HOST'),
+        'port': int(os.getenv('DB_PORT', '3306')),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'database': os.getenv('DB_NAME'),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', str(DEFAULT_POOL_MAX_SIZE))),
+        'idle_timeout': int(os.getenv('DB_POOL_IDLE_TIMEOUT', str(DEFAULT_IDLE_TIMEOUT_SECONDS))),
+        'ssl_ca': os.getenv('DB_SSL_CA') or None
+    }
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def pool_key(settings):
+    """
+    Return the key identifying a pool's settings. Every setting is part of it, so callers asking
+    for e.g. a different cursorclass, password or pool size never share a pool built for others.
+    """
+    normalized = {**settings, 'port': int(settings['port'])}
+    return tuple((name, repr(value)) for name, value in sorted(normalized.items()))
+
+def get_pool(**settings):
+    """
+    Return the process-wide pool for the given settings, or for the DB_* environment variables
+    when none are passed. Pools outlive a single Lambda invocation, so warm containers reuse
+    their connections.
+    """
+    if not settings:
+        settings = settings_from_env()
+    key = pool_key(settings)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**settings)
+        return _pools[key]
+
+def release(connection):
+    """
+    Return a connection to the pool it was checked out from.
+    """
+    connection._pool.release(connection)
+
+def replica_settings_from_env(primary_settings):
+    """
+    Read the read-replica settings from DB_REPLICA_* variables, defaulting to the primary's
+    port, credentials and pool limits. Returns None when DB_REPLICA_HOST is not set.
+    """
+    replica_host = os.getenv('DB_REPLICA_HOST')
+    if not replica_host:
+        return None
+    return {
+        **primary_settings,
+        'host': replica_host,
+        'port': int(os.getenv('DB_REPLICA_PORT', str(primary_settings['port']))),
+        'user': os.getenv('DB_REPLICA_USER') or primary_settings['user'],
+        'password': os.getenv('DB_REPLICA_PASSWORD') or primary_settings['password']
+    }
+
+def get_replica_lag_seconds(connection):
+    """
+    Return how many seconds a replica is behind its source, or None when replication is not
+    running or the lag cannot be read.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except pymysql.err.ProgrammingError:
+            # MySQL before 8.0.22 only knows the older statement
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    if not status:
+        return None
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    return int(lag) if lag is not None else None
+
+class DatabaseRouter:
+    """
+    Route writes to the primary and read-only work to a read replica.
+    Reads fall back to the primary when no replica is configured, when the replica cannot be
+    reached, or when its lag exceeds max_replica_lag_seconds. The replica's state is rechecked
+    at most every lag_check_interval seconds.
+    """
+
+    def __init__(self, primary_settings, replica_settings=None, max_replica_lag_seconds=None,
+                 lag_check_interval=DEFAULT_LAG_CHECK_INTERVAL_SECONDS):
+        self.primary = get_pool(**primary_settings)
+        self.replica = get_pool(**replica_settings) if replica_settings else None
+        self.max_replica_lag_seconds = max_replica_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self._lock = threading.Lock()
+        self._replica_usable = None
+        self._checked_at = 0.0
+
+    def _check_replica(self):
+        try:
+            with self.replica.connection() as connection:
+                if self.max_replica_lag_seconds is None:
+                    return True
+                lag = get_replica_lag_seconds(connection)
+        except Exception as e:
+            logger.warning(f"Read replica unavailable, reading from the primary: {e}")
+            return False
+        if lag is None or lag > self.max_replica_lag_seconds:
+            logger.warning(f"Read replica lag is {lag} seconds (limit {self.max_replica_lag_seconds}). Reading from the primary.")
+            return False
+        return True
+
+    def replica_usable(self):
+        """
+        Return whether reads should currently go to the replica.
+        """
+        if self.replica is None:
+            return False
+        with self._lock:
+            if self._replica_usable is None or time.monotonic() - self._checked_at >= self.lag_check_interval:
+                self._replica_usable = self._check_replica()
+                self._checked_at = time.monotonic()
+            return self._replica_usable
+
+    def read_pool(self):
+        """
+        Return the pool read-only work should use right now.
+        """
+        return self.replica if self.replica_usable() else self.primary
+
+    def read_settings(self):
+        """
+        Return the connection arguments of the current read target, e.g. to build a JDBC URL.
+        """
+        return self.read_pool().connect_args
+
+    def reader(self, timeout=DEFAULT_CHECKOUT_TIMEOUT_SECONDS):
+        """
+        Check out a connection for read-only work for the duration of a with block.
+        """
+        return self.read_pool().connection(timeout)
+
+    def writer(self, timeout=DEFAULT_CHECKOUT_TIMEOUT_SECONDS):
+        """
+        Check out a primary connection for the duration of a with block.
+        """
+        return self.primary.connection(timeout)
+
+    def close_all(self):
+        """
+        Close the idle connections of both pools.
+        """
+        self.primary.close_all()
+        if self.replica is not None:
+            self.replica.close_all()
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+def get_router(primary_settings=None, replica_settings=None, max_replica_lag_seconds=None):
+    """
+    Return the process-wide router. Without arguments it is configured from the DB_* and
+    DB_REPLICA_* environment variables, with DB_REPLICA_MAX_LAG_SECONDS as the optional lag limit.
+    """
+    if primary_settings is None:
+        primary_settings = settings_from_env()
+        replica_settings = replica_settings_from_env(primary_settings)
+        max_lag = os.getenv('DB_REPLICA_MAX_LAG_SECONDS')
+        max_replica_lag_seconds = int(max_lag) if max_lag else None
+
+    key = (
+        pool_key(primary_settings),
+        pool_key(replica_settings) if replica_settings else None,
+        max_replica_lag_seconds
+    )
+    with _routers_lock:
+        if key not in _routers:
+            _routers[key] = DatabaseRouter(primary_settings, replica_settings, max_replica_lag_seconds)
+        return _routers[key]
@@ -0,0 +1,48 @@
+# shared/dam_load_sequence.py
+
+import logging
+import pymysql
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+def create_load_sequence_table(cursor):
+    """
+    Create the single-row 'dam_load_sequence' table if it does not exist.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dam_load_sequence (
+            id TINYINT NOT NULL PRIMARY KEY,
+            last_value BIGINT NOT NULL
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO dam_load_sequence (id, last_value) VALUES (1, 0)")
+
+def ensure_load_sequence_table(connection):
+    """
+    Create the load sequence table on first use.
+    """
+    with connection.cursor() as cursor:
+        create_load_sequence_table(cursor)
+    connection.commit()
+
+def next_load_seq(cursor):
+    """
+    Allocate the load sequence number of the caller's transaction. Call it before the transaction's
+    first rollup write: the row lock it takes is held until commit, so transactions commit in
+    sequence order and every number up to a committed one belongs to a committed transaction.
+    """
+    cursor.execute("UPDATE dam_load_sequence SET last_value = LAST_INSERT_ID(last_value + 1) WHERE id = 1")
+    cursor.execute("SELECT LAST_INSERT_ID()")
+    return cursor.fetchone()[0]
+
+def get_load_horizon(connection):
+    """
+    Return the highest load sequence number committed as of the connection's snapshot, or 0 before
+    the first load. Every row stamped with a number up to it is visible in the same snapshot, so
+    readers can use it as a watermark that never skips a transaction committing late.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SELECT last_value FROM dam_load_sequence WHERE id = 1")
+        row = cursor.fetchone()
+    return row[0] if row else 0
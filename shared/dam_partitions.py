@@ -0,0 +1,200 @@
+# shared/dam_partitions.py
+
+import io
+import csv
+import gzip
+import logging
+import tempfile
+from datetime import datetime
+import pymysql
+import dam_timeseries
+import dam_analysis
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Catch-all partition; later years are split out of it before they start
+MAX_PARTITION = 'pmax'
+
+def partition_name(year):
+    """
+    Return the name of the partition holding one year of dam_resources.
+    """
+    return f'p{year}'
+
+def get_year_partitions(cursor, table_name='dam_resources'):
+    """
+    Return the years with their own partition, in order. Empty when the table is not partitioned.
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table_name,))
+    names = [row[0] for row in cursor.fetchall()]
+    return [int(name[1:]) for name in names if name != MAX_PARTITION]
+
+def partition_by_year(cursor, through_year=None):
+    """
+    Rebuild dam_resources as RANGE partitions on YEAR(date), one per year from the oldest row
+    through through_year (next year by default), plus a catch-all partition.
+    Does nothing if the table is already partitioned. The rebuild copies the table, so run it
+    in a quiet period.
+    """
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'dam_resources' AND PARTITION_NAME IS NOT NULL
+    """)
+    if cursor.fetchone()[0]:
+        logger.info("'dam_resources' is already partitioned.")
+        return
+
+    current_year = datetime.now().year
+    through_year = through_year or current_year + 1
+    cursor.execute("SELECT MIN(date) FROM dam_resources")
+    oldest = cursor.fetchone()[0]
+    first_year = min(oldest.year if oldest else current_year, through_year)
+
+    partitions = [
+        f"PARTITION {partition_name(year)} VALUES LESS THAN ({year + 1})"
+        for year in range(first_year, through_year + 1)
+    ]
+    partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    cursor.execute(f"ALTER TABLE dam_resources PARTITION BY RANGE (YEAR(date)) ({', '.join(partitions)})")
+    logger.info(f"Partitioned 'dam_resources' by year from {first_year} to {through_year}.")
+
+def ensure_year_partitions(connection, through_year):
+    """
+    Split partitions for every year up to through_year out of the catch-all partition.
+    Normally the catch-all is empty, so this only changes metadata.
+    Returns the years added.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        years = get_year_partitions(cursor)
+        if not years:
+            logger.warning("'dam_resources' is not partitioned. Run scripts/migrate_schema.py first.")
+            return []
+
+        missing = list(range(years[-1] + 1, through_year + 1))
+        if missing:
+            partitions = [f"PARTITION {partition_name(year)} VALUES LESS THAN ({year + 1})" for year in missing]
+            partitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+            cursor.execute(
+                f"ALTER TABLE dam_resources REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(partitions)})"
+            )
+            logger.info(f"Added 'dam_resources' partition(s) for {', '.join(map(str, missing))}.")
+    return missing
+
+def years_past_retention(connection, current_year, retention_years):
+    """
+    Return the partitioned years older than the newest retention_years years.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        years = get_year_partitions(cursor)
+    return [year for year in years if year <= current_year - retention_years]
+
+def archive_key(prefix, year):
+    """
+    Return the S3 key of a year's archived dam_resources rows.
+    """
+    return f"{prefix.rstrip('/')}/dam_resources/year={year}/dam_resources_{year}.csv.gz"
+
+def archive_year_partition(connection, s3_client, bucket, prefix, year, fetch_size=10000):
+    """
+    Stream one year's partition into a gzipped CSV and upload it to S3.
+    The row count and partition_checksum are stored as object metadata so the archive can be
+    checked against the partition before it is reused or the partition is dropped.
+    Returns the S3 key and the number of rows archived.
+    """
+    columns = ['dam_id', 'date', *dam_analysis.MEASURES]
+    key = archive_key(prefix, year)
+    rows_written = 0
+    # Read in the same transaction as the rows below, so both describe the same snapshot
+    checksum = partition_checksum(connection, year)
+
+    with tempfile.TemporaryFile() as buffer:
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+            text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(columns)
+            # Server-side cursor so a full year never has to fit in memory
+            with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(
+                    f"SELECT {', '.join(columns)} FROM dam_resources PARTITION ({partition_name(year)}) ORDER BY dam_id, date"
+                )
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    rows_written += len(rows)
+            text.flush()
+            text.detach()
+
+        buffer.seek(0)
+        s3_client.upload_fileobj(
+            buffer, bucket, key,
+            ExtraArgs={
+                'ContentType': 'text/csv',
+                'ContentEncoding': 'gzip',
+                'Metadata': {'row-count': str(rows_written), 'checksum': checksum}
+            }
+        )
+    logger.info(f"Archived {rows_written} row(s) of {year} to s3://{bucket}/{key}.")
+    return key, rows_written
+
+def archive_year_timeseries(connection, s3_client, bucket, prefix, year, fetch_size=10000):
+    """
+    Stream one year's partition into a time-series archive (see dam_timeseries) and upload it to S3.
+    These compact per-dam series are what the analytics read for complete years instead of MySQL.
+    The row count and partition checksum are stored as object metadata, as for the CSV archive.
+    Returns the S3 key and the number of rows archived.
+    """
+    key = dam_timeseries.yearly_archive_key(prefix, year)
+    checksum = partition_checksum(connection, year)
+    with tempfile.TemporaryFile() as buffer:
+        writer = dam_timeseries.TimeSeriesWriter(buffer, dam_analysis.MEASURES)
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(
+                f"SELECT dam_id, date, {', '.join(dam_analysis.MEASURES)} FROM dam_resources PARTITION ({partition_name(year)}) ORDER BY dam_id, date"
+            )
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                writer.write_rows(rows)
+        writer.close()
+
+        buffer.seek(0)
+        s3_client.upload_fileobj(
+            buffer, bucket, key,
+            ExtraArgs={
+                'ContentType': 'application/octet-stream',
+                'Metadata': {'row-count': str(writer.points), 'checksum': checksum}
+            }
+        )
+    logger.info(f"Archived {writer.points} row(s) of {year} as time series to s3://{bucket}/{key}.")
+    return key, writer.points
+
+def partition_checksum(connection, year):
+    """
+    Return a content checksum of one year's partition: its row count and the sum, modulo 2**64,
+    of the first 64 bits of every row's MD5. Corrected values change it even when the row count stays
+    the same, and the sum does not depend on row order.
+    """
+    row_text = ', '.join(['dam_id', 'date', *(f"COALESCE(CAST({measure} AS CHAR), '')" for measure in dam_analysis.MEASURES)])
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(CAST(CONV(LEFT(MD5(CONCAT_WS('|', {row_text})), 16), 16, 10) AS UNSIGNED)), 0)
+            FROM dam_resources PARTITION ({partition_name(year)})
+        """)
+        row_count, hash_sum = cursor.fetchone()
+    return f"{row_count}-{int(hash_sum) % 2 ** 64:016x}"
+
+def drop_year_partition(connection, year):
+    """
+    Drop one year's partition. This removes its rows without scanning them.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(f"ALTER TABLE dam_resources DROP PARTITION {partition_name(year)}")
+    logger.info(f"Dropped 'dam_resources' partition for {year}.")
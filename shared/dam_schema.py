@@ -0,0 +1,306 @@
+# shared/dam_schema.py
+
+import logging
+import pymysql
+import dam_analysis
+import dam_partitions
+import dam_data_version
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+def create_core_tables(cursor):
+    """
+    Create the tables the pipeline has always relied on. Existing tables are left as they are.
+    """
+    measure_columns = ',\n'.join(f"            {measure} DECIMAL(15, 3) NULL" for measure in dam_analysis.MEASURES)
+    average_columns = ',\n'.join(f"            {column} DOUBLE NULL" for column in dam_analysis.AVERAGE_COLUMNS)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dams (
+            dam_id VARCHAR(20) NOT NULL PRIMARY KEY,
+            dam_name VARCHAR(255) NULL
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS latest_data (
+            dam_id VARCHAR(20) NOT NULL,
+            dam_name VARCHAR(255) NULL,
+            date DATE NOT NULL,
+{measure_columns}
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS dam_resources (
+            dam_id VARCHAR(20) NOT NULL,
+            date DATE NOT NULL,
+{measure_columns},
+            PRIMARY KEY (dam_id, date)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS specific_dam_analysis (
+            dam_id VARCHAR(20) NOT NULL,
+            analysis_date DATE NOT NULL,
+{average_columns},
+            PRIMARY KEY (dam_id, analysis_date)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS overall_dam_analysis (
+            analysis_date DATE NOT NULL PRIMARY KEY,
+{average_columns}
+        )
+    """)
+
+def get_index_names(cursor, table_name):
+    """
+    Return the names of the indexes on a table in the current database.
+    """
+    cursor.execute("""
+        SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table_name,))
+    return {row[0] for row in cursor.fetchall()}
+
+def add_index_if_missing(cursor, table_name, index_name, columns):
+    """
+    Add an index unless one with the same name exists; MySQL has no ADD INDEX IF NOT EXISTS.
+    """
+    if index_name in get_index_names(cursor, table_name):
+        logger.info(f"Index '{index_name}' already exists on '{table_name}'.")
+        return
+    cursor.execute(f"ALTER TABLE {table_name} ADD INDEX {index_name} ({', '.join(columns)})")
+    logger.info(f"Added index '{index_name}' on '{table_name}' ({', '.join(columns)}).")
+
+def drop_index_if_present(cursor, table_name, index_name):
+    """
+    Drop an index if it exists; MySQL has no DROP INDEX IF EXISTS.
+    """
+    if index_name not in get_index_names(cursor, table_name):
+        logger.info(f"Index '{index_name}' does not exist on '{table_name}'.")
+        return
+    cursor.execute(f"ALTER TABLE {table_name} DROP INDEX {index_name}")
+    logger.info(f"Dropped index '{index_name}' from '{table_name}'.")
+
+def add_hot_query_indexes(cursor):
+    """
+    Index the pipeline's hot access patterns:
+    - latest_data by dam and by date, for per-dam lookups and ORDER BY date DESC LIMIT.
+    - dam_resources by date with every column included, so all-dam date-range reads and
+      ORDER BY date DESC LIMIT are answered from the index alone. Per-dam range reads
+      already use the (dam_id, date) primary key, which is clustered and so covering.
+    The analysis tables need nothing extra: their (dam_id, analysis_date) and (analysis_date)
+    primary keys serve ORDER BY analysis_date DESC LIMIT 1 with a backward index scan.
+    """
+    add_index_if_missing(cursor, 'latest_data', 'idx_latest_data_dam_date', ['dam_id', 'date'])
+    add_index_if_missing(cursor, 'latest_data', 'idx_latest_data_date', ['date'])
+    add_index_if_missing(
+        cursor, 'dam_resources', 'idx_dam_resources_date_covering',
+        ['date', 'dam_id', *dam_analysis.MEASURES]
+    )
+
+def narrow_dam_resources_date_index(cursor):
+    """
+    Replace the covering date index on dam_resources, which held a second copy of every row,
+    with a (date, dam_id) index. All-dam date-range reads fetch the measures from the clustered
+    primary key, ORDER BY date DESC LIMIT only looks up the rows it returns, and date-bounded
+    counts such as the Glue job's source statistics are still answered from the index alone.
+    """
+    add_index_if_missing(cursor, 'dam_resources', 'idx_dam_resources_date', ['date', 'dam_id'])
+    drop_index_if_present(cursor, 'dam_resources', 'idx_dam_resources_date_covering')
+
+def partition_dam_resources_by_year(cursor):
+    """
+    Partition dam_resources by year so window queries prune old years and archived years drop in O(1).
+    New years are added ahead of time by lambda_partition_maintenance.
+    """
+    dam_partitions.partition_by_year(cursor)
+
+def create_data_version_table(cursor):
+    """
+    Create the data version stamp that dashboard readers use to invalidate their caches.
+    """
+    dam_data_version.create_data_version_table(cursor)
+
+# Ordered (version, description, function) entries; append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, 'Create core tables', create_core_tables),
+    (2, 'Add indexes for hot queries', add_hot_query_indexes),
+    (3, 'Add distribution statistic columns to the analysis tables', dam_analysis.add_distribution_columns),
+    (4, 'Partition dam_resources by year', partition_dam_resources_by_year),
+    (5, 'Create the dashboard data version table', create_data_version_table),
+    (6, 'Narrow the dam_resources date index', narrow_dam_resources_date_index),
+]
+
+def ensure_migrations_table(connection):
+    """
+    Create the 'schema_migrations' table recording applied migration versions if it does not exist.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT NOT NULL PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    connection.commit()
+
+def get_applied_versions(connection):
+    """
+    Return the set of migration versions already applied.
+    """
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(connection, target_version=None):
+    """
+    Apply pending migrations in version order, up to target_version when given.
+    Each migration is recorded as soon as it succeeds. DDL commits implicitly in MySQL, so a
+    failed migration is written to be safely re-run rather than rolled back.
+    Returns the list of versions applied.
+    """
+    ensure_migrations_table(connection)
+    applied = get_applied_versions(connection)
+    newly_applied = []
+
+    for version, description, migrate in sorted(MIGRATIONS, key=lambda migration: migration[0]):
+        if version in applied or (target_version is not None and version > target_version):
+            continue
+        logger.info(f"Applying migration {version}: {description}.")
+        # A plain cursor keeps the information_schema helpers working on DictCursor connections
+        with connection.cursor(pymysql.cursors.Cursor) as cursor:
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+        connection.commit()
+        newly_applied.append(version)
+
+    logger.info(f"Applied {len(newly_applied)} migration(s); schema is at version {max(applied | set(newly_applied), default=0)}.")
+    return newly_applied
+
+# Hot queries with the index EXPLAIN should report and whether the plan may sort
+HOT_QUERIES = [
+    {
+        'name': 'Glue single-dam read',
+        'query': "SELECT * FROM dam_resources WHERE dam_id = %s AND date >= %s",
+        'params': ('203042', '2005-01-01'),
+        'index': 'PRIMARY'
+    },
+    {
+        'name': 'All-dam date-range read',
+        'query': f"SELECT dam_id, date, {', '.join(dam_analysis.MEASURES)} FROM dam_resources WHERE date >= CURDATE() - INTERVAL 30 DAY",
+        'params': (),
+        'index': 'idx_dam_resources_date'
+    },
+    {
+        'name': 'All-dam source statistics',
+        'query': """
+            SELECT COUNT(*), COUNT(DISTINCT dam_id), MIN(date), MAX(date)
+            FROM dam_resources WHERE date >= CURDATE() - INTERVAL 30 DAY
+        """,
+        'params': (),
+        'index': 'idx_dam_resources_date',
+        'covering': True
+    },
+    {
+        'name': 'Recent dam_resources rows',
+        'query': "SELECT * FROM dam_resources ORDER BY date DESC LIMIT %s",
+        'params': (10,),
+        'index': 'idx_dam_resources_date',
+        'no_filesort': True
+    },
+    {
+        'name': 'Recent latest_data rows',
+        'query': "SELECT * FROM latest_data ORDER BY date DESC LIMIT %s",
+        'params': (10,),
+        'index': 'idx_latest_data_date',
+        'no_filesort': True
+    },
+    {
+        'name': 'Latest specific analysis',
+        'query': "SELECT * FROM specific_dam_analysis WHERE dam_id = %s ORDER BY analysis_date DESC LIMIT 1",
+        'params': ('203042',),
+        'index': 'PRIMARY',
+        'no_filesort': True
+    },
+    {
+        'name': 'Latest overall analysis',
+        'query': "SELECT * FROM overall_dam_analysis ORDER BY analysis_date DESC LIMIT 1",
+        'params': (),
+        'index': 'PRIMARY',
+        'no_filesort': True
+    },
+]
+
+def explain_query(connection, query, params):
+    """
+    Return the EXPLAIN rows of a query as dictionaries.
+    """
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(f"EXPLAIN {query}", params)
+        return cursor.fetchall()
+
+def verify_hot_query_plans(connection):
+    """
+    EXPLAIN every hot query and check it uses the expected index, without a full scan, filesort
+    or (for covering reads) table lookups. Plans depend on table statistics, so run this against
+    a database holding representative data, e.g. one filled by seed_verification_data.
+    Returns a list of problem descriptions; an empty list means every plan is as expected.
+    """
+    problems = []
+    for check in HOT_QUERIES:
+        plan = explain_query(connection, check['query'], check['params'])[0]
+        extra = plan.get('Extra') or ''
+        logger.info(f"{check['name']}: type={plan.get('type')}, key={plan.get('key')}, Extra={extra}")
+
+        if plan.get('key') != check['index']:
+            problems.append(f"{check['name']} uses index {plan.get('key')} instead of {check['index']}.")
+        if plan.get('type') == 'ALL':
+            problems.append(f"{check['name']} does a full table scan.")
+        if check.get('no_filesort') and 'Using filesort' in extra:
+            problems.append(f"{check['name']} sorts instead of reading the index in order.")
+        if check.get('covering') and 'Using index' not in extra:
+            problems.append(f"{check['name']} is not answered from the index alone.")
+    return problems
+
+def seed_verification_data(connection, dam_count=50, days=730):
+    """
+    Fill an empty local database with synthetic rows so the optimizer picks realistic plans.
+    Not for use against production.
+    """
+    from datetime import date, timedelta
+
+    start = date.today() - timedelta(days=days)
+    dam_ids = [str(203000 + n) for n in range(dam_count)]
+    resource_rows = [
+        (dam_id, start + timedelta(days=offset), 1000.0 + offset, 50.0, 1.0, 0.5)
+        for dam_id in dam_ids for offset in range(days)
+    ]
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.executemany("INSERT IGNORE INTO dams (dam_id, dam_name) VALUES (%s, %s)", [(d, f"Dam {d}") for d in dam_ids])
+        cursor.executemany(f"""
+            INSERT IGNORE INTO dam_resources (dam_id, date, {', '.join(dam_analysis.MEASURES)})
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, resource_rows)
+        cursor.executemany(f"""
+            INSERT INTO latest_data (dam_id, dam_name, date, {', '.join(dam_analysis.MEASURES)})
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [(row[0], f"Dam {row[0]}", *row[1:]) for row in resource_rows[-dam_count * 30:]])
+        cursor.executemany(
+            "INSERT IGNORE INTO specific_dam_analysis (dam_id, analysis_date) VALUES (%s, %s)",
+            [(dam_id, start + timedelta(days=offset)) for dam_id in dam_ids for offset in range(0, days, 7)]
+        )
+        cursor.executemany(
+            "INSERT IGNORE INTO overall_dam_analysis (analysis_date) VALUES (%s)",
+            [(start + timedelta(days=offset),) for offset in range(days)]
+        )
+        for table_name in ('dams', 'latest_data', 'dam_resources', 'specific_dam_analysis', 'overall_dam_analysis'):
+            cursor.execute(f"ANALYZE TABLE {table_name}")
+            cursor.fetchall()
+    connection.commit()
+    logger.info(f"Seeded {len(resource_rows)} dam_resources rows for {dam_count} dams.")
@@ -0,0 +1,201 @@
+# shared/dam_tiers.py
+
+import logging
+import math
+from datetime import date, timedelta
+import pymysql
+import dam_analysis
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+def week_start(day):
+    """
+    Return the Monday of the week containing day.
+    """
+    return day - timedelta(days=day.weekday())
+
+def month_start(day):
+    """
+    Return the first day of the month containing day.
+    """
+    return day.replace(day=1)
+
+# Calendar tiers: (tier name, SQL bucket start of the daily rollup's date, the same bucket start in Python)
+CALENDAR_TIERS = [
+    ('weekly', "DATE_SUB(date, INTERVAL WEEKDAY(date) DAY)", week_start),
+    ('monthly', "DATE_SUB(date, INTERVAL DAYOFMONTH(date) - 1 DAY)", month_start),
+]
+
+# Point budgets of the shape-preserving LTTB tiers, each covering a dam's whole history
+LTTB_BUDGETS = [250, 1000]
+
+# A series is rebuilt from scratch once incremental appends leave it this far over budget
+LTTB_REBUILD_FACTOR = 1.25
+
+def lttb_tier(budget):
+    """
+    Return the tier name of an LTTB budget.
+    """
+    return f'lttb_{budget}'
+
+def ensure_chart_tier_table(connection):
+    """
+    Create the 'dam_chart_tiers' table if it does not exist. One row per point:
+    (dam_id, measure, tier, point_date) -> value, where tier is 'weekly', 'monthly' or 'lttb_<budget>'.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dam_chart_tiers (
+                dam_id VARCHAR(20) NOT NULL,
+                measure VARCHAR(32) NOT NULL,
+                tier VARCHAR(16) NOT NULL,
+                point_date DATE NOT NULL,
+                value DOUBLE NOT NULL,
+                PRIMARY KEY (dam_id, measure, tier, point_date)
+            )
+        """)
+    connection.commit()
+
+def lttb(points, threshold):
+    """
+    Downsample (x, y) points, ordered by x, to at most threshold points with
+    Largest-Triangle-Three-Buckets. The first and last points are always kept.
+    """
+    if threshold >= len(points):
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]]
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    anchor = points[0]
+    for i in range(threshold - 2):
+        start = int(math.floor(i * bucket_size)) + 1
+        end = int(math.floor((i + 1) * bucket_size)) + 1
+
+        # Average of the next bucket, or the last point for the final bucket
+        next_start = end
+        next_end = min(int(math.floor((i + 2) * bucket_size)) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(point[0] for point in next_bucket) / len(next_bucket)
+        avg_y = sum(point[1] for point in next_bucket) / len(next_bucket)
+
+        best, best_area = None, -1.0
+        for point in points[start:end]:
+            area = abs(
+                (anchor[0] - avg_x) * (point[1] - anchor[1])
+                - (anchor[0] - point[0]) * (avg_y - anchor[1])
+            )
+            if area > best_area:
+                best, best_area = point, area
+        sampled.append(best)
+        anchor = best
+
+    sampled.append(points[-1])
+    return sampled
+
+def refresh_calendar_tiers(cursor, dam_id, from_date):
+    """
+    Recompute the weekly and monthly averages of one dam from the bucket containing from_date onwards,
+    using the daily rollup maintained alongside dam_resources.
+    """
+    for tier, bucket_expression, bucket_start in CALENDAR_TIERS:
+        for measure in dam_analysis.MEASURES:
+            cursor.execute(f"""
+                INSERT INTO dam_chart_tiers (dam_id, measure, tier, point_date, value)
+                SELECT dam_id, %s, %s, {bucket_expression} AS bucket_start,
+                       SUM(sum_{measure}) / SUM(count_{measure})
+                FROM dam_resources_daily_rollup
+                WHERE dam_id = %s AND date >= %s
+                GROUP BY dam_id, bucket_start
+                HAVING SUM(count_{measure}) > 0
+                ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """, (measure, tier, dam_id, bucket_start(from_date)))
+
+def read_daily_series(cursor, dam_id, measure, from_date=None):
+    """
+    Return one dam's daily (date ordinal, value) points for a measure, oldest first, skipping missing values.
+    """
+    date_filter = "AND date >= %s" if from_date else ""
+    cursor.execute(f"""
+        SELECT date, sum_{measure} FROM dam_resources_daily_rollup
+        WHERE dam_id = %s AND count_{measure} > 0 {date_filter}
+        ORDER BY date
+    """, (dam_id, from_date) if from_date else (dam_id,))
+    return [(row[0].toordinal(), float(row[1])) for row in cursor.fetchall()]
+
+def read_tier_points(cursor, dam_id, measure, tier):
+    """
+    Return the stored points of one tier as (date ordinal, value), oldest first.
+    """
+    cursor.execute("""
+        SELECT point_date, value FROM dam_chart_tiers
+        WHERE dam_id = %s AND measure = %s AND tier = %s
+        ORDER BY point_date
+    """, (dam_id, measure, tier))
+    return [(row[0].toordinal(), row[1]) for row in cursor.fetchall()]
+
+def replace_tier_points(cursor, dam_id, measure, tier, points, after=None):
+    """
+    Replace the stored points of a tier after the given date ordinal (all of them when after is None).
+    """
+    if after is None:
+        cursor.execute(
+            "DELETE FROM dam_chart_tiers WHERE dam_id = %s AND measure = %s AND tier = %s",
+            (dam_id, measure, tier)
+        )
+    else:
+        cursor.execute(
+            "DELETE FROM dam_chart_tiers WHERE dam_id = %s AND measure = %s AND tier = %s AND point_date > %s",
+            (dam_id, measure, tier, date.fromordinal(after))
+        )
+    if points:
+        cursor.executemany(
+            "INSERT INTO dam_chart_tiers (dam_id, measure, tier, point_date, value) VALUES (%s, %s, %s, %s, %s)",
+            [(dam_id, measure, tier, date.fromordinal(x), y) for x, y in points]
+        )
+
+def refresh_lttb_tier(cursor, dam_id, measure, budget, from_date):
+    """
+    Bring one LTTB tier up to date after days from from_date onwards were written.
+    When only new days were appended, the stored points up to the second-to-last one are kept and
+    the tail from that point is resampled at the tier's existing density. Changes to older days,
+    or a tier grown past LTTB_REBUILD_FACTOR times its budget, rebuild the tier from the full series.
+    Returns 'append', 'rebuild' or 'unchanged'.
+    """
+    tier = lttb_tier(budget)
+    stored = read_tier_points(cursor, dam_id, measure, tier)
+    from_ordinal = from_date.toordinal()
+
+    if len(stored) >= 3 and from_ordinal > stored[-2][0] and len(stored) <= budget * LTTB_REBUILD_FACTOR:
+        anchor = stored[-2]
+        tail = read_daily_series(cursor, dam_id, measure, date.fromordinal(anchor[0]))
+        # The anchor must still be a stored day for the kept points to join the resampled tail
+        if len(tail) >= 2 and tail[0][0] == anchor[0]:
+            days_per_point = (stored[-1][0] - stored[0][0]) / max(budget - 1, 1)
+            tail_budget = max(2, int(math.ceil((tail[-1][0] - anchor[0]) / max(days_per_point, 1))) + 1)
+            replace_tier_points(cursor, dam_id, measure, tier, lttb(tail, tail_budget)[1:], after=anchor[0])
+            return 'append'
+
+    series = read_daily_series(cursor, dam_id, measure)
+    if not series and not stored:
+        return 'unchanged'
+    replace_tier_points(cursor, dam_id, measure, tier, lttb(series, budget))
+    return 'rebuild'
+
+def refresh_chart_tiers(connection, first_changed_dates):
+    """
+    Update every tier of the dams in first_changed_dates ({dam_id: earliest date written}) and commit.
+    Calendar tiers are recomputed from the first affected bucket; LTTB tiers append or rebuild.
+    """
+    counts = {'append': 0, 'rebuild': 0, 'unchanged': 0}
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        for dam_id, first_date in sorted(first_changed_dates.items()):
+            refresh_calendar_tiers(cursor, dam_id, first_date)
+            for measure in dam_analysis.MEASURES:
+                for budget in LTTB_BUDGETS:
+                    counts[refresh_lttb_tier(cursor, dam_id, measure, budget, first_date)] += 1
+            connection.commit()
+    logger.info(f"Chart tiers refreshed for {len(first_changed_dates)} dam(s). LTTB series: {counts}.")
+    return counts
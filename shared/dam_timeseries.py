@@ -0,0 +1,466 @@
+# shared/dam_timeseries.py
+
+import math
+import struct
+import logging
+from datetime import date
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# File layout:
+#   MAGIC, FORMAT_VERSION
+#   blocks: header (first day ordinal, last day ordinal, point count) then the encoded dates and columns
+#   directory: column names, block size, series table and one index entry per block
+#   footer: directory offset and length, MAGIC
+# Readers fetch the footer and directory, then only the byte ranges of the blocks they need.
+MAGIC = b'DTSC'
+FORMAT_VERSION = 1
+DEFAULT_BLOCK_SIZE = 1024
+
+BLOCK_HEADER = struct.Struct('<IIH')
+INDEX_ENTRY = struct.Struct('<QIIIH')
+FOOTER = struct.Struct('<QI4s')
+
+# Column encodings, in the low bits of each column's tag byte. Scaled columns store the decimal
+# digit count and encode value * 10**digits as zigzag varint deltas; blocks that do not round-trip
+# at any of SCALE_DIGITS (dam_resources measures are DECIMAL(15, 3)) store XOR-compressed float64 bits.
+XOR_ENCODING = 0x0F
+HAS_NULLS = 0x80
+SCALE_DIGITS = (0, 1, 2, 3)
+
+def yearly_archive_key(prefix, year):
+    """
+    Return the S3 key of one year of dam_resources history in the time-series format.
+    """
+    return f"{prefix.rstrip('/')}/dam_resources_timeseries/dam_resources_{year}.dts"
+
+class TimeSeriesFormatError(Exception):
+    """
+    Raised when data is not a readable time-series archive.
+    """
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def unzigzag(value):
+    return -((value + 1) >> 1) if value & 1 else value >> 1
+
+def write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def read_varint(data, position):
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+def write_string(buffer, text):
+    encoded = text.encode('utf-8')
+    write_varint(buffer, len(encoded))
+    buffer.extend(encoded)
+
+def read_string(data, position):
+    length, position = read_varint(data, position)
+    return bytes(data[position:position + length]).decode('utf-8'), position + length
+
+class BitWriter:
+    """
+    Append bit fields most significant bit first.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.length = 0
+
+    def write(self, bits, width):
+        self.value = (self.value << width) | bits
+        self.length += width
+
+    def to_bytes(self):
+        padding = -self.length % 8
+        return (self.value << padding).to_bytes((self.length + padding) // 8, 'big')
+
+class BitReader:
+    """
+    Read bit fields written by BitWriter.
+    """
+
+    def __init__(self, data):
+        self.value = int.from_bytes(data, 'big')
+        self.remaining = len(data) * 8
+
+    def read(self, width):
+        self.remaining -= width
+        return (self.value >> self.remaining) & ((1 << width) - 1)
+
+def float_bits(value):
+    return struct.unpack('<Q', struct.pack('<d', value))[0]
+
+def bits_float(bits):
+    return struct.unpack('<d', struct.pack('<Q', bits))[0]
+
+def encode_xor(values):
+    """
+    Gorilla-style XOR compression: each value is XORed with the previous one and only the
+    meaningful bits are kept, reusing the previous leading/trailing zero window when it fits.
+    """
+    writer = BitWriter()
+    previous = float_bits(values[0])
+    writer.write(previous, 64)
+    window = None
+    for value in values[1:]:
+        bits = float_bits(value)
+        xor = bits ^ previous
+        previous = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if window and leading >= window[0] and trailing >= window[1]:
+            writer.write(0b10, 2)
+            writer.write(xor >> window[1], 64 - window[0] - window[1])
+        else:
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            writer.write(meaningful & 0x3F, 6)  # 64 is stored as 0
+            writer.write(xor >> trailing, meaningful)
+            window = (leading, trailing)
+    return writer.to_bytes()
+
+def decode_xor(data, count):
+    reader = BitReader(data)
+    previous = reader.read(64)
+    values = [bits_float(previous)]
+    window = None
+    for _ in range(count - 1):
+        if reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                window = (leading, 64 - leading - meaningful)
+            previous ^= reader.read(64 - window[0] - window[1]) << window[1]
+        values.append(bits_float(previous))
+    return values
+
+def choose_scale(values):
+    """
+    Return the fewest decimal digits at which every value round-trips exactly, or None.
+    """
+    for digits in SCALE_DIGITS:
+        factor = 10 ** digits
+        if all(math.isfinite(value) and round(value * factor) / factor == value for value in values):
+            return digits
+    return None
+
+def encode_column(values):
+    """
+    Encode one block of a column: a tag byte, an optional null bitmap, then the non-null values.
+    """
+    buffer = bytearray()
+    present = [value is not None for value in values]
+    numbers = [float(value) for value in values if value is not None]
+    digits = choose_scale(numbers) if numbers else 0
+    tag = XOR_ENCODING if digits is None else digits
+    if not all(present):
+        tag |= HAS_NULLS
+    buffer.append(tag)
+
+    if tag & HAS_NULLS:
+        bitmap = bytearray((len(values) + 7) // 8)
+        for index, is_present in enumerate(present):
+            if is_present:
+                bitmap[index // 8] |= 1 << (index % 8)
+        buffer.extend(bitmap)
+    if not numbers:
+        return buffer
+
+    if digits is None:
+        encoded = encode_xor(numbers)
+        write_varint(buffer, len(encoded))
+        buffer.extend(encoded)
+    else:
+        previous = 0
+        for number in numbers:
+            scaled = round(number * 10 ** digits)
+            write_varint(buffer, zigzag(scaled - previous))
+            previous = scaled
+    return buffer
+
+def decode_column(data, position, count):
+    tag = data[position]
+    position += 1
+    if tag & HAS_NULLS:
+        bitmap_length = (count + 7) // 8
+        bitmap = data[position:position + bitmap_length]
+        position += bitmap_length
+        present = [bool(bitmap[index // 8] & (1 << (index % 8))) for index in range(count)]
+    else:
+        present = [True] * count
+
+    number_count = sum(present)
+    encoding = tag & ~HAS_NULLS
+    if not number_count:
+        numbers = []
+    elif encoding == XOR_ENCODING:
+        length, position = read_varint(data, position)
+        numbers = decode_xor(bytes(data[position:position + length]), number_count)
+        position += length
+    else:
+        factor = 10 ** encoding
+        numbers = []
+        scaled = 0
+        for _ in range(number_count):
+            delta, position = read_varint(data, position)
+            scaled += unzigzag(delta)
+            numbers.append(scaled / factor)
+
+    numbers = iter(numbers)
+    return [next(numbers) if is_present else None for is_present in present], position
+
+def encode_block(ordinals, columns):
+    """
+    Encode a block of points: the header, delta-of-delta day ordinals, then each column.
+    """
+    buffer = bytearray(BLOCK_HEADER.pack(ordinals[0], ordinals[-1], len(ordinals)))
+    previous_delta = 0
+    for previous, current in zip(ordinals, ordinals[1:]):
+        delta = current - previous
+        write_varint(buffer, zigzag(delta - previous_delta))
+        previous_delta = delta
+    for values in columns:
+        buffer.extend(encode_column(values))
+    return bytes(buffer)
+
+def decode_block(data, column_count):
+    """
+    Decode a block into (day ordinals, [values per column]).
+    """
+    first, _, count = BLOCK_HEADER.unpack_from(data, 0)
+    position = BLOCK_HEADER.size
+    ordinals = [first]
+    delta = 0
+    for _ in range(count - 1):
+        delta_of_delta, position = read_varint(data, position)
+        delta += unzigzag(delta_of_delta)
+        ordinals.append(ordinals[-1] + delta)
+    columns = []
+    for _ in range(column_count):
+        values, position = decode_column(data, position, count)
+        columns.append(values)
+    return ordinals, columns
+
+class TimeSeriesWriter:
+    """
+    Stream daily series into a time-series archive on a binary file object.
+    Points are written with write(series_id, day, values); each series must arrive in one run,
+    in increasing date order. close() writes the directory and footer.
+    """
+
+    def __init__(self, fileobj, columns, block_size=DEFAULT_BLOCK_SIZE):
+        if not 1 < block_size <= 0xFFFF:
+            raise ValueError("block_size must be between 2 and 65535.")
+        self.fileobj = fileobj
+        self.columns = list(columns)
+        self.block_size = block_size
+        self.offset = 0
+        self.series = []  # (series_id, first block, block count)
+        self.index = []  # (offset, length, first ordinal, last ordinal, count)
+        self.points = 0
+        self._series_id = None
+        self._last_ordinal = None
+        self._ordinals = []
+        self._values = [[] for _ in self.columns]
+        self._write(MAGIC + bytes([FORMAT_VERSION]))
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.offset += len(data)
+
+    def _flush_block(self):
+        if not self._ordinals:
+            return
+        block = encode_block(self._ordinals, self._values)
+        self.index.append((self.offset, len(block), self._ordinals[0], self._ordinals[-1], len(self._ordinals)))
+        series_id, first_block, block_count = self.series[-1]
+        self.series[-1] = (series_id, first_block, block_count + 1)
+        self._write(block)
+        self._ordinals = []
+        self._values = [[] for _ in self.columns]
+
+    def write(self, series_id, day, values):
+        """
+        Append one point. values holds one number or None per column.
+        """
+        series_id = str(series_id)
+        ordinal = day.toordinal()
+        if series_id != self._series_id:
+            self._flush_block()
+            if any(existing == series_id for existing, _, _ in self.series):
+                raise ValueError(f"Series '{series_id}' was already written; rows must be grouped by series.")
+            self.series.append((series_id, len(self.index), 0))
+            self._series_id = series_id
+            self._last_ordinal = None
+        elif ordinal <= self._last_ordinal:
+            raise ValueError(f"Dates of series '{series_id}' must increase; got {day} after {date.fromordinal(self._last_ordinal)}.")
+
+        self._ordinals.append(ordinal)
+        for column_values, value in zip(self._values, values):
+            column_values.append(None if value is None else float(value))
+        self._last_ordinal = ordinal
+        self.points += 1
+        if len(self._ordinals) == self.block_size:
+            self._flush_block()
+
+    def write_rows(self, rows):
+        """
+        Append (series_id, day, *values) rows.
+        """
+        for row in rows:
+            self.write(row[0], row[1], row[2:])
+
+    def close(self):
+        """
+        Flush the last block and write the directory and footer. Does not close the file object.
+        """
+        self._flush_block()
+        directory = bytearray()
+        write_varint(directory, len(self.columns))
+        for column in self.columns:
+            write_string(directory, column)
+        write_varint(directory, self.block_size)
+        write_varint(directory, len(self.series))
+        for series_id, first_block, block_count in self.series:
+            write_string(directory, series_id)
+            write_varint(directory, first_block)
+            write_varint(directory, block_count)
+        write_varint(directory, len(self.index))
+        for entry in self.index:
+            directory.extend(INDEX_ENTRY.pack(*entry))
+
+        directory_offset = self.offset
+        self._write(bytes(directory))
+        self._write(FOOTER.pack(directory_offset, len(directory), MAGIC))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+class TimeSeriesReader:
+    """
+    Read a time-series archive through read_range(start, end), which returns bytes [start, end).
+    Only the directory and the blocks overlapping a requested date range are fetched and decoded.
+    """
+
+    def __init__(self, read_range, size):
+        self.read_range = read_range
+        footer = read_range(size - FOOTER.size, size)
+        directory_offset, directory_length, magic = FOOTER.unpack(footer)
+        if magic != MAGIC:
+            raise TimeSeriesFormatError("Missing time-series archive footer.")
+        directory = read_range(directory_offset, directory_offset + directory_length)
+
+        column_count, position = read_varint(directory, 0)
+        self.columns = []
+        for _ in range(column_count):
+            column, position = read_string(directory, position)
+            self.columns.append(column)
+        self.block_size, position = read_varint(directory, position)
+        series_count, position = read_varint(directory, position)
+        self.series = {}
+        for _ in range(series_count):
+            series_id, position = read_string(directory, position)
+            first_block, position = read_varint(directory, position)
+            block_count, position = read_varint(directory, position)
+            self.series[series_id] = (first_block, block_count)
+        block_count, position = read_varint(directory, position)
+        self.index = [
+            INDEX_ENTRY.unpack_from(directory, position + i * INDEX_ENTRY.size) for i in range(block_count)
+        ]
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Read an archive held in memory.
+        """
+        return cls(lambda start, end: data[start:end], len(data))
+
+    @classmethod
+    def from_s3(cls, s3_client, bucket, key):
+        """
+        Read an archive in S3 with byte-range GETs.
+        """
+        size = s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+
+        def read_range(start, end):
+            response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end - 1}")
+            return response['Body'].read()
+
+        return cls(read_range, size)
+
+    def series_ids(self):
+        return list(self.series)
+
+    def _blocks(self, series_id, start_ordinal, end_ordinal):
+        first_block, block_count = self.series.get(str(series_id), (0, 0))
+        return [
+            block for block in range(first_block, first_block + block_count)
+            if self.index[block][3] >= start_ordinal and self.index[block][2] < end_ordinal
+        ]
+
+    def iter_series(self, start_date=None, end_date=None, series_ids=None):
+        """
+        Yield (series_id, dates, {column: values}) for points with start_date <= date < end_date.
+        Adjacent blocks are fetched with a single range read.
+        """
+        start_ordinal = start_date.toordinal() if start_date else 0
+        end_ordinal = end_date.toordinal() if end_date else date.max.toordinal() + 1
+        wanted = [str(series_id) for series_id in series_ids] if series_ids is not None else list(self.series)
+        plan = [(series_id, self._blocks(series_id, start_ordinal, end_ordinal)) for series_id in wanted]
+        plan = [(series_id, blocks) for series_id, blocks in plan if blocks]
+
+        # Coalesce the blocks of consecutive series into contiguous byte ranges
+        runs = []
+        for series_id, blocks in plan:
+            start = self.index[blocks[0]][0]
+            end = self.index[blocks[-1]][0] + self.index[blocks[-1]][1]
+            if runs and runs[-1]['end'] == start:
+                runs[-1]['end'] = end
+                runs[-1]['series'].append((series_id, blocks))
+            else:
+                runs.append({'start': start, 'end': end, 'series': [(series_id, blocks)]})
+
+        for run in runs:
+            data = self.read_range(run['start'], run['end'])
+            for series_id, blocks in run['series']:
+                dates = []
+                values = {column: [] for column in self.columns}
+                for block in blocks:
+                    offset, length = self.index[block][0] - run['start'], self.index[block][1]
+                    ordinals, columns = decode_block(memoryview(data)[offset:offset + length], len(self.columns))
+                    for position, ordinal in enumerate(ordinals):
+                        if start_ordinal <= ordinal < end_ordinal:
+                            dates.append(date.fromordinal(ordinal))
+                            for column, column_values in zip(self.columns, columns):
+                                values[column].append(column_values[position])
+                yield series_id, dates, values
+
+    def read(self, series_id, start_date=None, end_date=None):
+        """
+        Return (dates, {column: values}) of one series for start_date <= date < end_date.
+        """
+        for _, dates, values in self.iter_series(start_date, end_date, [series_id]):
+            return dates, values
+        return [], {column: [] for column in self.columns}
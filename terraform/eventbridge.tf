@@ -48,6 +48,73 @@ resource "aws_cloudwatch_event_target" "glue_completion_to_sns" {
   arn  = aws_sns_topic.eventbridge_notifications.arn
 }
 
+# Rule to start a queued follow-up Glue run once the current run finishes
+resource "aws_cloudwatch_event_rule" "glue_job_finished_rule" {
+  name        = "glue_job_finished_rule"
+  description = "Rule triggered when a Glue job run reaches a final state"
+  event_pattern = jsonencode({
+    "source": ["aws.glue"],
+    "detail-type": ["Glue Job State Change"],
+    "detail": {
+      "state": ["SUCCEEDED", "FAILED", "STOPPED", "TIMEOUT"],
+      "jobName": ["${aws_glue_job.latest_dam_data_etl.name}"]
+    }
+  })
+}
+
+resource "aws_cloudwatch_event_target" "glue_finished_to_load_rds_glue" {
+  rule = aws_cloudwatch_event_rule.glue_job_finished_rule.name
+  arn  = aws_lambda_function.lambda_load_rds_glue.arn
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_glue_finished_to_invoke_load_rds_glue" {
+  statement_id  = "AllowEventBridgeGlueFinishedInvokeLoadRDSGlue"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.lambda_load_rds_glue.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.glue_job_finished_rule.arn
+}
+
+# Schedule that drains follow-up Glue runs left queued by the debounce window
+resource "aws_cloudwatch_event_rule" "glue_follow_up_schedule" {
+  name                = "glue_follow_up_schedule"
+  description         = "Rule to periodically start queued follow-up Glue runs"
+  schedule_expression = "rate(10 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "glue_follow_up_schedule_target" {
+  rule = aws_cloudwatch_event_rule.glue_follow_up_schedule.name
+  arn  = aws_lambda_function.lambda_load_rds_glue.arn
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_schedule_to_invoke_load_rds_glue" {
+  statement_id  = "AllowEventBridgeScheduleInvokeLoadRDSGlue"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.lambda_load_rds_glue.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.glue_follow_up_schedule.arn
+}
+
+# Monthly, so a failed run is retried well before the next year's partition is needed
+resource "aws_cloudwatch_event_rule" "partition_maintenance_schedule" {
+  name                = "partition_maintenance_schedule"
+  description         = "Rule to pre-create dam_resources partitions and archive old ones"
+  schedule_expression = "cron(0 3 1 * ? *)"
+}
+
+resource "aws_cloudwatch_event_target" "partition_maintenance_schedule_target" {
+  rule = aws_cloudwatch_event_rule.partition_maintenance_schedule.name
+  arn  = aws_lambda_function.lambda_partition_maintenance.arn
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_schedule_to_invoke_partition_maintenance" {
+  statement_id  = "AllowEventBridgeScheduleInvokePartitionMaintenance"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.lambda_partition_maintenance.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.partition_maintenance_schedule.arn
+}
+
 # Allow EventBridge to publish events to the SNS topic
 resource "aws_sns_topic_policy" "allow_eventbridge_to_publish" {
   arn = aws_sns_topic.eventbridge_notifications.arn
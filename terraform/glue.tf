@@ -30,6 +30,50 @@ resource "aws_s3_object" "latest_dam_data_etl_script" {
   # acl    = "private"
 }
 
+resource "aws_s3_object" "dam_analytics_engine_script" {
+  bucket = aws_s3_bucket.glue_scripts.bucket
+  key    = "scripts/dam_analytics_engine.py"
+  source = "${path.module}/../glue_scripts/dam_analytics_engine.py"
+}
+
+resource "aws_s3_object" "dam_db_module" {
+  bucket = aws_s3_bucket.glue_scripts.bucket
+  key    = "scripts/dam_db.py"
+  source = "${path.module}/../shared/dam_db.py"
+}
+
+resource "aws_s3_object" "dam_timeseries_module" {
+  bucket = aws_s3_bucket.glue_scripts.bucket
+  key    = "scripts/dam_timeseries.py"
+  source = "${path.module}/../shared/dam_timeseries.py"
+}
+
+resource "aws_s3_object" "dam_partitions_module" {
+  bucket = aws_s3_bucket.glue_scripts.bucket
+  key    = "scripts/dam_partitions.py"
+  source = "${path.module}/../shared/dam_partitions.py"
+}
+
+resource "aws_s3_object" "dam_load_sequence_module" {
+  bucket = aws_s3_bucket.glue_scripts.bucket
+  key    = "scripts/dam_load_sequence.py"
+  source = "${path.module}/../shared/dam_load_sequence.py"
+}
+
+resource "aws_s3_object" "dam_analysis_module" {
+  bucket = aws_s3_bucket.glue_scripts.bucket
+  key    = "scripts/dam_analysis.py"
+  source = "${path.module}/../shared/dam_analysis.py"
+}
+
+# Source reads go to the read replica when one is configured; Glue rejects empty argument values
+locals {
+  glue_replica_arguments = var.DB_REPLICA_HOST == "" ? {} : {
+    "--REPLICA_HOST"            = var.DB_REPLICA_HOST
+    "--REPLICA_MAX_LAG_SECONDS" = tostring(var.DB_REPLICA_MAX_LAG_SECONDS)
+  }
+}
+
 resource "aws_glue_job" "latest_dam_data_etl" {
   name     = "latest_dam_data_etl"
   role_arn = aws_iam_role.glue_service_role.arn
@@ -40,7 +84,7 @@ resource "aws_glue_job" "latest_dam_data_etl" {
     script_location = "s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/latest_dam_data_etl.py"
   }
 
-  default_arguments = {
+  default_arguments = merge({
     "--job-language"              = "python"
     "--TempDir"                   = "s3://${aws_s3_bucket.glue_temp.bucket}/temp/"
     "--DB_HOST"                   = var.DB_HOST
@@ -49,9 +93,23 @@ resource "aws_glue_job" "latest_dam_data_etl" {
     "--DB_USER"                   = var.DB_USER
     "--DB_PASSWORD"               = var.DB_PASSWORD
     "--additional-python-modules" = "pymysql"
+    "--extra-py-files"            = "s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_db.py,s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_load_sequence.py,s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_analysis.py"  # Shared connection pool, load sequence and analysis definitions
+    "--ANALYTICS_SOURCE"          = "raw"  # Set to "rollup" once scripts/backfill_rollups.py has been run
+    "--ANALYSIS_MODE"             = "all"  # "single" analyses DAM_ID only
+    "--DAM_ID"                    = "203042"  # Toonumbar Dam, used in "single" mode
+    "--EXECUTION_MODE"            = "auto"  # "pushdown" aggregates in MySQL, "spark" reads rows into Spark
+    "--PUSHDOWN_MAX_ROWS"         = "2000000"  # Largest scan "auto" still pushes down to MySQL
+    "--LOG_RECORD_COUNTS"         = "false"  # Set to "true" to log per-window record counts
+    "--CACHE_MEMORY_LIMIT_MB"     = "512"
+    "--JDBC_ROWS_PER_PARTITION"   = "20000"  # Rows per parallel JDBC range read
+    "--PARTITION_WRITE_MIN_DAMS"  = "5000"  # Above this many dams, results are written from the executors
+    "--LAKE_EXPORT"               = "true"  # Append newly loaded days to the Parquet data lake before the analysis
+    "--LAKE_EXPORT_MODE"          = "incremental"  # "full" rewrites every partition
+    "--LAKE_PATH"                 = "s3://${aws_s3_bucket.dam_data_lake.bucket}/dam_resources/"
+    "--DISTRIBUTION_STATS"        = "true"  # Median, p10/p90, min and max per window; pushdown adds the quantiles in a separate MySQL step
     "--enable-continuous-log-filter" = "true"  # Set to "true" or "false" explicitly
     "--enable-metrics"            = "true"  # Set to "true" or "false" explicitly
-  }
+  }, local.glue_replica_arguments)
 
   glue_version      = "3.0"  # Updated from "2.0" to "3.0"
   max_retries       = 0
@@ -66,6 +124,41 @@ resource "aws_glue_job" "latest_dam_data_etl" {
   # Removed the connections parameter to avoid running in a VPC
 }
 
+# Python shell variant of latest_dam_data_etl that computes the analytics in one process with NumPy
+resource "aws_glue_job" "latest_dam_data_etl_shell" {
+  name     = "latest_dam_data_etl_shell"
+  role_arn = aws_iam_role.glue_service_role.arn
+
+  command {
+    name            = "pythonshell"
+    python_version  = "3.9"
+    script_location = "s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_analytics_engine.py"
+  }
+
+  default_arguments = merge({
+    "--job-language"              = "python"
+    "--TempDir"                   = "s3://${aws_s3_bucket.glue_temp.bucket}/temp/"
+    "--DB_HOST"                   = var.DB_HOST
+    "--DB_PORT"                   = var.DB_PORT
+    "--DB_NAME"                   = var.DB_NAME
+    "--DB_USER"                   = var.DB_USER
+    "--DB_PASSWORD"               = var.DB_PASSWORD
+    "--INCREMENTAL"               = "true"  # Averages only; "false" also fills the min/quantile/max columns
+    "--HISTORY_ARCHIVE"           = "s3://${aws_s3_bucket.dam_data_lake.bucket}/archive"  # Complete years are read from time-series archives in full runs
+    "--additional-python-modules" = "pymysql"
+    "--extra-py-files"            = "s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_db.py,s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_timeseries.py,s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_partitions.py,s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_load_sequence.py,s3://${aws_s3_bucket.glue_scripts.bucket}/scripts/dam_analysis.py"  # Shared connection pool, archive codec and checksums, load sequence and analysis definitions
+    "library-set"                 = "analytics"  # Preinstalls NumPy for Python shell 3.9
+  }, local.glue_replica_arguments)
+
+  max_capacity = 0.0625
+  max_retries  = 0
+  timeout      = 10
+
+  execution_property {
+    max_concurrent_runs = 1
+  }
+}
+
 # Removed the Glue connection resource since we're not using a VPC
 # resource "aws_glue_connection" "glue_rds_connection" {
 #   name = "glue-rds-connection"
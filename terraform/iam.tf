@@ -188,6 +188,20 @@ resource "aws_iam_policy" "glue_s3_access_policy" {
           aws_s3_bucket.glue_temp.arn,
           "${aws_s3_bucket.glue_temp.arn}/*"
         ]
+      },
+      {
+        # Permissions to maintain and read the dam_resources data lake
+        "Effect": "Allow",
+        "Action": [
+          "s3:PutObject",
+          "s3:DeleteObject",
+          "s3:GetObject",
+          "s3:ListBucket"
+        ],
+        "Resource": [
+          aws_s3_bucket.dam_data_lake.arn,
+          "${aws_s3_bucket.dam_data_lake.arn}/*"
+        ]
       }
     ]
   })
@@ -201,7 +215,7 @@ resource "aws_iam_role_policy_attachment" "attach_glue_s3_access_policy" {
 # Policy to allow Lambda to start Glue jobs
 resource "aws_iam_policy" "lambda_glue_policy" {
   name        = "LambdaGlueStartJobPolicy"
-  description = "Policy to allow Lambda functions to start Glue jobs"
+  description = "Policy to allow Lambda functions to start Glue jobs and check their active runs"
 
   policy = jsonencode({
     "Version": "2012-10-17",
@@ -209,7 +223,8 @@ resource "aws_iam_policy" "lambda_glue_policy" {
       {
         "Effect": "Allow",
         "Action": [
-          "glue:StartJobRun"
+          "glue:StartJobRun",
+          "glue:GetJobRuns"
         ],
         "Resource": [
           aws_glue_job.latest_dam_data_etl.arn
@@ -223,3 +238,80 @@ resource "aws_iam_role_policy_attachment" "attach_lambda_glue_policy" {
   role       = aws_iam_role.lambda_execution_role.name
   policy_arn = aws_iam_policy.lambda_glue_policy.arn
 }
+
+# Policy to allow lambda_partition_maintenance to archive old dam_resources partitions
+resource "aws_iam_policy" "lambda_partition_archive_policy" {
+  name        = "LambdaPartitionArchivePolicy"
+  description = "Policy to allow Lambda to write and check dam_resources partition archives in the data lake bucket"
+
+  policy = jsonencode({
+    "Version": "2012-10-17",
+    "Statement": [
+      {
+        "Effect": "Allow",
+        "Action": [
+          "s3:PutObject",
+          "s3:GetObject"
+        ],
+        "Resource": "${aws_s3_bucket.dam_data_lake.arn}/archive/*"
+      },
+      {
+        # ListBucket lets HeadObject report a missing archive as 404 rather than 403
+        "Effect": "Allow",
+        "Action": [
+          "s3:ListBucket"
+        ],
+        "Resource": aws_s3_bucket.dam_data_lake.arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "attach_lambda_partition_archive_policy" {
+  role       = aws_iam_role.lambda_execution_role.name
+  policy_arn = aws_iam_policy.lambda_partition_archive_policy.arn
+}
+
+# Policy to allow lambda_load_rds_glue to start lambda_publish_snapshots and its own chart tier refreshes,
+# and the publisher to write snapshots
+resource "aws_iam_policy" "lambda_dashboard_snapshot_policy" {
+  name        = "LambdaDashboardSnapshotPolicy"
+  description = "Policy to allow Lambda to invoke the snapshot publisher and manage dashboard snapshots"
+
+  policy = jsonencode({
+    "Version": "2012-10-17",
+    "Statement": [
+      {
+        "Effect": "Allow",
+        "Action": [
+          "lambda:InvokeFunction"
+        ],
+        "Resource": [
+          aws_lambda_function.lambda_publish_snapshots.arn,
+          aws_lambda_function.lambda_load_rds_glue.arn
+        ]
+      },
+      {
+        "Effect": "Allow",
+        "Action": [
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:DeleteObject"
+        ],
+        "Resource": "${aws_s3_bucket.dashboard_snapshots.arn}/*"
+      },
+      {
+        "Effect": "Allow",
+        "Action": [
+          "s3:ListBucket"
+        ],
+        "Resource": aws_s3_bucket.dashboard_snapshots.arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "attach_lambda_dashboard_snapshot_policy" {
+  role       = aws_iam_role.lambda_execution_role.name
+  policy_arn = aws_iam_policy.lambda_dashboard_snapshot_policy.arn
+}
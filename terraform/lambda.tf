@@ -56,15 +56,17 @@ resource "aws_lambda_function" "lambda_data_collection" {
 
   environment {
     variables = {
-      CUSTOM_AWS_REGION = var.CUSTOM_AWS_REGION
-      SNS_TOPIC_ARN     = aws_sns_topic.eventbridge_notifications.arn
-      SECRET_NAME       = var.SECRET_NAME
-      DB_HOST           = var.DB_HOST
-      DB_PORT           = var.DB_PORT
-      DB_NAME           = var.DB_NAME
-      DB_USER           = var.DB_USER
-      DB_PASSWORD       = var.DB_PASSWORD
-      S3_BUCKET_NAME    = aws_s3_bucket.latest_dam_data_storage.bucket
+      CUSTOM_AWS_REGION          = var.CUSTOM_AWS_REGION
+      SNS_TOPIC_ARN              = aws_sns_topic.eventbridge_notifications.arn
+      SECRET_NAME                = var.SECRET_NAME
+      DB_HOST                    = var.DB_HOST
+      DB_PORT                    = var.DB_PORT
+      DB_NAME                    = var.DB_NAME
+      DB_USER                    = var.DB_USER
+      DB_PASSWORD                = var.DB_PASSWORD
+      DB_REPLICA_HOST            = var.DB_REPLICA_HOST  # Dams are read from the replica when set
+      DB_REPLICA_MAX_LAG_SECONDS = var.DB_REPLICA_MAX_LAG_SECONDS
+      S3_BUCKET_NAME             = aws_s3_bucket.latest_dam_data_storage.bucket
     }
   }
 
@@ -85,11 +87,13 @@ resource "aws_lambda_function" "lambda_db_connection" {
 
   environment {
     variables = {
-      DB_HOST     = var.DB_HOST
-      DB_PORT     = var.DB_PORT
-      DB_NAME     = var.DB_NAME
-      DB_USER     = var.DB_USER
-      DB_PASSWORD = var.DB_PASSWORD
+      DB_HOST                    = var.DB_HOST
+      DB_PORT                    = var.DB_PORT
+      DB_NAME                    = var.DB_NAME
+      DB_USER                    = var.DB_USER
+      DB_PASSWORD                = var.DB_PASSWORD
+      DB_REPLICA_HOST            = var.DB_REPLICA_HOST
+      DB_REPLICA_MAX_LAG_SECONDS = var.DB_REPLICA_MAX_LAG_SECONDS
     }
   }
 
@@ -117,6 +121,15 @@ resource "aws_lambda_function" "lambda_load_rds_glue" {
       DB_USER           = var.DB_USER
       DB_PASSWORD       = var.DB_PASSWORD
       GLUE_JOB_NAME     = aws_glue_job.latest_dam_data_etl.name  # Added environment variable
+      GLUE_DEBOUNCE_SECONDS = "300"
+      COMMIT_BATCH_SIZE     = "500"
+      LOCK_RETRY_ATTEMPTS   = "3"
+      ANALYTICS_ENGINE      = "glue"  # "local" runs dam_analytics_engine in this Lambda instead
+      ANALYTICS_INCREMENTAL = "true"  # Watermark-based incremental analysis for the local engine
+      HISTORY_ARCHIVE       = "s3://${aws_s3_bucket.dam_data_lake.bucket}/archive"  # Time-series archives read by full local analyses
+      CHART_TIERS           = "true"  # Keep the weekly, monthly and LTTB chart tiers up to date after each load
+      CHART_TIER_DAMS_PER_INVOCATION = "10"  # Dams refreshed per asynchronous tier invocation; the rest are passed on
+      SNAPSHOT_FUNCTION_NAME = aws_lambda_function.lambda_publish_snapshots.function_name
     }
   }
 
@@ -132,3 +145,105 @@ resource "aws_lambda_permission" "allow_s3_invoke_lambda_load_rds_glue" {
   principal     = "s3.amazonaws.com"
   source_arn    = aws_s3_bucket.latest_dam_data_storage.arn
 }
+
+resource "aws_lambda_function" "lambda_partition_maintenance" {
+  function_name    = "lambda_partition_maintenance"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "lambda_partition_maintenance.lambda_handler"
+  runtime          = "python3.8"
+  filename         = "${path.module}/../zipped_lambda_functions/lambda_partition_maintenance.zip"
+  source_code_hash = filebase64sha256("${path.module}/../zipped_lambda_functions/lambda_partition_maintenance.zip")
+
+  timeout     = 900  # Archiving streams a whole year of rows to S3
+  memory_size = 512
+
+  environment {
+    variables = {
+      DB_HOST                   = var.DB_HOST
+      DB_PORT                   = var.DB_PORT
+      DB_NAME                   = var.DB_NAME
+      DB_USER                   = var.DB_USER
+      DB_PASSWORD               = var.DB_PASSWORD
+      PARTITION_RETENTION_YEARS = "0"  # 0 keeps every year; the analytics read 20 years back
+      ARCHIVE_BUCKET            = aws_s3_bucket.dam_data_lake.bucket
+      ARCHIVE_PREFIX            = "archive"
+      DROP_ARCHIVED_PARTITIONS  = "false"  # Set to "true" to drop partitions once archived
+      TIMESERIES_ARCHIVE        = "true"  # Keep time-series archives of complete years for the analytics
+    }
+  }
+
+  tags = {
+    Environment = "production"
+  }
+}
+
+# Read API serving latest_data and the analysis tables to the dashboard, with per-container caching
+resource "aws_lambda_function" "lambda_dashboard_api" {
+  function_name    = "lambda_dashboard_api"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "lambda_dashboard_api.lambda_handler"
+  runtime          = "python3.8"
+  filename         = "${path.module}/../zipped_lambda_functions/lambda_dashboard_api.zip"
+  source_code_hash = filebase64sha256("${path.module}/../zipped_lambda_functions/lambda_dashboard_api.zip")
+
+  timeout = 15
+
+  environment {
+    variables = {
+      DB_HOST                    = var.DB_HOST
+      DB_PORT                    = var.DB_PORT
+      DB_NAME                    = var.DB_NAME
+      DB_USER                    = var.DB_USER
+      DB_PASSWORD                = var.DB_PASSWORD
+      DB_REPLICA_HOST            = var.DB_REPLICA_HOST
+      DB_REPLICA_MAX_LAG_SECONDS = var.DB_REPLICA_MAX_LAG_SECONDS
+      CACHE_TTL_SECONDS          = "300"  # Longest a warm container serves a response without rereading it
+      VERSION_CHECK_SECONDS      = "30"  # How often the data version stamp is reread
+    }
+  }
+
+  tags = {
+    Environment = "production"
+  }
+}
+
+resource "aws_lambda_function_url" "lambda_dashboard_api_url" {
+  function_name      = aws_lambda_function.lambda_dashboard_api.function_name
+  authorization_type = "NONE"  # Public, read-only dashboard data
+
+  cors {
+    allow_origins  = ["*"]
+    allow_methods  = ["GET"]
+    allow_headers  = ["if-none-match"]
+    expose_headers = ["etag"]
+  }
+}
+
+# Renders the dashboard views to gzipped JSON on S3 after each load and successful Glue run
+resource "aws_lambda_function" "lambda_publish_snapshots" {
+  function_name    = "lambda_publish_snapshots"
+  role             = aws_iam_role.lambda_execution_role.arn
+  handler          = "lambda_publish_snapshots.lambda_handler"
+  runtime          = "python3.8"
+  filename         = "${path.module}/../zipped_lambda_functions/lambda_publish_snapshots.zip"
+  source_code_hash = filebase64sha256("${path.module}/../zipped_lambda_functions/lambda_publish_snapshots.zip")
+
+  timeout = 120
+
+  environment {
+    variables = {
+      DB_HOST                = var.DB_HOST
+      DB_PORT                = var.DB_PORT
+      DB_NAME                = var.DB_NAME
+      DB_USER                = var.DB_USER
+      DB_PASSWORD            = var.DB_PASSWORD
+      SNAPSHOT_BUCKET        = aws_s3_bucket.dashboard_snapshots.bucket
+      SNAPSHOT_PREFIX        = "snapshots"
+      KEEP_SNAPSHOT_VERSIONS = "3"  # Older versioned sets are deleted after each publish
+    }
+  }
+
+  tags = {
+    Environment = "production"
+  }
+}
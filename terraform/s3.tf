@@ -9,6 +9,26 @@ resource "aws_s3_bucket" "latest_dam_data_storage" {
   }
 }
 
+# Parquet copy of dam_resources, partitioned by year and dam_id, written by the latest_dam_data_etl Glue job
+resource "aws_s3_bucket" "dam_data_lake" {
+  bucket = "dam-data-lake-${var.AWS_ACCOUNT_ID}"
+
+  tags = {
+    Environment = "production"
+    Name        = "DamDataLake"
+  }
+}
+
+# Precomputed dashboard JSON written by lambda_publish_snapshots; serve it through a CDN as the dashboard origin
+resource "aws_s3_bucket" "dashboard_snapshots" {
+  bucket = "dam-dashboard-snapshots-${var.AWS_ACCOUNT_ID}"
+
+  tags = {
+    Environment = "production"
+    Name        = "DamDashboardSnapshots"
+  }
+}
+
 resource "aws_s3_bucket_notification" "latest_dam_data_storage_notification" {
   bucket = aws_s3_bucket.latest_dam_data_storage.id
 
@@ -38,6 +38,18 @@ variable "DB_PASSWORD" {
   sensitive   = true
 }
 
+variable "DB_REPLICA_HOST" {
+  type        = string
+  description = "The hostname of an optional RDS read replica. Leave empty to read from the primary."
+  default     = ""
+}
+
+variable "DB_REPLICA_MAX_LAG_SECONDS" {
+  type        = number
+  description = "Replication lag above which reads fall back to the primary."
+  default     = 30
+}
+
 variable "CUSTOM_AWS_REGION" {
   type        = string
   description = "The AWS region to use"
@@ -0,0 +1,14 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# The shared modules and Glue scripts are deployed as top-level modules, so import them the same way
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for directory in ('shared', 'glue_scripts'):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+# Lambda handlers are imported from their package directories; appended so the pymysql
+# copies vendored next to them do not shadow the installed one
+for directory in ('lambda_load_rds_glue', 'lambda_publish_snapshots'):
+    sys.path.append(os.path.join(ROOT, directory))
@@ -0,0 +1,49 @@
+# tests/test_dam_analysis.py
+
+import dam_analysis
+
+def test_combine_window_totals_adds_and_skips_nulls():
+    combined = dam_analysis.combine_window_totals([
+        {'sum_storage_volume_12_months': 10.0, 'count_storage_volume_12_months': 2},
+        {'sum_storage_volume_12_months': None, 'count_storage_volume_12_months': 0},
+        {'sum_storage_volume_12_months': 5.5, 'count_storage_volume_12_months': 1, 'sum_storage_volume_5_years': 7.0},
+    ])
+    assert combined == {
+        'sum_storage_volume_12_months': 15.5,
+        'count_storage_volume_12_months': 3,
+        'sum_storage_volume_5_years': 7.0,
+    }
+
+def test_combine_window_totals_of_nothing_is_empty():
+    assert dam_analysis.combine_window_totals([]) == {}
+
+def test_averages_from_totals_covers_every_average_column():
+    averages = dam_analysis.averages_from_totals({
+        'sum_storage_volume_12_months': 30.0, 'count_storage_volume_12_months': 4,
+        'sum_percentage_full_20_years': 12.0, 'count_percentage_full_20_years': 0,
+    })
+    assert set(averages) == set(dam_analysis.AVERAGE_COLUMNS)
+    assert averages['avg_storage_volume_12_months'] == 7.5
+    assert averages['avg_percentage_full_20_years'] is None
+    assert averages['avg_storage_inflow_5_years'] is None
+
+def test_averages_of_combined_totals_weight_by_count():
+    per_dam = [
+        {'sum_storage_release_5_years': 10.0, 'count_storage_release_5_years': 1},
+        {'sum_storage_release_5_years': 30.0, 'count_storage_release_5_years': 3},
+    ]
+    averages = dam_analysis.averages_from_totals(dam_analysis.combine_window_totals(per_dam))
+    assert averages['avg_storage_release_5_years'] == 10.0
+
+def test_combine_window_extremes_keeps_min_and_max_only():
+    combined = dam_analysis.combine_window_extremes([
+        {'min_storage_volume_12_months': 3.0, 'max_storage_volume_12_months': 9.0, 'median_storage_volume_12_months': 5.0},
+        {'min_storage_volume_12_months': 1.0, 'max_storage_volume_12_months': None},
+        {'min_storage_volume_12_months': None, 'max_storage_volume_12_months': 12.0},
+    ])
+    assert combined == {'min_storage_volume_12_months': 1.0, 'max_storage_volume_12_months': 12.0}
+
+def test_analysis_columns_match_windows_and_stats():
+    assert len(dam_analysis.AVERAGE_COLUMNS) == len(dam_analysis.MEASURES) * len(dam_analysis.ANALYSIS_WINDOWS)
+    assert len(dam_analysis.DISTRIBUTION_COLUMNS) == len(dam_analysis.AVERAGE_COLUMNS) * len(dam_analysis.DISTRIBUTION_STATS)
+    assert dam_analysis.ANALYSIS_COLUMNS == dam_analysis.AVERAGE_COLUMNS + dam_analysis.DISTRIBUTION_COLUMNS
@@ -0,0 +1,131 @@
+# tests/test_dam_db.py
+
+import pytest
+import pymysql
+import dam_db
+
+class FakeConnection:
+    """
+    Stand-in for a pymysql connection that records what the pool does with it.
+    """
+
+    def __init__(self, **connect_args):
+        self.connect_args = connect_args
+        self.open = True
+        self.rollbacks = 0
+        self.pings = 0
+        self.fail_rollback = False
+        self.fail_ping = False
+        self._sock = None
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+        self.rollbacks += 1
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.fail_ping:
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def close(self):
+        self.open = False
+
+@pytest.fixture
+def connections(monkeypatch):
+    created = []
+
+    def connect(**connect_args):
+        connection = FakeConnection(**connect_args)
+        created.append(connection)
+        return connection
+
+    monkeypatch.setattr(pymysql, 'connect', connect)
+    return created
+
+def make_pool(**options):
+    return dam_db.ConnectionPool('db.local', 3306, 'user', 'secret', 'dams', **options)
+
+def test_acquire_opens_a_connection_with_the_pool_settings(connections):
+    pool = make_pool(cursorclass=pymysql.cursors.DictCursor)
+    connection = pool.acquire()
+    assert connections == [connection]
+    assert connection.connect_args['host'] == 'db.local'
+    assert connection.connect_args['cursorclass'] is pymysql.cursors.DictCursor
+    assert pool.stats()['size'] == 1
+
+def test_released_connection_is_reused(connections):
+    pool = make_pool()
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert len(connections) == 1
+    assert pool.stats()['reused'] == 1
+
+def test_release_rolls_back_the_open_transaction(connections):
+    pool = make_pool()
+    connection = pool.acquire()
+    pool.release(connection)
+    assert connection.rollbacks == 1
+    assert connection.open
+
+def test_release_drops_a_connection_that_cannot_be_rolled_back(connections):
+    pool = make_pool(max_size=1)
+    broken = pool.acquire()
+    broken.fail_rollback = True
+    pool.release(broken)
+    assert not broken.open
+    assert pool.stats()['size'] == 0
+
+    replacement = pool.acquire(timeout=0.1)
+    assert replacement is not broken
+    assert len(connections) == 2
+
+def test_release_of_a_closed_connection_frees_its_slot(connections):
+    pool = make_pool(max_size=1)
+    connection = pool.acquire()
+    connection.close()
+    pool.release(connection)
+    assert pool.stats()['size'] == 0
+    assert pool.stats()['idle'] == 0
+
+def test_acquire_times_out_when_the_pool_is_exhausted(connections):
+    pool = make_pool(max_size=1)
+    pool.acquire()
+    with pytest.raises(dam_db.PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+
+def test_stale_idle_connection_is_replaced(connections):
+    pool = make_pool(ping_interval=0)
+    stale = pool.acquire()
+    pool.release(stale)
+    stale.fail_ping = True
+
+    fresh = pool.acquire()
+    assert fresh is not stale
+    assert not stale.open
+    assert pool.stats()['size'] == 1
+
+def test_connection_block_rolls_back_on_error_and_returns_the_connection(connections):
+    pool = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.connection() as connection:
+            raise RuntimeError("write failed")
+    # Once for the error, once more on release
+    assert connection.rollbacks == 2
+    assert pool.stats()['idle'] == 1
+
+def test_close_all_closes_idle_connections(connections):
+    pool = make_pool()
+    connection = pool.acquire()
+    pool.release(connection)
+    pool.close_all()
+    assert not connection.open
+    assert pool.stats()['size'] == 0
+
+def test_get_pool_shares_pools_only_for_identical_settings(connections):
+    settings = {'host': 'pool-key.local', 'port': 3306, 'user': 'user', 'password': 'secret', 'database': 'dams'}
+    pool = dam_db.get_pool(**settings)
+    assert dam_db.get_pool(**{**settings, 'port': '3306'}) is pool
+    assert dam_db.get_pool(**settings, cursorclass=pymysql.cursors.DictCursor) is not pool
+    assert dam_db.get_pool(**{**settings, 'password': 'rotated'}) is not pool
@@ -0,0 +1,34 @@
+# tests/test_dam_tiers.py
+
+import math
+import pytest
+import dam_tiers
+
+def sine_points(count):
+    return [(x, math.sin(x / 10)) for x in range(count)]
+
+def test_lttb_keeps_short_series_whole():
+    points = sine_points(10)
+    assert dam_tiers.lttb(points, 10) == points
+    assert dam_tiers.lttb(points, 50) == points
+
+def test_lttb_keeps_only_endpoints_below_three_points():
+    points = sine_points(10)
+    assert dam_tiers.lttb(points, 2) == [points[0], points[-1]]
+
+@pytest.mark.parametrize('count, threshold', [(1000, 100), (101, 3), (500, 499), (37, 10)])
+def test_lttb_returns_an_ordered_subset_of_threshold_points(count, threshold):
+    points = sine_points(count)
+    sampled = dam_tiers.lttb(points, threshold)
+    assert len(sampled) == threshold
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert all(point in points for point in sampled)
+    assert [x for x, _ in sampled] == sorted({x for x, _ in sampled})
+
+def test_lttb_keeps_isolated_spikes():
+    points = [(x, 0.0) for x in range(200)]
+    points[77] = (77, 100.0)
+    points[150] = (150, -50.0)
+    sampled = dam_tiers.lttb(points, 20)
+    assert (77, 100.0) in sampled
+    assert (150, -50.0) in sampled
@@ -0,0 +1,117 @@
+# tests/test_dam_timeseries.py
+
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+import dam_timeseries
+
+COLUMNS = ['storage_volume', 'percentage_full']
+
+def build_archive(rows, block_size=dam_timeseries.DEFAULT_BLOCK_SIZE):
+    buffer = io.BytesIO()
+    with dam_timeseries.TimeSeriesWriter(buffer, COLUMNS, block_size=block_size) as writer:
+        writer.write_rows(rows)
+    return buffer.getvalue()
+
+def daily_rows(series_id, start, days, step=1):
+    return [
+        (series_id, start + timedelta(days=offset * step), 1000.0 + offset * 0.125, 50.5 - offset * 0.01)
+        for offset in range(days)
+    ]
+
+@pytest.mark.parametrize('value', [0, 1, -1, 63, -64, 2 ** 40, -(2 ** 40)])
+def test_zigzag_varint_round_trip(value):
+    buffer = bytearray()
+    dam_timeseries.write_varint(buffer, dam_timeseries.zigzag(value))
+    decoded, position = dam_timeseries.read_varint(buffer, 0)
+    assert dam_timeseries.unzigzag(decoded) == value
+    assert position == len(buffer)
+
+def test_xor_round_trip_is_exact():
+    values = [1 / 3, 1 / 3, 2 / 3, -1e300, 0.0, 5e-324, 123456.789, 123456.789 + 1e-9]
+    encoded = dam_timeseries.encode_xor(values)
+    assert dam_timeseries.decode_xor(encoded, len(values)) == values
+
+@pytest.mark.parametrize('values', [
+    [1.0, 2.0, 3.0],
+    [1.5, -2.25, 100.125],
+    [None, 1.001, None, None, 2.002],
+    [None, None],
+    [1 / 3, 2 / 3, None],
+])
+def test_column_round_trip(values):
+    encoded = dam_timeseries.encode_column(values)
+    decoded, position = dam_timeseries.decode_column(encoded, 0, len(values))
+    assert decoded == values
+    assert position == len(encoded)
+
+def test_column_uses_fewest_scale_digits():
+    assert dam_timeseries.encode_column([1.0, 2.0])[0] == 0
+    assert dam_timeseries.encode_column([1.25, 2.5])[0] == 2
+    assert dam_timeseries.encode_column([1 / 3])[0] == dam_timeseries.XOR_ENCODING
+
+def test_archive_round_trip_across_blocks():
+    rows = daily_rows('203042', date(2020, 1, 1), 10) + daily_rows('212243', date(2020, 1, 1), 7, step=3)
+    reader = dam_timeseries.TimeSeriesReader.from_bytes(build_archive(rows, block_size=4))
+
+    assert reader.columns == COLUMNS
+    assert reader.series_ids() == ['203042', '212243']
+    for series_id in reader.series_ids():
+        expected = [row for row in rows if row[0] == series_id]
+        dates, values = reader.read(series_id)
+        assert dates == [row[1] for row in expected]
+        assert values['storage_volume'] == [row[2] for row in expected]
+        assert values['percentage_full'] == [row[3] for row in expected]
+
+def test_archive_keeps_nulls_and_decimals():
+    rows = [
+        ('1', date(2021, 3, 1), Decimal('12.345'), None),
+        ('1', date(2021, 3, 2), None, Decimal('99.9')),
+        ('1', date(2021, 3, 5), Decimal('-0.001'), Decimal('0')),
+    ]
+    dates, values = dam_timeseries.TimeSeriesReader.from_bytes(build_archive(rows)).read('1')
+    assert dates == [date(2021, 3, 1), date(2021, 3, 2), date(2021, 3, 5)]
+    assert values == {'storage_volume': [12.345, None, -0.001], 'percentage_full': [None, 99.9, 0.0]}
+
+def test_read_filters_to_half_open_date_range():
+    rows = daily_rows('203042', date(2020, 1, 1), 30)
+    reader = dam_timeseries.TimeSeriesReader.from_bytes(build_archive(rows, block_size=8))
+    dates, values = reader.read('203042', date(2020, 1, 10), date(2020, 1, 20))
+    assert dates == [date(2020, 1, 1) + timedelta(days=offset) for offset in range(9, 19)]
+    assert values['storage_volume'] == [row[2] for row in rows[9:19]]
+
+def test_read_of_unknown_series_is_empty():
+    reader = dam_timeseries.TimeSeriesReader.from_bytes(build_archive(daily_rows('1', date(2020, 1, 1), 3)))
+    assert reader.read('missing') == ([], {'storage_volume': [], 'percentage_full': []})
+
+def test_adjacent_series_are_fetched_with_one_range_read():
+    rows = [row for series_id in ('1', '2', '3') for row in daily_rows(series_id, date(2020, 1, 1), 20)]
+    data = build_archive(rows, block_size=8)
+    reads = []
+
+    def read_range(start, end):
+        reads.append((start, end))
+        return data[start:end]
+
+    reader = dam_timeseries.TimeSeriesReader(read_range, len(data))
+    directory_reads = len(reads)
+    series = list(reader.iter_series())
+    assert [series_id for series_id, _, _ in series] == ['1', '2', '3']
+    assert len(reads) - directory_reads == 1
+
+def test_writer_rejects_unordered_rows():
+    writer = dam_timeseries.TimeSeriesWriter(io.BytesIO(), COLUMNS)
+    writer.write('1', date(2020, 1, 2), (1.0, 1.0))
+    with pytest.raises(ValueError):
+        writer.write('1', date(2020, 1, 2), (1.0, 1.0))
+    writer.write('2', date(2020, 1, 1), (1.0, 1.0))
+    with pytest.raises(ValueError):
+        writer.write('1', date(2020, 1, 3), (1.0, 1.0))
+
+def test_reader_rejects_other_data():
+    with pytest.raises(dam_timeseries.TimeSeriesFormatError):
+        dam_timeseries.TimeSeriesReader.from_bytes(b'\x00' * 64)
+
+def test_yearly_archive_key():
+    assert dam_timeseries.yearly_archive_key('archive/', 2019) == 'archive/dam_resources_timeseries/dam_resources_2019.dts'
@@ -0,0 +1,72 @@
+# tests/test_glue_job_requests.py
+
+import pytest
+
+pytest.importorskip('boto3')
+from botocore.exceptions import ClientError
+import lambda_load_rds_glue
+
+class FakeRequestsCursor:
+    """
+    Applies the glue_job_requests updates the start helpers issue to a single in-memory row.
+    """
+
+    def __init__(self, row):
+        self.row = row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=()):
+        query = ' '.join(query.split())
+        if query.startswith('UPDATE glue_job_requests SET last_started_at = NULL, follow_up_pending = 1'):
+            self.row.update(last_started_at=None, follow_up_pending=1)
+        elif query.startswith('UPDATE glue_job_requests SET follow_up_pending = 1'):
+            self.row.update(follow_up_pending=1)
+        else:
+            raise AssertionError(f"Unexpected statement: {query}")
+        return 1
+
+class FakeRequestsConnection:
+    def __init__(self):
+        # As left by a successful claim_glue_start
+        self.row = {'last_started_at': 'claimed', 'follow_up_pending': 0}
+        self.commits = 0
+
+    def cursor(self, cursorclass=None):
+        return FakeRequestsCursor(self.row)
+
+    def commit(self):
+        self.commits += 1
+
+def failing_start(error):
+    def start_glue_job(job_name):
+        raise error
+    return start_glue_job
+
+def test_started_run_keeps_the_claim(monkeypatch):
+    connection = FakeRequestsConnection()
+    monkeypatch.setattr(lambda_load_rds_glue, 'start_glue_job', lambda job_name: None)
+    assert lambda_load_rds_glue.start_claimed_glue_job(connection, 'etl') == 'started'
+    assert connection.row == {'last_started_at': 'claimed', 'follow_up_pending': 0}
+
+def test_concurrent_run_queues_a_follow_up(monkeypatch):
+    connection = FakeRequestsConnection()
+    error = ClientError({'Error': {'Code': 'ConcurrentRunsExceededException'}}, 'StartJobRun')
+    monkeypatch.setattr(lambda_load_rds_glue, 'start_glue_job', failing_start(error))
+    assert lambda_load_rds_glue.start_claimed_glue_job(connection, 'etl') == 'queued'
+    assert connection.row == {'last_started_at': 'claimed', 'follow_up_pending': 1}
+
+@pytest.mark.parametrize('error', [
+    ClientError({'Error': {'Code': 'ThrottlingException'}}, 'StartJobRun'),
+    ConnectionError("Could not reach the Glue endpoint"),
+])
+def test_failed_start_releases_the_claim(monkeypatch, error):
+    connection = FakeRequestsConnection()
+    monkeypatch.setattr(lambda_load_rds_glue, 'start_glue_job', failing_start(error))
+    with pytest.raises(type(error)):
+        lambda_load_rds_glue.start_claimed_glue_job(connection, 'etl')
+    assert connection.row == {'last_started_at': None, 'follow_up_pending': 1}
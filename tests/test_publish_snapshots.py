@@ -0,0 +1,111 @@
+# tests/test_publish_snapshots.py
+
+import gzip
+import io
+import json
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('boto3')
+from botocore.exceptions import ClientError
+import lambda_publish_snapshots
+
+class FakeS3:
+    """
+    In-memory bucket that honours the IfMatch / IfNoneMatch conditions of put_object.
+    before_put runs ahead of each manifest write, to simulate an overlapping publisher.
+    """
+
+    def __init__(self, conditional=True):
+        self.objects = {}
+        self.etags = 0
+        self.before_put = None
+        members = {'IfMatch': None, 'IfNoneMatch': None} if conditional else {}
+        operation = SimpleNamespace(input_shape=SimpleNamespace(members=members))
+        self.meta = SimpleNamespace(service_model=SimpleNamespace(operation_model=lambda name: operation))
+
+    def store(self, key, body):
+        self.etags += 1
+        self.objects[key] = {'Body': body, 'ETag': f'"{self.etags}"'}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        stored = self.objects[Key]
+        return {'Body': io.BytesIO(stored['Body']), 'ContentEncoding': 'gzip', 'ETag': stored['ETag']}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **headers):
+        if Key.endswith('manifest.json') and self.before_put:
+            before_put, self.before_put = self.before_put, None
+            before_put()
+        current = self.objects.get(Key)
+        if (IfNoneMatch == '*' and current) or (IfMatch and (not current or current['ETag'] != IfMatch)):
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'PutObject')
+        self.store(Key, Body)
+
+    def manifest_version(self):
+        return json.loads(gzip.decompress(self.objects['snapshots/manifest.json']['Body']))['version']
+
+def publish_manifest(s3, version):
+    s3.store('snapshots/manifest.json', lambda_publish_snapshots.compress_document({'version': version}))
+
+def test_manifest_is_written_for_a_newer_version():
+    s3 = FakeS3()
+    publish_manifest(s3, 4)
+    assert lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 5})
+    assert s3.manifest_version() == 5
+
+def test_manifest_is_not_moved_back_to_an_older_version():
+    s3 = FakeS3()
+    publish_manifest(s3, 7)
+    assert not lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 5})
+    assert s3.manifest_version() == 7
+
+def test_forced_republish_keeps_the_same_version_only():
+    s3 = FakeS3()
+    publish_manifest(s3, 5)
+    assert lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 5}, force=True)
+    assert not lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 4}, force=True)
+
+@pytest.mark.parametrize('existing', [None, 4])
+def test_overlapping_newer_publish_wins_the_conditional_write(existing):
+    s3 = FakeS3()
+    if existing is not None:
+        publish_manifest(s3, existing)
+    s3.before_put = lambda: publish_manifest(s3, 6)
+    assert not lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 5})
+    assert s3.manifest_version() == 6
+
+def test_overlapping_older_publish_is_checked_and_overwritten():
+    s3 = FakeS3()
+    publish_manifest(s3, 3)
+    s3.before_put = lambda: publish_manifest(s3, 4)
+    assert lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 5})
+    assert s3.manifest_version() == 5
+
+def test_manifest_is_written_without_conditional_put_support():
+    s3 = FakeS3(conditional=False)
+    publish_manifest(s3, 4)
+    assert lambda_publish_snapshots.write_manifest(s3, 'bucket', 'snapshots', {'version': 5})
+    assert s3.manifest_version() == 5
+
+class FakePaginator:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):
+        keys = [key for key in self.keys if key.startswith(Prefix)]
+        if Delimiter:
+            prefixes = sorted({Prefix + key[len(Prefix):].split(Delimiter, 1)[0] + Delimiter for key in keys})
+            return [{'CommonPrefixes': [{'Prefix': prefix} for prefix in prefixes]}]
+        return [{'Contents': [{'Key': key} for key in keys]}]
+
+def test_prune_keeps_versions_newer_than_the_published_one():
+    keys = {f'snapshots/versions/{version}/latest.json' for version in range(1, 8)}
+    deleted = []
+    s3 = SimpleNamespace(
+        get_paginator=lambda name: FakePaginator(keys),
+        delete_objects=lambda Bucket, Delete: deleted.extend(obj['Key'] for obj in Delete['Objects'])
+    )
+    lambda_publish_snapshots.prune_old_versions(s3, 'bucket', 'snapshots', 2, 5)
+    assert sorted(deleted) == [f'snapshots/versions/{version}/latest.json' for version in (1, 2, 3)]
@@ -0,0 +1,34 @@
+# tests/test_query_plans.py
+
+import os
+import pytest
+import pymysql
+import dam_schema
+
+# Runs against a disposable local MySQL only: the database is migrated and filled with synthetic rows
+TEST_DB_HOST = os.getenv('TEST_DB_HOST')
+
+pytestmark = pytest.mark.skipif(not TEST_DB_HOST, reason="TEST_DB_HOST is not set; no local MySQL to EXPLAIN against.")
+
+@pytest.fixture(scope='module')
+def connection():
+    connection = pymysql.connect(
+        host=TEST_DB_HOST,
+        port=int(os.getenv('TEST_DB_PORT', 3306)),
+        user=os.getenv('TEST_DB_USER', 'root'),
+        password=os.getenv('TEST_DB_PASSWORD', ''),
+        database=os.getenv('TEST_DB_NAME', 'dam_test')
+    )
+    dam_schema.apply_migrations(connection)
+    dam_schema.seed_verification_data(connection)
+    yield connection
+    connection.close()
+
+def test_covering_date_index_is_replaced(connection):
+    with connection.cursor() as cursor:
+        indexes = dam_schema.get_index_names(cursor, 'dam_resources')
+    assert 'idx_dam_resources_date' in indexes
+    assert 'idx_dam_resources_date_covering' not in indexes
+
+def test_hot_queries_use_expected_plans(connection):
+    assert dam_schema.verify_hot_query_plans(connection) == []
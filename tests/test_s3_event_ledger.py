@@ -0,0 +1,135 @@
+# tests/test_s3_event_ledger.py
+
+import pytest
+
+pytest.importorskip('boto3')
+import lambda_load_rds_glue
+
+class FakeLedgerCursor:
+    """
+    Runs the handful of statements the ledger functions issue against an in-memory table.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=()):
+        ledger = self.connection.ledger
+        query = ' '.join(query.split())
+        self.connection.statements.append(query)
+        if query.startswith('INSERT IGNORE INTO s3_event_ledger'):
+            event_id = params[0]
+            if event_id in ledger:
+                return 0
+            ledger[event_id] = {'status': 'processing', 'updated_at': self.connection.now,
+                                'checkpoint_stage': None, 'checkpoint_rows': 0}
+            return 1
+        if query.startswith('SELECT status, updated_at < NOW() - INTERVAL %s SECOND'):
+            stale_seconds, event_id = params
+            row = ledger.get(event_id)
+            self.result = row and (
+                row['status'], row['updated_at'] < self.connection.now - stale_seconds,
+                row['checkpoint_stage'], row['checkpoint_rows']
+            )
+            return int(row is not None)
+        if query.startswith("UPDATE s3_event_ledger SET status = 'processing', updated_at = CURRENT_TIMESTAMP"):
+            return self._update(params[-1], status='processing', updated_at=self.connection.now)
+        if query.startswith("UPDATE s3_event_ledger SET status = 'completed'"):
+            return self._update(params[-1], status='completed')
+        if query.startswith("UPDATE s3_event_ledger SET status = 'failed'"):
+            return self._update(params[-1], only_status='processing', status='failed')
+        if query.startswith('UPDATE s3_event_ledger SET checkpoint_stage'):
+            return self._update(params[-1], checkpoint_stage=params[0], checkpoint_rows=params[1])
+        raise AssertionError(f"Unexpected statement: {query}")
+
+    def _update(self, event_id, only_status=None, **changes):
+        row = self.connection.ledger.get(event_id)
+        if row is None or (only_status and row['status'] != only_status):
+            return 0
+        row.update(changes)
+        return 1
+
+    def fetchone(self):
+        return self.result
+
+class FakeLedgerConnection:
+    def __init__(self):
+        self.ledger = {}
+        self.statements = []
+        self.now = 10000
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursorclass=None):
+        return FakeLedgerCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+IDENTITY = lambda_load_rds_glue.get_s3_event_identity({
+    'bucket': {'name': 'dam-data'},
+    'object': {'key': 'latest/dams.json', 'versionId': 'v1', 'eTag': 'abc123'}
+})
+
+@pytest.fixture
+def connection(monkeypatch):
+    monkeypatch.setenv('LEDGER_STALE_SECONDS', '900')
+    return FakeLedgerConnection()
+
+def test_identity_depends_on_object_version():
+    other = lambda_load_rds_glue.get_s3_event_identity({
+        'bucket': {'name': 'dam-data'},
+        'object': {'key': 'latest/dams.json', 'versionId': 'v2', 'eTag': 'abc123'}
+    })
+    assert other['event_id'] != IDENTITY['event_id']
+
+def test_first_claim_inserts_without_a_locking_read(connection):
+    assert lambda_load_rds_glue.claim_s3_event(connection, IDENTITY) == {'stage': None, 'rows': 0}
+    assert connection.ledger[IDENTITY['event_id']]['status'] == 'processing'
+    assert not any('FOR UPDATE' in statement for statement in connection.statements)
+    assert connection.commits == 1
+
+def test_duplicate_of_an_active_claim_is_skipped(connection):
+    lambda_load_rds_glue.claim_s3_event(connection, IDENTITY)
+    connection.now += 60
+    assert lambda_load_rds_glue.claim_s3_event(connection, IDENTITY) is None
+    assert connection.rollbacks == 1
+
+def test_completed_event_is_skipped(connection):
+    lambda_load_rds_glue.claim_s3_event(connection, IDENTITY)
+    lambda_load_rds_glue.complete_s3_event(connection, IDENTITY)
+    connection.now += 86400
+    assert lambda_load_rds_glue.claim_s3_event(connection, IDENTITY) is None
+
+def test_failed_event_resumes_from_its_checkpoint(connection):
+    lambda_load_rds_glue.claim_s3_event(connection, IDENTITY)
+    with connection.cursor() as cursor:
+        lambda_load_rds_glue.save_checkpoint(cursor, IDENTITY, 'dam_resources', 500)
+    lambda_load_rds_glue.release_s3_event(connection, IDENTITY)
+    assert connection.ledger[IDENTITY['event_id']]['status'] == 'failed'
+
+    assert lambda_load_rds_glue.claim_s3_event(connection, IDENTITY) == {'stage': 'dam_resources', 'rows': 500}
+    assert connection.ledger[IDENTITY['event_id']]['status'] == 'processing'
+
+def test_stale_claim_is_taken_over_once(connection):
+    lambda_load_rds_glue.claim_s3_event(connection, IDENTITY)
+    connection.now += 901
+    assert lambda_load_rds_glue.claim_s3_event(connection, IDENTITY) == {'stage': None, 'rows': 0}
+    # The takeover refreshed updated_at, so a concurrent redelivery does not take it over again
+    assert lambda_load_rds_glue.claim_s3_event(connection, IDENTITY) is None
+
+def test_release_does_not_fail_a_completed_event(connection):
+    lambda_load_rds_glue.claim_s3_event(connection, IDENTITY)
+    lambda_load_rds_glue.complete_s3_event(connection, IDENTITY)
+    lambda_load_rds_glue.release_s3_event(connection, IDENTITY)
+    assert connection.ledger[IDENTITY['event_id']]['status'] == 'completed'